@@ -0,0 +1,101 @@
+# app/areas.py
+# "inside this watershed / county" queries. the posted GeoJSON polygon is checked here (each
+# polygon must be valid on its own, parts of a MultiPolygon may overlap), then merged
+# (ST_MakeValid), simplified and cut by ST_Subdivide into pieces of at most
+# AREA_SUBDIVIDE_VERTICES vertices in the database. the GiST index on coords finds the points in
+# the area's bbox, each is then tested against the pieces whose bbox contains it, so the exact
+# ST_Intersects only ever looks at a small polygon however detailed the original shape is.
+import json
+import os
+
+import shapely
+from shapely.validation import explain_validity
+from sqlalchemy import func, select
+
+# degrees, about 10 m. vertices closer together than this add nothing at landslide scale
+AREA_SIMPLIFY_TOLERANCE = float(os.getenv("AREA_SIMPLIFY_TOLERANCE", 0.0001))
+AREA_SUBDIVIDE_VERTICES = int(os.getenv("AREA_SUBDIVIDE_VERTICES", 256))
+# bigger shapes are turned away before they reach the database
+AREA_MAX_VERTICES = int(os.getenv("AREA_MAX_VERTICES", 200_000))
+
+AREA_TYPES = ("Polygon", "MultiPolygon")
+
+# the polygonal part of a ST_MakeValid result (which can also hold lines and points)
+POLYGON_COLLECTION_TYPE = 3
+
+
+class InvalidArea(ValueError):
+    pass
+
+
+def _check_ring(ring, where: str) -> int:
+    if not isinstance(ring, list) or len(ring) < 4:
+        raise InvalidArea(f"{where} needs at least 4 positions")
+    for position in ring:
+        if (not isinstance(position, list) or len(position) < 2
+                or not all(isinstance(value, (int, float)) and not isinstance(value, bool) for value in position[:2])):
+            raise InvalidArea(f"{where} has a position that is not [longitude, latitude]")
+        lon, lat = position[:2]
+        if not (-180 <= lon <= 180 and -90 <= lat <= 90):
+            raise InvalidArea(f"{where} has a position outside longitude -180..180 / latitude -90..90")
+    if ring[0][:2] != ring[-1][:2]:
+        raise InvalidArea(f"{where} is not closed (first and last positions differ)")
+    return len(ring)
+
+
+def _check_polygon(rings, where: str):
+    # self-intersections, holes outside the shell and the like. postgis would either fail on
+    # them with an internal error or answer for a shape the client did not mean
+    polygon = shapely.Polygon([position[:2] for position in rings[0]],
+                              [[position[:2] for position in ring] for ring in rings[1:]])
+    if not polygon.is_valid:
+        raise InvalidArea(f"{where} is not a valid polygon: {explain_validity(polygon)}")
+
+
+def parse_area(body) -> str:
+    # body is a GeoJSON Polygon / MultiPolygon, or a Feature with one. returns the geometry as
+    # a json string for ST_GeomFromGeoJSON
+    if not isinstance(body, dict):
+        raise InvalidArea("area must be a GeoJSON object")
+    geometry = body.get("geometry") if body.get("type") == "Feature" else body
+    if not isinstance(geometry, dict) or geometry.get("type") not in AREA_TYPES:
+        raise InvalidArea("area must be a GeoJSON Polygon or MultiPolygon (or a Feature with one)")
+
+    coordinates = geometry.get("coordinates")
+    if not isinstance(coordinates, list) or not coordinates:
+        raise InvalidArea("area has no coordinates")
+    polygons = [coordinates] if geometry["type"] == "Polygon" else coordinates
+
+    vertices = 0
+    for p, rings in enumerate(polygons):
+        if not isinstance(rings, list) or not rings:
+            raise InvalidArea(f"polygon {p} has no rings")
+        for r, ring in enumerate(rings):
+            vertices += _check_ring(ring, f"polygon {p} ring {r}")
+    if vertices > AREA_MAX_VERTICES:
+        raise InvalidArea(f"area has {vertices} vertices, at most {AREA_MAX_VERTICES} are accepted")
+    for p, rings in enumerate(polygons):
+        _check_polygon(rings, f"polygon {p}")
+
+    return json.dumps({"type": geometry["type"], "coordinates": coordinates})
+
+
+def area_shape(geojson: str):
+    # cte with the merged, simplified area as its one row. the polygons are valid, ST_MakeValid
+    # only unions the parts of a MultiPolygon that overlap
+    shape = func.ST_SetSRID(func.ST_GeomFromGeoJSON(geojson), 4326)
+    shape = func.ST_CollectionExtract(func.ST_MakeValid(shape), POLYGON_COLLECTION_TYPE)
+    # preserve topology keeps rings from collapsing or crossing, the result stays valid
+    shape = func.ST_SimplifyPreserveTopology(shape, AREA_SIMPLIFY_TOLERANCE)
+    return select(shape.label("geom")).cte("area_shape")
+
+
+def area_envelope(shape):
+    # bbox of the whole area as a scalar subquery, computed once before the scan, so
+    # coords && envelope is an index condition on data_import
+    return select(func.ST_Envelope(shape.c.geom)).scalar_subquery()
+
+
+def area_pieces(shape):
+    # cte with one row per subdivided piece of the area
+    return select(func.ST_Subdivide(shape.c.geom, AREA_SUBDIVIDE_VERTICES).label("geom")).cte("area")
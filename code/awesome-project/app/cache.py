@@ -0,0 +1,75 @@
+# app/cache.py
+# small thread safe in-process LRU cache for byte payloads, capped by total size.
+# every entry is charged ENTRY_OVERHEAD_BYTES on top of its payload (the dict slot, key and
+# tuples cost memory too), so even empty payloads count towards the cap and get evicted
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+ENTRY_OVERHEAD_BYTES = 200
+
+
+class LRUCache:
+    def __init__(self, max_bytes: int, entry_overhead: int = ENTRY_OVERHEAD_BYTES):
+        self.max_bytes = max_bytes
+        self.entry_overhead = entry_overhead
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()  # key -> (value, size)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value, size: Optional[int] = None):
+        if size is None:
+            size = len(value)
+        size += self.entry_overhead
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.current_bytes -= old[1]
+            self._entries[key] = (value, size)
+            self.current_bytes += size
+            while self.current_bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.current_bytes -= evicted_size
+                self.evictions += 1
+
+    def pop_matching(self, predicate) -> int:
+        # drops every entry whose key matches, returns how many were dropped
+        with self._lock:
+            keys = [key for key in self._entries if predicate(key)]
+            for key in keys:
+                _, size = self._entries.pop(key)
+                self.current_bytes -= size
+            return len(keys)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self.current_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+            }
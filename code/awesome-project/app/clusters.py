@@ -0,0 +1,25 @@
+# app/clusters.py
+# every data_import row stores the geohash of its point (GEOHASH_PRECISION characters),
+# clusters at a zoom level are the rows grouped by a shorter prefix of that geohash
+
+GEOHASH_PRECISION = 8
+
+# smallest zoom level at which each geohash length is used, roughly one cell per 64-128px on screen
+_ZOOM_PRECISION = [
+    (0, 1),
+    (3, 2),
+    (5, 3),
+    (8, 4),
+    (10, 5),
+    (13, 6),
+    (15, 7),
+    (18, 8),
+]
+
+
+def precision_for_zoom(zoom: int) -> int:
+    precision = 1
+    for min_zoom, length in _ZOOM_PRECISION:
+        if zoom >= min_zoom:
+            precision = length
+    return precision
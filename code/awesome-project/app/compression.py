@@ -0,0 +1,45 @@
+# app/compression.py
+# content negotiation for bodies the api compresses itself (cached query results). everything
+# else goes through GZipMiddleware, which leaves responses that already have a Content-Encoding.
+# brotli is used when the brotli package is installed and the client accepts it.
+import gzip
+from typing import Optional
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+# bodies smaller than this are sent as they are
+MIN_COMPRESS_BYTES = 1000
+
+
+def _accepted(accept_encoding: str) -> set:
+    accepted = set()
+    for part in accept_encoding.split(","):
+        coding, _, params = part.strip().partition(";")
+        q = params.strip()
+        if q.startswith("q=") and q[2:].strip() in ("0", "0.0", "0.00", "0.000"):
+            continue
+        accepted.add(coding.strip().lower())
+    return accepted
+
+
+def choose_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    # "br", "gzip" or None for identity; br wins when both are accepted
+    if not accept_encoding:
+        return None
+    accepted = _accepted(accept_encoding)
+    if brotli is not None and ("br" in accepted or "*" in accepted):
+        return "br"
+    if "gzip" in accepted or "*" in accepted:
+        return "gzip"
+    return None
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
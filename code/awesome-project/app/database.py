@@ -1,10 +1,15 @@
 # app/database.py
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
 import os
 from dotenv import load_dotenv
 
+from .pool_stats import PoolStats, timed_pool_class
+
 import sqlite3
 import sqlalchemy.event
 
@@ -16,10 +21,49 @@ SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL")
 if not SQLALCHEMY_DATABASE_URL:
     raise ValueError("DATABASE_URL environment variable not set. Please check your .env file.")
     
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
+# pool settings, tune from /internal/db-pool
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 5))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 10))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 30))  # seconds to wait for a free connection
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", 1800))  # seconds before a connection is replaced
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", 0))  # 0 means no timeout
+
+POOL_SETTINGS = dict(
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    pool_timeout=DB_POOL_TIMEOUT,
+    pool_recycle=DB_POOL_RECYCLE,
+    pool_pre_ping=DB_POOL_PRE_PING,
+)
+
+sync_pool_stats = PoolStats("sync")
+async_pool_stats = PoolStats("async")
+
+engine = create_engine(
+    SQLALCHEMY_DATABASE_URL,
+    poolclass=timed_pool_class(QueuePool, sync_pool_stats),
+    connect_args={"options": f"-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}"} if DB_STATEMENT_TIMEOUT_MS else {},
+    **POOL_SETTINGS,
+)
+sync_pool_stats.attach(engine)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# async engine on the same database for the async endpoints, uses asyncpg unless
+# ASYNC_DATABASE_URL names another async driver
+ASYNC_SQLALCHEMY_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or make_url(SQLALCHEMY_DATABASE_URL).set(drivername="postgresql+asyncpg")
+
+async_engine = create_async_engine(
+    ASYNC_SQLALCHEMY_DATABASE_URL,
+    poolclass=timed_pool_class(AsyncAdaptedQueuePool, async_pool_stats),
+    connect_args={"server_settings": {"statement_timeout": str(DB_STATEMENT_TIMEOUT_MS)}} if DB_STATEMENT_TIMEOUT_MS else {},
+    **POOL_SETTINGS,
+)
+async_pool_stats.attach(async_engine.sync_engine)
+
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 Base = declarative_base()
 
 def get_db():
@@ -27,4 +71,9 @@ def get_db():
     try:
         yield db        
     finally:
-        db.close()     
\ No newline at end of file
+        db.close()
+
+# for async def endpoints, queries are awaited so they never block the event loop
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -0,0 +1,295 @@
+# app/dedup.py
+# near-duplicate reports: a new point within DUPLICATE_DISTANCE_M of an existing report with the
+# same DUPLICATE_MATCH_FIELDS values is the same slide reported twice. DUPLICATE_ACTION says what
+# happens to it: "flag" inserts it with duplicate_of set to the existing report, "merge" fills the
+# existing report's empty attributes from it instead of inserting, "off" (the default) skips the
+# check. the check costs one ST_DWithin query per create and per DUPLICATE_QUERY_CHUNK bulk rows,
+# run benchmarks/run.py with DUPLICATE_ACTION set to see what it adds.
+# points are first looked up in memory (reports this process stored recently, which also covers
+# write-behind batches the database cannot see yet, and earlier rows of the same upload), the
+# rest in one ST_DWithin query per DUPLICATE_QUERY_CHUNK points served by the geography index.
+import math
+import os
+import threading
+from collections import deque
+from typing import List, Optional
+
+from sqlalchemy import text
+
+from .facets import ADD_FACETS_SQL, REMOVE_FACETS_SQL
+
+DUPLICATE_ACTION = os.getenv("DUPLICATE_ACTION", "off")
+DUPLICATE_DISTANCE_M = float(os.getenv("DUPLICATE_DISTANCE_M", 25))
+# comma separated data_import columns that must also be equal, empty for distance only
+DUPLICATE_MATCH_FIELDS = tuple(f.strip() for f in os.getenv("DUPLICATE_MATCH_FIELDS", "lstype").split(",") if f.strip())
+DUPLICATE_RECENT_POINTS = int(os.getenv("DUPLICATE_RECENT_POINTS", 100_000))
+DUPLICATE_QUERY_CHUNK = int(os.getenv("DUPLICATE_QUERY_CHUNK", 10_000))
+
+DUPLICATE_ACTIONS = ("off", "flag", "merge")
+
+# data_import column -> DataImportCreate attribute
+MATCH_ATTRIBUTES = {
+    "lstype": "lsType",
+    "lssource": "lsSource",
+    "impact": "impact",
+    "wea13_type": "wea13_type",
+}
+
+EARTH_RADIUS_M = 6_371_008.8
+METRES_PER_DEGREE = math.pi * EARTH_RADIUS_M / 180
+
+# closest existing report for each point of a chunk (v.i is the point's position in the chunk)
+_NEAREST_SQL = """
+    SELECT v.i, m.landslideid
+    FROM unnest(CAST(:i AS integer[]), CAST(:lon AS float8[]), CAST(:lat AS float8[]),
+                CAST(:lstype AS varchar[]), CAST(:lssource AS varchar[]), CAST(:impact AS varchar[]),
+                CAST(:wea13_type AS varchar[])) AS v(i, lon, lat, lstype, lssource, impact, wea13_type)
+    CROSS JOIN LATERAL (
+        SELECT d.landslideid
+        FROM data_import AS d
+        WHERE ST_DWithin(geography(d.coords), geography(ST_SetSRID(ST_MakePoint(v.lon, v.lat), 4326)), :distance)
+          AND d.duplicate_of IS NULL
+          {attribute_filter}
+        ORDER BY geography(d.coords) <-> geography(ST_SetSRID(ST_MakePoint(v.lon, v.lat), 4326))
+        LIMIT 1
+    ) AS m
+"""
+
+# attributes the existing report does not have yet are taken from the merged ones, the first
+# report of the list that has a value wins. returns the targets that were updated and where they
+# are (their tiles changed, not the merged reports' ones), a target
+# deleted or flagged as a duplicate itself since it was matched is left alone
+MERGE_SQL = text("""
+    UPDATE data_import AS d
+    SET lstype = coalesce(d.lstype, v.lstype),
+        lssource = coalesce(d.lssource, v.lssource),
+        impact = coalesce(d.impact, v.impact),
+        wea13_id = coalesce(d.wea13_id, v.wea13_id),
+        wea13_type = coalesce(d.wea13_type, v.wea13_type),
+        event_date = coalesce(d.event_date, v.event_date)
+    FROM (
+        SELECT u.landslideid,
+               (array_agg(u.lstype ORDER BY u.n) FILTER (WHERE u.lstype IS NOT NULL))[1] AS lstype,
+               (array_agg(u.lssource ORDER BY u.n) FILTER (WHERE u.lssource IS NOT NULL))[1] AS lssource,
+               (array_agg(u.impact ORDER BY u.n) FILTER (WHERE u.impact IS NOT NULL))[1] AS impact,
+               (array_agg(u.wea13_id ORDER BY u.n) FILTER (WHERE u.wea13_id IS NOT NULL))[1] AS wea13_id,
+               (array_agg(u.wea13_type ORDER BY u.n) FILTER (WHERE u.wea13_type IS NOT NULL))[1] AS wea13_type,
+               (array_agg(u.event_date ORDER BY u.n) FILTER (WHERE u.event_date IS NOT NULL))[1] AS event_date
+        FROM unnest(CAST(:landslideids AS varchar[]), CAST(:lstype AS varchar[]), CAST(:lssource AS varchar[]),
+                    CAST(:impact AS varchar[]), CAST(:wea13_id AS integer[]), CAST(:wea13_type AS varchar[]),
+                    CAST(:event_date AS date[]))
+             WITH ORDINALITY AS u(landslideid, lstype, lssource, impact, wea13_id, wea13_type, event_date, n)
+        GROUP BY u.landslideid
+    ) AS v
+    WHERE d.landslideid = v.landslideid AND d.duplicate_of IS NULL
+    RETURNING d.landslideid, d.longitude, d.latitude
+""")
+
+
+def distance_m(lon1: float, lat1: float, lon2: float, lat2: float) -> float:
+    # haversine, close enough to ST_DWithin on geography at these distances
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    a = (math.sin((phi2 - phi1) / 2) ** 2
+         + math.cos(phi1) * math.cos(phi2) * math.sin(math.radians(lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_M * math.asin(min(1.0, math.sqrt(a)))
+
+
+class SpatialHash:
+    # points bucketed in a grid of distance sized cells, so a lookup only looks at the cells
+    # around the point. longitude cells get narrower towards the poles, so more of them are
+    # searched there. the grid does not wrap around the antimeridian
+    def __init__(self, distance: float, max_points: Optional[int] = None):
+        self.distance = distance
+        self.cell_degrees = distance / METRES_PER_DEGREE
+        self.max_points = max_points
+        self.cells = {}
+        self.order = deque()
+
+    def __len__(self):
+        return len(self.order)
+
+    def _cell(self, lon: float, lat: float):
+        return math.floor(lon / self.cell_degrees), math.floor(lat / self.cell_degrees)
+
+    def add(self, landslideid: str, lon: float, lat: float, attributes: tuple = ()):
+        key = self._cell(lon, lat)
+        entry = (landslideid, lon, lat, attributes)
+        self.cells.setdefault(key, []).append(entry)
+        self.order.append((key, entry))
+        if self.max_points is not None and len(self.order) > self.max_points:
+            old_key, old_entry = self.order.popleft()
+            bucket = self.cells[old_key]
+            bucket.remove(old_entry)
+            if not bucket:
+                del self.cells[old_key]
+
+    def nearest(self, lon: float, lat: float, attributes: tuple = ()) -> Optional[str]:
+        cell_x, cell_y = self._cell(lon, lat)
+        edge_lat = min(90.0, abs(lat) + self.cell_degrees)
+        x_reach = math.ceil(1 / max(math.cos(math.radians(edge_lat)), 0.01))
+
+        best, best_distance = None, self.distance
+        for x in range(cell_x - x_reach, cell_x + x_reach + 1):
+            for y in range(cell_y - 1, cell_y + 2):
+                for landslideid, other_lon, other_lat, other_attributes in self.cells.get((x, y), ()):
+                    if other_attributes != attributes:
+                        continue
+                    d = distance_m(lon, lat, other_lon, other_lat)
+                    if d <= best_distance:
+                        best, best_distance = landslideid, d
+        return best
+
+
+class DuplicateChecker:
+    def __init__(self, action: str = DUPLICATE_ACTION, distance: float = DUPLICATE_DISTANCE_M,
+                 match_fields=DUPLICATE_MATCH_FIELDS, max_recent: int = DUPLICATE_RECENT_POINTS,
+                 chunk: int = DUPLICATE_QUERY_CHUNK):
+        if action not in DUPLICATE_ACTIONS:
+            raise ValueError(f"DUPLICATE_ACTION must be one of {', '.join(DUPLICATE_ACTIONS)}, not {action!r}")
+        unknown = set(match_fields) - set(MATCH_ATTRIBUTES)
+        if unknown:
+            raise ValueError(f"cannot match duplicates on {', '.join(sorted(unknown))}")
+
+        self.action = action
+        self.distance = distance
+        self.match_fields = tuple(match_fields)
+        self.chunk = chunk
+        self.recent = SpatialHash(distance, max_recent)
+        self.checked = 0
+        self.found_in_memory = 0
+        self.found_in_database = 0
+        self.merged = 0
+        self._lock = threading.Lock()
+        attribute_filter = "".join(f"AND d.{field} IS NOT DISTINCT FROM v.{field} " for field in self.match_fields)
+        self._nearest_sql = text(_NEAREST_SQL.format(attribute_filter=attribute_filter))
+
+    @property
+    def enabled(self) -> bool:
+        return self.action != "off"
+
+    def attributes(self, report) -> tuple:
+        return tuple(getattr(report, MATCH_ATTRIBUTES[field]) for field in self.match_fields)
+
+    def _check_memory(self, reports) -> List[Optional[str]]:
+        batch = SpatialHash(self.distance)
+        found = []
+        for rec in reports:
+            attributes = self.attributes(rec)
+            # taken per point so a large upload does not hold up single reports
+            with self._lock:
+                match = self.recent.nearest(rec.longitude, rec.latitude, attributes)
+            match = match or batch.nearest(rec.longitude, rec.latitude, attributes)
+            found.append(match)
+            # duplicates are not candidates themselves, merged ones will never be stored
+            if match is None and rec.landslideID is not None:
+                batch.add(rec.landslideID, rec.longitude, rec.latitude, attributes)
+        with self._lock:
+            self.checked += len(reports)
+            self.found_in_memory += sum(match is not None for match in found)
+        return found
+
+    def _queries(self, reports, found):
+        remaining = [i for i, match in enumerate(found) if match is None]
+        for start in range(0, len(remaining), self.chunk):
+            positions = remaining[start:start + self.chunk]
+            params = {
+                "i": list(range(len(positions))),
+                "lon": [reports[i].longitude for i in positions],
+                "lat": [reports[i].latitude for i in positions],
+                "distance": self.distance,
+            }
+            for field, attribute in MATCH_ATTRIBUTES.items():
+                params[field] = [getattr(reports[i], attribute) for i in positions]
+            yield positions, params
+
+    def _record(self, found, positions, rows):
+        for i, landslideid in rows:
+            found[positions[i]] = landslideid
+        with self._lock:
+            self.found_in_database += len(rows)
+
+    def find_sync(self, db, reports) -> List[Optional[str]]:
+        # landslideid of the existing report each report duplicates, or None
+        if not self.enabled or not reports:
+            return [None] * len(reports)
+        found = self._check_memory(reports)
+        for positions, params in self._queries(reports, found):
+            self._record(found, positions, db.execute(self._nearest_sql, params).all())
+        return found
+
+    async def find(self, db, reports) -> List[Optional[str]]:
+        if not self.enabled or not reports:
+            return [None] * len(reports)
+        found = self._check_memory(reports)
+        for positions, params in self._queries(reports, found):
+            self._record(found, positions, (await db.execute(self._nearest_sql, params)).all())
+        return found
+
+    def remember(self, reports, duplicate_of=None):
+        # call once the reports are stored, with only the stored ones. flagged duplicates are
+        # not candidates, like in the database
+        if not self.enabled:
+            return
+        if duplicate_of is None:
+            duplicate_of = [None] * len(reports)
+        with self._lock:
+            for rec, original in zip(reports, duplicate_of):
+                if original is None:
+                    self.recent.add(rec.landslideID, rec.longitude, rec.latitude, self.attributes(rec))
+
+    def _merge_statements(self, reports, targets: List[str]):
+        # the merged reports' attributes go into their targets, whose facet counts are taken out
+        # and put back around the update
+        params = {
+            "landslideids": targets,
+            "lstype": [rec.lsType for rec in reports],
+            "lssource": [rec.lsSource for rec in reports],
+            "impact": [rec.impact for rec in reports],
+            "wea13_id": [int(rec.wea13_id) if rec.wea13_id is not None else None for rec in reports],
+            "wea13_type": [rec.wea13_type for rec in reports],
+            "event_date": [rec.event_date for rec in reports],
+        }
+        distinct_targets = {"landslideids": sorted(set(targets))}
+        return (REMOVE_FACETS_SQL, distinct_targets), (MERGE_SQL, params), (ADD_FACETS_SQL, distinct_targets)
+
+    def _record_merged(self, targets: List[str], rows) -> dict:
+        merged_into = {landslideid: (longitude, latitude) for landslideid, longitude, latitude in rows}
+        with self._lock:
+            self.merged += sum(target in merged_into for target in targets)
+        return merged_into
+
+    def merge_sync(self, db, reports, targets: List[str]) -> dict:
+        # runs in the caller's transaction. returns {target: (longitude, latitude)} of the targets
+        # that took the merge, the reports of any other target were not merged anywhere
+        if not reports:
+            return {}
+        remove, merge, add = self._merge_statements(reports, targets)
+        db.execute(*remove)
+        rows = db.execute(*merge).all()
+        db.execute(*add)
+        return self._record_merged(targets, rows)
+
+    async def merge(self, db, reports, targets: List[str]) -> dict:
+        if not reports:
+            return {}
+        remove, merge, add = self._merge_statements(reports, targets)
+        await db.execute(*remove)
+        rows = (await db.execute(*merge)).all()
+        await db.execute(*add)
+        return self._record_merged(targets, rows)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "action": self.action,
+                "distance_m": self.distance,
+                "match_fields": list(self.match_fields),
+                "recent_points": len(self.recent),
+                "checked": self.checked,
+                "found_in_memory": self.found_in_memory,
+                "found_in_database": self.found_in_database,
+                "merged": self.merged,
+            }
+
+
+duplicate_checker = DuplicateChecker()
@@ -0,0 +1,100 @@
+# app/export.py
+# columnar exports of data_import. rows arrive from a server side cursor in partitions of
+# EXPORT_BATCH_ROWS, each partition becomes one arrow record batch (one parquet row group) and
+# is written out and handed to the response before the next one is read, so memory stays
+# bounded by the batch size whatever the export size.
+# the geometry is WKB in a "geometry" column with GeoParquet metadata (and the geoarrow.wkb
+# extension name for arrow readers).
+import json
+import os
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+EXPORT_BATCH_ROWS = int(os.getenv("EXPORT_BATCH_ROWS", 50_000))
+
+# name -> arrow type, in the order export_columns() in main.py selects them
+EXPORT_FIELDS = [
+    ("landslideID", pa.string()),
+    ("latitude", pa.float64()),
+    ("longitude", pa.float64()),
+    ("lsType", pa.string()),
+    ("lsSource", pa.string()),
+    ("impact", pa.string()),
+    ("wea13_id", pa.int32()),
+    ("wea13_type", pa.string()),
+    ("user_id", pa.string()),
+    ("reported_at", pa.timestamp("us", tz="UTC")),
+    ("event_date", pa.date32()),
+    ("geometry", pa.binary()),
+]
+
+# https://geoparquet.org, coordinates are lon/lat so the default OGC:CRS84 crs applies
+GEO_METADATA = {
+    "version": "1.1.0",
+    "primary_column": "geometry",
+    "columns": {"geometry": {"encoding": "WKB", "geometry_types": ["Point"]}},
+}
+
+
+def export_schema() -> pa.Schema:
+    fields = []
+    for name, arrow_type in EXPORT_FIELDS:
+        metadata = {"ARROW:extension:name": "geoarrow.wkb"} if name == "geometry" else None
+        fields.append(pa.field(name, arrow_type, metadata=metadata))
+    return pa.schema(fields, metadata={"geo": json.dumps(GEO_METADATA)})
+
+
+def record_batch(rows, schema: pa.Schema) -> pa.RecordBatch:
+    columns = list(zip(*rows)) if rows else [()] * len(schema)
+    return pa.RecordBatch.from_arrays(
+        [pa.array(values, type=field.type) for values, field in zip(columns, schema)], schema=schema)
+
+
+class _ChunkSink:
+    # write-only file object, the writers write into it and the stream takes what was written
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self.chunks.append(data)
+        self.position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def take(self) -> bytes:
+        data, self.chunks = b"".join(self.chunks), []
+        return data
+
+
+def stream_arrow(partitions):
+    # arrow IPC stream format: schema, then one message per record batch
+    schema = export_schema()
+    sink = _ChunkSink()
+    with pa.ipc.new_stream(sink, schema) as writer:
+        for rows in partitions:
+            writer.write_batch(record_batch(rows, schema))
+            yield sink.take()
+    yield sink.take()
+
+
+def stream_parquet(partitions):
+    # every batch is flushed as its own row group, the footer goes out last
+    schema = export_schema()
+    sink = _ChunkSink()
+    with pq.ParquetWriter(sink, schema, compression="zstd") as writer:
+        for rows in partitions:
+            writer.write_batch(record_batch(rows, schema), row_group_size=EXPORT_BATCH_ROWS)
+            yield sink.take()
+    yield sink.take()
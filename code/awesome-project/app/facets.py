@@ -0,0 +1,195 @@
+# app/facets.py
+# facet counts (lstype, lssource, impact, wea13_type) served from the data_import_facets summary
+# table instead of scanning data_import. every row is counted in its FACET_PRECISION geohash cell
+# (about 39 x 20 km), and a bbox is answered by summing the handful of cells that cover it: the
+# largest cells that fit inside the box, down to FACET_PRECISION cells along its edges. a coarser
+# cell is the sum of the FACET_PRECISION cells under it, read through the left(cell, n) indexes.
+# the edges of large boxes use coarser cells, so a cover never has much more than
+# FACET_MAX_EDGE_CELLS cells.
+# the write paths call ADD_FACETS_SQL in the same transaction as their insert. only the fine
+# cells are kept up to date there: coarse cells would be updated by every insert in their
+# region and concurrent writers would queue on the row locks.
+#
+#   python -m app.facets --rebuild    recount everything from data_import
+import argparse
+import math
+import os
+from typing import List, Tuple
+
+from sqlalchemy import text
+
+FACET_MIN_PRECISION = 1
+FACET_PRECISION = 4
+FACETS = ("lstype", "lssource", "impact", "wea13_type")
+# edge cells of a bbox cover, the cells inside it are a small multiple of this
+FACET_MAX_EDGE_CELLS = int(os.getenv("FACET_MAX_EDGE_CELLS", 256))
+
+GEOHASH_ALPHABET = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+# facet rows of a set of data_import rows, shared by the incremental update and the rebuild.
+# ordered so concurrent writers lock the summary rows in the same order and cannot deadlock
+_FACET_ROWS = f"""
+    SELECT left(d.geohash, {FACET_PRECISION}) AS cell, f.facet, coalesce(f.value, 'unknown') AS value,
+           count(*) AS count
+    FROM data_import AS d
+    CROSS JOIN LATERAL (VALUES ('lstype', d.lstype), ('lssource', d.lssource),
+                               ('impact', d.impact), ('wea13_type', d.wea13_type)) AS f(facet, value)
+    WHERE d.geohash IS NOT NULL {{where}}
+    GROUP BY 1, 2, 3
+    ORDER BY 1, 2, 3
+"""
+
+ADD_FACETS_SQL = text(f"""
+    INSERT INTO data_import_facets (cell, facet, value, count)
+    {_FACET_ROWS.format(where="AND d.landslideid = ANY(:landslideids)")}
+    ON CONFLICT (cell, facet, value) DO UPDATE SET count = data_import_facets.count + EXCLUDED.count
+""")
+
+# the reverse of ADD_FACETS_SQL, for rows about to be updated (app/dedup.py merges)
+REMOVE_FACETS_SQL = text(f"""
+    UPDATE data_import_facets AS s
+    SET count = s.count - r.count
+    FROM ({_FACET_ROWS.format(where="AND d.landslideid = ANY(:landslideids)")}) AS r
+    WHERE s.cell = r.cell AND s.facet = r.facet AND s.value = r.value
+""")
+
+REBUILD_FACETS_SQL = [
+    text("TRUNCATE data_import_facets"),
+    text(f"""
+        INSERT INTO data_import_facets (cell, facet, value, count)
+        {_FACET_ROWS.format(where="")}
+    """),
+]
+
+# cells of every length at once, see summary_params. the coarse ones go through
+# ix_data_import_facets_cell_<n>, the FACET_PRECISION ones through the primary key
+_CELL_MATCHES = " OR ".join(
+    f"left(cell, {n}) = ANY(:cells_{n})" for n in range(FACET_MIN_PRECISION, FACET_PRECISION)
+) + f" OR cell = ANY(:cells_{FACET_PRECISION})"
+
+FACETS_FROM_SUMMARY_SQL = text(f"""
+    SELECT facet, value, sum(count) AS count
+    FROM data_import_facets
+    WHERE {_CELL_MATCHES}
+    GROUP BY facet, value
+    HAVING sum(count) > 0
+""")
+
+
+def summary_params(cells: List[str]) -> dict:
+    # FACETS_FROM_SUMMARY_SQL parameters, the cells grouped by length
+    return {f"cells_{n}": [cell for cell in cells if len(cell) == n]
+            for n in range(FACET_MIN_PRECISION, FACET_PRECISION + 1)}
+
+
+# the edge cells of a bbox counted exactly from data_import. FACET_PRECISION cells go through
+# ix_data_import_geohash_cell, the coarser edges of large boxes through the coords index
+_FACETS_FROM_ROWS = """
+    SELECT f.facet, coalesce(f.value, 'unknown') AS value, count(*) AS count
+    FROM data_import AS d
+    CROSS JOIN LATERAL (VALUES ('lstype', d.lstype), ('lssource', d.lssource),
+                               ('impact', d.impact), ('wea13_type', d.wea13_type)) AS f(facet, value)
+    WHERE left(d.geohash, {precision}) = ANY(:cells)
+      AND d.coords && ST_MakeEnvelope(:min_lon, :min_lat, :max_lon, :max_lat, 4326)
+    GROUP BY 1, 2
+"""
+
+FACETS_FROM_ROWS_SQL = {
+    precision: text(_FACETS_FROM_ROWS.format(precision=precision))
+    for precision in range(FACET_MIN_PRECISION, FACET_PRECISION + 1)
+}
+
+
+def geohash_bounds(cell: str) -> Tuple[float, float, float, float]:
+    # (min_lon, min_lat, max_lon, max_lat) of a geohash cell
+    lon_range = [-180.0, 180.0]
+    lat_range = [-90.0, 90.0]
+    is_lon = True
+    for char in cell:
+        bits = GEOHASH_ALPHABET.index(char)
+        for shift in range(4, -1, -1):
+            interval = lon_range if is_lon else lat_range
+            middle = (interval[0] + interval[1]) / 2
+            if bits >> shift & 1:
+                interval[0] = middle
+            else:
+                interval[1] = middle
+            is_lon = not is_lon
+    return lon_range[0], lat_range[0], lon_range[1], lat_range[1]
+
+
+def cell_size(precision: int) -> Tuple[float, float]:
+    # (width, height) in degrees of a geohash cell, longitude takes the odd bits
+    lon_bits = (5 * precision + 1) // 2
+    lat_bits = 5 * precision // 2
+    return 360 / 2 ** lon_bits, 180 / 2 ** lat_bits
+
+
+def edge_precision(min_lon: float, min_lat: float, max_lon: float, max_lat: float,
+                   max_precision: int = FACET_PRECISION, max_edge_cells: int = FACET_MAX_EDGE_CELLS) -> int:
+    # the finest precision whose cells along the box outline stay within max_edge_cells
+    for precision in range(max_precision, FACET_MIN_PRECISION, -1):
+        width, height = cell_size(precision)
+        along_edges = 2 * (math.ceil((max_lon - min_lon) / width) + math.ceil((max_lat - min_lat) / height)) + 4
+        if along_edges <= max_edge_cells:
+            return precision
+    return FACET_MIN_PRECISION
+
+
+def cover_bbox(min_lon: float, min_lat: float, max_lon: float, max_lat: float,
+               max_precision: int = FACET_PRECISION,
+               max_edge_cells: int = FACET_MAX_EDGE_CELLS) -> Tuple[List[str], List[str]]:
+    # (cells inside the box, cells that only overlap it). the edge cells all have the same
+    # length, FACET_PRECISION unless the box is large
+    max_precision = edge_precision(min_lon, min_lat, max_lon, max_lat, max_precision, max_edge_cells)
+    inside, edge = [], []
+    stack = list(GEOHASH_ALPHABET)
+    while stack:
+        cell = stack.pop()
+        cell_min_lon, cell_min_lat, cell_max_lon, cell_max_lat = geohash_bounds(cell)
+        if cell_max_lon < min_lon or cell_min_lon > max_lon or cell_max_lat < min_lat or cell_min_lat > max_lat:
+            continue
+        if min_lon <= cell_min_lon and cell_max_lon <= max_lon and min_lat <= cell_min_lat and cell_max_lat <= max_lat:
+            inside.append(cell)
+        elif len(cell) < max_precision:
+            stack.extend(cell + char for char in GEOHASH_ALPHABET)
+        else:
+            edge.append(cell)
+    return sorted(inside), sorted(edge)
+
+
+def add_counts(counts: dict, rows):
+    for facet, value, count in rows:
+        facet_counts = counts.setdefault(facet, {})
+        facet_counts[value] = facet_counts.get(value, 0) + int(count)
+
+
+def empty_counts() -> dict:
+    return {facet: {} for facet in FACETS}
+
+
+def rebuild(db):
+    # one transaction: writers wait on the TRUNCATE lock instead of updating a half built table
+    for statement in REBUILD_FACETS_SQL:
+        db.execute(statement)
+    db.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="maintain the data_import_facets summary table")
+    parser.add_argument("--rebuild", action="store_true", help="recount every facet from data_import")
+    args = parser.parse_args()
+    if not args.rebuild:
+        parser.print_help()
+        return
+
+    from .database import SessionLocal
+
+    with SessionLocal() as db:
+        rebuild(db)
+        rows = db.execute(text("SELECT count(*) FROM data_import_facets")).scalar()
+    print(f"rebuilt data_import_facets, {rows:,} summary rows")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+# app/hashing.py
+# bcrypt runs on its own small thread pool so a burst of logins cannot block the event loop
+# (bcrypt releases the GIL while hashing). the pool is bounded in workers and in queued jobs.
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .metrics import hashing_duration, hashing_wait
+
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", 12))
+BCRYPT_MAX_WORKERS = int(os.getenv("BCRYPT_MAX_WORKERS", min(4, os.cpu_count() or 1)))
+# jobs allowed to wait for a worker before new ones are turned away
+BCRYPT_MAX_QUEUE = int(os.getenv("BCRYPT_MAX_QUEUE", 256))
+
+
+class HashingPoolFull(Exception):
+    pass
+
+
+class HashingPool:
+    def __init__(self, max_workers: int = BCRYPT_MAX_WORKERS, max_queue: int = BCRYPT_MAX_QUEUE):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.queued = 0
+        self.running = 0
+        self.completed = 0
+        self.rejected = 0
+        self.hash_seconds = 0.0
+        self.wait_seconds = 0.0
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="bcrypt")
+
+    def _job(self, fn, args, submitted: float):
+        started = time.perf_counter()
+        with self._lock:
+            self.queued -= 1
+            self.running += 1
+            self.wait_seconds += started - submitted
+        hashing_wait.observe(started - submitted, fn.__name__)
+        try:
+            return fn(*args)
+        finally:
+            finished = time.perf_counter()
+            with self._lock:
+                self.running -= 1
+                self.completed += 1
+                self.hash_seconds += finished - started
+            hashing_duration.observe(finished - started, fn.__name__)
+
+    def submit(self, fn, *args):
+        with self._lock:
+            if self.queued >= self.max_queue:
+                self.rejected += 1
+                raise HashingPoolFull("Too many password checks in progress, try again shortly.")
+            self.queued += 1
+        future = self._executor.submit(self._job, fn, args, time.perf_counter())
+        future.add_done_callback(self._forget_cancelled)
+        return future
+
+    def _forget_cancelled(self, future):
+        # a job cancelled while still queued (the awaiting request went away) never reaches
+        # _job, so it has to leave the queue here. a future that started cannot be cancelled
+        if future.cancelled():
+            with self._lock:
+                self.queued -= 1
+
+    async def run(self, fn, *args):
+        return await asyncio.wrap_future(self.submit(fn, *args))
+
+    def run_sync(self, fn, *args):
+        # for sync endpoints, which already run on starlette's threadpool
+        return self.submit(fn, *args).result()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "max_workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "rounds": BCRYPT_ROUNDS,
+                "queue_depth": self.queued,
+                "running": self.running,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "avg_hash_ms": 1000 * self.hash_seconds / self.completed if self.completed else 0.0,
+                "avg_wait_ms": 1000 * self.wait_seconds / self.completed if self.completed else 0.0,
+            }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+hashing_pool = HashingPool()
@@ -0,0 +1,99 @@
+# app/ids.py
+# new landslide ids come from the landslide_id_seq sequence. the sequence steps by a whole
+# block, so one nextval() reserves block_size ids for this process and most reservations are
+# served from memory. ids left in a block when the process stops are never handed out, so the
+# ids stay unique and increasing but not gap free.
+# reports can also bring their own landslideID. advance_past() moves the sequence beyond a
+# numeric one so later blocks do not contain it. an explicit id inside a block that is already
+# handed out (or one that races a nextval() elsewhere) can still collide, callers give a server
+# assigned id that hits a conflict a new one.
+import threading
+from collections import deque
+from math import ceil
+from typing import List
+
+from sqlalchemy import Sequence, func, select, text
+
+# most ids one request may reserve
+MAX_ID_RESERVATION = 1000
+# times a server assigned id that conflicts with an explicit one is replaced
+ID_CONFLICT_RETRIES = 3
+
+# only digit ids that fit a bigint can collide with the sequence
+NUMERIC_ID_PATTERN = "^[0-9]{1,18}$"
+
+
+def numeric_ids(landslideids) -> List[str]:
+    return [landslideid for landslideid in landslideids
+            if landslideid and landslideid.isascii() and landslideid.isdigit() and len(landslideid) <= 18]
+
+
+class IdAllocator:
+    def __init__(self, sequence: Sequence):
+        self.sequence = sequence
+        self.block_size = sequence.increment or 1
+        self._blocks = deque()  # [next, end) ranges not handed out yet
+        self._lock = threading.Lock()
+        # setval(..., false): the next nextval() returns the id after the highest explicit one,
+        # unless the sequence is already past it
+        self._advance_sql = text(f"""
+            SELECT setval('{sequence.name}', max(id) + 1, false)
+            FROM (
+                SELECT CAST(landslideid AS bigint) AS id
+                FROM unnest(CAST(:landslideids AS text[])) AS landslideid
+                WHERE landslideid ~ '{NUMERIC_ID_PATTERN}'
+            ) AS explicit
+            HAVING max(id) + 1 > (SELECT CASE WHEN is_called THEN last_value + {self.block_size} ELSE last_value END
+                                  FROM {sequence.name})
+        """)
+
+    def _take(self, count: int) -> List[int]:
+        ids = []
+        with self._lock:
+            while len(ids) < count and self._blocks:
+                start, end = self._blocks[0]
+                stop = min(end, start + count - len(ids))
+                ids.extend(range(start, stop))
+                if stop == end:
+                    self._blocks.popleft()
+                else:
+                    self._blocks[0] = (stop, end)
+        return ids
+
+    def _add_blocks(self, starts):
+        with self._lock:
+            for start in sorted(starts):
+                self._blocks.append((start, start + self.block_size))
+
+    def _next_blocks_query(self, missing: int):
+        # one nextval per block, all in a single round trip
+        blocks = ceil(missing / self.block_size)
+        return select(self.sequence.next_value()).select_from(func.generate_series(1, blocks))
+
+    async def reserve(self, db, count: int) -> List[int]:
+        ids = self._take(count)
+        # other requests can drain the new blocks while this one waits on the database, so loop
+        while len(ids) < count:
+            starts = (await db.scalars(self._next_blocks_query(count - len(ids)))).all()
+            self._add_blocks(starts)
+            ids += self._take(count - len(ids))
+        return ids
+
+    def reserve_sync(self, db, count: int) -> List[int]:
+        ids = self._take(count)
+        while len(ids) < count:
+            starts = db.scalars(self._next_blocks_query(count - len(ids))).all()
+            self._add_blocks(starts)
+            ids += self._take(count - len(ids))
+        return ids
+
+    async def advance_past(self, db, landslideids):
+        # after explicit landslideIDs were stored. setval() is not undone by a rollback
+        explicit = numeric_ids(landslideids)
+        if explicit:
+            await db.execute(self._advance_sql, {"landslideids": explicit})
+
+    def advance_past_sync(self, db, landslideids):
+        explicit = numeric_ids(landslideids)
+        if explicit:
+            db.execute(self._advance_sql, {"landslideids": explicit})
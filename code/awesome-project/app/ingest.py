@@ -0,0 +1,182 @@
+# app/ingest.py
+# helpers for the bulk upload endpoint: reads csv / geojson uploads row by row
+# and writes validated rows to data_import with COPY
+import csv
+import io
+import json
+from itertools import islice
+from typing import List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.exc import DataError
+from sqlalchemy.orm import Session
+
+from .clusters import GEOHASH_PRECISION
+from .facets import ADD_FACETS_SQL
+
+INGEST_CHUNK_SIZE = 5000
+
+# upload headers / geojson properties (lowercased) -> DataImportCreate field names
+FIELD_NAMES = {
+    "landslideid": "landslideID",
+    "latitude": "latitude",
+    "longitude": "longitude",
+    "lstype": "lsType",
+    "lssource": "lsSource",
+    "impact": "impact",
+    "wea13_id": "wea13_id",
+    "wea13_type": "wea13_type",
+    "user_id": "user_id",
+    "event_date": "event_date",
+}
+
+STAGE_COLUMNS = ["landslideid", "latitude", "longitude", "lstype", "lssource",
+                 "impact", "wea13_id", "wea13_type", "user_id", "event_date", "duplicate_of"]
+
+# rows are copied into a temp table first so the point geometry can be built by postgis
+# and rows whose landslideid already exists are skipped instead of failing the whole chunk
+CREATE_STAGE_SQL = text("""
+    CREATE TEMP TABLE IF NOT EXISTS data_import_stage (
+        landslideid text,
+        latitude double precision,
+        longitude double precision,
+        lstype text,
+        lssource text,
+        impact text,
+        wea13_id integer,
+        wea13_type text,
+        user_id text,
+        event_date date,
+        duplicate_of text
+    ) ON COMMIT DELETE ROWS
+""")
+
+COPY_STAGE_SQL = f"COPY data_import_stage ({', '.join(STAGE_COLUMNS)}) FROM STDIN WITH (FORMAT csv)"
+
+INSERT_FROM_STAGE_SQL = text("""
+    INSERT INTO data_import (landslideid, latitude, longitude, lstype, lssource, impact,
+                             wea13_id, wea13_type, coords, user_id, geohash, event_date, duplicate_of)
+    SELECT landslideid, latitude, longitude, lstype, lssource, impact,
+           wea13_id, wea13_type, point, user_id, ST_GeoHash(point, :geohash_precision), event_date, duplicate_of
+    FROM (
+        SELECT *, ST_SetSRID(ST_MakePoint(longitude, latitude), 4326) AS point
+        FROM data_import_stage
+    ) AS stage
+    ON CONFLICT (landslideid) DO NOTHING
+    RETURNING landslideid
+""")
+
+
+def _normalize(raw: dict) -> dict:
+    row = {}
+    for key, value in raw.items():
+        if key is None:
+            continue
+        field = FIELD_NAMES.get(key.strip().lower())
+        if field is None:
+            continue
+        if isinstance(value, str):
+            value = value.strip()
+        row[field] = None if value == "" else value
+    return row
+
+
+def read_csv_rows(fileobj):
+    # fileobj is the binary upload, wrapped so it is decoded as it is read
+    reader = csv.DictReader(io.TextIOWrapper(fileobj, encoding="utf-8-sig", newline=""))
+    try:
+        for raw in reader:
+            yield _normalize(raw)
+    except csv.Error as e:
+        raise ValueError(f"line {reader.line_num}: {e}")
+
+
+def read_geojson_rows(fileobj):
+    # a FeatureCollection has to be parsed as a whole, the features are then handed out one by one
+    collection = json.load(fileobj)
+    if not isinstance(collection, dict) or collection.get("type") != "FeatureCollection":
+        raise ValueError("GeoJSON upload must be a FeatureCollection")
+
+    for feature in collection.get("features") or []:
+        row = _normalize((feature or {}).get("properties") or {})
+        geometry = (feature or {}).get("geometry") or {}
+        if geometry.get("type") == "Point" and len(geometry.get("coordinates") or []) >= 2:
+            row["longitude"], row["latitude"] = geometry["coordinates"][:2]
+        else:
+            # leaves the row without a position so it is rejected by validation
+            row.pop("longitude", None)
+            row.pop("latitude", None)
+        yield row
+
+
+def chunked(iterable, size: int = INGEST_CHUNK_SIZE):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+INT32_MIN, INT32_MAX = -2**31, 2**31 - 1
+
+
+def check_row(data_import) -> Optional[str]:
+    # things the schema allows but the data_import table does not
+    if data_import.wea13_id is not None:
+        value = data_import.wea13_id.strip()
+        # int() alone also takes "1_000" and non-ascii digits, which postgres does not
+        if not value.isascii() or "_" in value:
+            return "wea13_id must be an integer"
+        try:
+            wea13_id = int(value)
+        except ValueError:
+            return "wea13_id must be an integer"
+        if not INT32_MIN <= wea13_id <= INT32_MAX:
+            return f"wea13_id must be between {INT32_MIN} and {INT32_MAX}"
+    return None
+
+
+def copy_rows(db: Session, rows, duplicate_of=None) -> List[str]:
+    # rows are validated DataImportCreate objects, duplicate_of the matching landslideid (or None)
+    # of each one from app/dedup.py. returns the landslideids inserted, rows whose landslideid is
+    # already taken are skipped
+    if duplicate_of is None:
+        duplicate_of = [None] * len(rows)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for rec, original in zip(rows, duplicate_of):
+        writer.writerow([
+            rec.landslideID, rec.latitude, rec.longitude, rec.lsType, rec.lsSource,
+            rec.impact, rec.wea13_id, rec.wea13_type, rec.user_id, rec.event_date, original,
+        ])
+    buffer.seek(0)
+
+    db.execute(CREATE_STAGE_SQL)
+    cursor = db.connection().connection.cursor()
+    try:
+        cursor.copy_expert(COPY_STAGE_SQL, buffer)
+    finally:
+        cursor.close()
+
+    inserted = db.execute(INSERT_FROM_STAGE_SQL, {"geohash_precision": GEOHASH_PRECISION}).scalars().all()
+    if inserted:
+        db.execute(ADD_FACETS_SQL, {"landslideids": inserted})
+    db.commit()
+    return inserted
+
+
+def copy_rows_one_by_one(db: Session, rows, duplicate_of=None):
+    # after a chunk was refused by the database: each row on its own so only the bad ones are
+    # lost. returns (landslideids inserted, [(position in rows, problem)])
+    if duplicate_of is None:
+        duplicate_of = [None] * len(rows)
+    inserted = []
+    failed = []
+    for i, (rec, original) in enumerate(zip(rows, duplicate_of)):
+        try:
+            inserted += copy_rows(db, [rec], [original])
+        except DataError as e:
+            db.rollback()
+            failed.append((i, str(e.orig).strip().splitlines()[0]))
+    return inserted, failed
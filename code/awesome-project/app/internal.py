@@ -0,0 +1,92 @@
+from fastapi import APIRouter
+
+from .hashing import hashing_pool
+from .database import sync_pool_stats, async_pool_stats
+from .tiles import tile_cache
+from .query_cache import query_cache
+from .regions import wea13_regions
+from .dedup import duplicate_checker
+from .metrics import render_stats
+
+# operational stats, not used by the frontend
+router = APIRouter(
+    prefix = '/internal',
+    tags = ['internal']
+)
+
+@router.get('/hashing')
+def hashing_stats():
+    return hashing_pool.stats()
+
+# checked out / idle connections, checkout wait times and connection churn per engine
+@router.get('/db-pool')
+def db_pool_stats():
+    return {
+        "sync": sync_pool_stats.snapshot(),
+        "async": async_pool_stats.snapshot(),
+    }
+
+# hit / miss / eviction counters of the in-process response caches
+@router.get('/caches')
+def cache_stats():
+    return {
+        "tiles": tile_cache.stats(),
+        "query_data_imports": query_cache.stats(),
+    }
+
+# the WEA13 region index loaded at startup and how many reports it has matched
+@router.get('/regions')
+def region_stats():
+    return wea13_regions.stats()
+
+# near duplicate checks at ingest and where the matches were found
+@router.get('/duplicates')
+def duplicate_stats():
+    return duplicate_checker.stats()
+
+# (stats key, metric name, type, help) for the /metrics collector below
+POOL_METRICS = [
+    ("pool_size", "db_pool_size", "gauge", "Configured connections kept in the pool."),
+    ("checked_out", "db_pool_checked_out", "gauge", "Connections currently checked out."),
+    ("idle", "db_pool_idle", "gauge", "Connections idle in the pool."),
+    ("overflow_in_use", "db_pool_overflow_in_use", "gauge", "Connections open beyond the pool size."),
+    ("checkouts", "db_pool_checkouts_total", "counter", "Connections handed out."),
+    ("wait_count", "db_pool_checkout_waits_total", "counter", "Checkouts that went through the pool queue."),
+    ("wait_seconds", "db_pool_checkout_wait_seconds_total", "counter", "Time spent waiting for a connection."),
+    ("checkout_failures", "db_pool_checkout_failures_total", "counter", "Checkouts that timed out or failed to connect."),
+    ("connections_opened", "db_pool_connections_opened_total", "counter", "Database connections opened."),
+    ("connections_closed", "db_pool_connections_closed_total", "counter", "Database connections closed."),
+    ("connections_invalidated", "db_pool_connections_invalidated_total", "counter", "Connections dropped as broken."),
+]
+
+CACHE_METRICS = [
+    ("entries", "cache_entries", "gauge", "Entries in the cache."),
+    ("bytes", "cache_bytes", "gauge", "Bytes held by the cache."),
+    ("hits", "cache_hits_total", "counter", "Cache lookups that found an entry."),
+    ("misses", "cache_misses_total", "counter", "Cache lookups that found nothing."),
+    ("evictions", "cache_evictions_total", "counter", "Entries evicted to stay under the size cap."),
+    ("hit_ratio", "cache_hit_ratio", "gauge", "Hits over lookups since start."),
+]
+
+HASHING_METRICS = [
+    ("queue_depth", "bcrypt_queue_depth", "gauge", "Bcrypt jobs waiting for a worker."),
+    ("running", "bcrypt_running", "gauge", "Bcrypt jobs running."),
+    ("rejected", "bcrypt_rejected_total", "counter", "Bcrypt jobs turned away because the queue was full."),
+]
+
+
+def _render_table(table, label_name: str, stats_by_label: dict):
+    lines = []
+    for key, name, metric_type, help_text in table:
+        samples = {label: stats[key] for label, stats in stats_by_label.items() if key in stats}
+        lines += render_stats(name, metric_type, help_text, label_name, samples)
+    return lines
+
+
+def stats_metrics():
+    # the numbers behind the /internal endpoints, read when /metrics is scraped
+    return (
+        _render_table(POOL_METRICS, "engine", {"sync": sync_pool_stats.snapshot(), "async": async_pool_stats.snapshot()})
+        + _render_table(CACHE_METRICS, "cache", {"tiles": tile_cache.stats(), "query_data_imports": query_cache.stats()})
+        + _render_table(HASHING_METRICS, "pool", {"bcrypt": hashing_pool.stats()})
+    )
@@ -0,0 +1,154 @@
+# app/metrics.py
+# prometheus text-format metrics for /metrics. kept dependency free and cheap enough to leave
+# on: a histogram observation is a bisect and three additions under a lock, and the pool / cache /
+# hashing numbers are only read from their existing stats() when /metrics is scraped.
+import threading
+import time
+from bisect import bisect_left
+
+from .profiling import current_timings
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+ROW_BUCKETS = (0, 1, 10, 100, 1000, 10_000, 100_000)
+
+
+def _labels(names, values) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, label_names=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        self._series = {}  # label values -> [per bucket counts (+inf last), sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = [(values, list(counts), total, count) for values, (counts, total, count) in self._series.items()]
+        for values, counts, total, count in sorted(series):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + ("+Inf",), counts):
+                cumulative += bucket_count
+                labels = _labels(self.label_names + ("le",), values + (bound,))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _labels(self.label_names, values)
+            lines.append(f"{self.name}_sum{labels} {total}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class Gauge:
+    def __init__(self, name: str, help_text: str, label_names=()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def add(self, amount: float, *label_values):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} gauge"]
+        with self._lock:
+            values = sorted(self._values.items())
+        lines += [f"{self.name}{_labels(self.label_names, labels)} {value}" for labels, value in values]
+        return lines
+
+
+def render_stats(name: str, metric_type: str, help_text: str, label_name: str, samples: dict):
+    # samples: label value -> number, for values read from an existing stats() dict at scrape time
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} {metric_type}"]
+    lines += [f'{name}{{{label_name}="{_escape(label)}"}} {value}' for label, value in samples.items()]
+    return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+        self.collectors = []  # callables returning exposition lines, run on every scrape
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector):
+        self.collectors.append(collector)
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics:
+            lines += metric.render()
+        for collector in self.collectors:
+            lines += collector()
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+request_duration = registry.register(Histogram(
+    "http_request_duration_seconds", "Time to the end of the response body, by route template.",
+    ("method", "route", "status")))
+requests_in_flight = registry.register(Gauge(
+    "http_requests_in_flight", "Requests currently being served.", ("method",)))
+rows_returned = registry.register(Histogram(
+    "db_rows_returned", "Rows a query endpoint turned into its response.", ("route",), buckets=ROW_BUCKETS))
+hashing_duration = registry.register(Histogram(
+    "bcrypt_duration_seconds", "Time one bcrypt job ran on the hashing pool.", ("operation",)))
+hashing_wait = registry.register(Histogram(
+    "bcrypt_queue_wait_seconds", "Time a bcrypt job waited for a hashing pool worker.", ("operation",)))
+
+
+class MetricsMiddleware:
+    # add it before ProfilingMiddleware so it runs inside it and can read the request's timings
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status_code = 500
+        started = time.perf_counter()
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        requests_in_flight.add(1, method)
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            requests_in_flight.add(-1, method)
+            # the route template keeps the label set small, unknown paths share one label
+            route = getattr(scope.get("route"), "path", "unmatched")
+            request_duration.observe(time.perf_counter() - started, method, route, str(status_code))
+            timings = current_timings.get()
+            if timings is not None and timings.rows is not None:
+                rows_returned.observe(timings.rows, route)
@@ -1,5 +1,5 @@
 # app/models.py
-from sqlalchemy import Column, Integer, String, Text
+from sqlalchemy import Column, Integer, BigInteger, String, Text, Float, Index, DateTime, Date, Sequence, DDL, event, func
 from .database import Base # Import Base from your database.py in the same package
 from geoalchemy2 import Geometry # This is for generic geometry columns
 
@@ -12,9 +12,9 @@ class DataImport(Base):
     # id: Primary key
     landslideid = Column(String, primary_key=True, index=True)
 
-    latitude = Column(String)
+    latitude = Column(Float)
 
-    longitude = Column(String)
+    longitude = Column(Float)
 
     lstype = Column(String)
 
@@ -26,10 +26,24 @@ class DataImport(Base):
 
     wea13_type = Column(String, nullable = True)
 
-    coords = Column(Geometry(geometry_type='POINT', srid=4326))
+    # GiST indexed (idx_data_import_coords), every bbox / spatial filter should go through coords
+    coords = Column(Geometry(geometry_type='POINT', srid=4326, spatial_index=True))
 
     user_id = Column(String, nullable = True)
 
+    # geohash of coords, prefixes of it are the /clusters grid cells
+    geohash = Column(String(8), nullable = True, index=True)
+
+    # when the report reached us, set by the database on insert. rows older than
+    # migrations/004_report_times.sql have their event_date here, or NULL if they had none
+    reported_at = Column(DateTime(timezone=True), nullable = False, server_default=func.now())
+
+    # when the landslide happened, if the reporter knows
+    event_date = Column(Date, nullable = True, index=True)
+
+    # set when the report was stored as a near duplicate of this landslideid (app/dedup.py)
+    duplicate_of = Column(String, nullable = True)
+
 
     def __repr__(self):
         return (f"<DataImport(landslideid={self.landslideid}, latitude={self.latitude}, longitude={self.longitude},"
@@ -37,6 +51,56 @@ class DataImport(Base):
                 f"wea13_type={self.wea13_type}, coords={self.coords})>")
     
 
+# for radius / nearest neighbour searches in metres (ST_DWithin and <-> on geography)
+Index('idx_data_import_coords_geography', func.geography(DataImport.coords), postgresql_using='gist')
+
+# rows are appended in reported_at order, so a tiny BRIN index covers time window scans
+Index('brin_data_import_reported_at', DataImport.reported_at, postgresql_using='brin')
+
+# new landslide ids (app/ids.py), each nextval() reserves a block of 100.
+# starts after the ids already in the table, see migrations/005_landslide_id_seq.sql
+landslide_id_seq = Sequence('landslide_id_seq', start=100090, increment=100, metadata=Base.metadata)
+
+# bumped after every write, /query-data-imports/ cache entries and ETags carry it (app/query_cache.py)
+data_version_seq = Sequence('data_version_seq', metadata=Base.metadata)
+
+# landslide id typeahead (/data-imports/suggest): LIKE 'prefix%' goes through the pattern ops
+# b-tree whatever the database collation, fuzzy matches through the trigram index, whose GiST
+# form also orders by similarity (<->) from the index. see migrations/007_landslideid_search.sql
+Index('ix_data_import_landslideid_pattern', DataImport.landslideid,
+      postgresql_ops={'landslideid': 'text_pattern_ops'})
+Index('ix_data_import_landslideid_trgm', DataImport.landslideid,
+      postgresql_using='gist', postgresql_ops={'landslideid': 'gist_trgm_ops'})
+event.listen(Base.metadata, 'before_create', DDL('CREATE EXTENSION IF NOT EXISTS pg_trgm'))
+
+# flagged near duplicates waiting for review are few, only they are indexed
+Index('ix_data_import_duplicate_of', DataImport.duplicate_of, postgresql_where=DataImport.duplicate_of.isnot(None))
+
+# edge cells of a /stats/facets bbox are counted from the rows (app/facets.py FACET_PRECISION)
+Index('ix_data_import_geohash_cell', func.left(DataImport.geohash, 4))
+
+
+# facet counts per geohash cell prefix, kept up to date by the write paths (app/facets.py)
+class DataImportFacet(Base):
+
+    __tablename__ = "data_import_facets"
+
+    # geohash cell of length 4, coarser cells are summed from them (app/facets.py)
+    cell = Column(String(4), primary_key = True)
+
+    # lstype, lssource, impact or wea13_type
+    facet = Column(String, primary_key = True)
+
+    value = Column(String, primary_key = True)
+
+    count = Column(BigInteger, nullable = False)
+
+# the coarser cells of a /stats/facets cover are sums over these prefixes
+Index('ix_data_import_facets_cell_1', func.left(DataImportFacet.cell, 1))
+Index('ix_data_import_facets_cell_2', func.left(DataImportFacet.cell, 2))
+Index('ix_data_import_facets_cell_3', func.left(DataImportFacet.cell, 3))
+
+
 class UserInfo (Base):
 
     __tablename__ = "user_info"
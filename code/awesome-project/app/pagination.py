@@ -0,0 +1,24 @@
+# app/pagination.py
+# keyset pagination on the landslideid primary key. the cursor handed to clients is
+# the last landslideid of a page, base64 encoded so clients treat it as opaque
+import base64
+import binascii
+
+DEFAULT_PAGE_SIZE = 1000
+MAX_PAGE_SIZE = 10000
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(last_landslideid: str) -> str:
+    return base64.urlsafe_b64encode(last_landslideid.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> str:
+    padded = cursor + "=" * (-len(cursor) % 4)
+    try:
+        return base64.b64decode(padded.encode("ascii"), altchars=b"-_", validate=True).decode("utf-8")
+    except (binascii.Error, UnicodeError, ValueError):
+        raise InvalidCursor("Invalid pagination cursor.")
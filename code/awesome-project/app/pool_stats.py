@@ -0,0 +1,89 @@
+# app/pool_stats.py
+# counters for a SQLAlchemy connection pool: how long requests wait for a connection,
+# how many are checked out / idle and how often connections are opened and closed
+import threading
+import time
+
+from sqlalchemy import event
+
+
+class PoolStats:
+    def __init__(self, name: str):
+        self.name = name
+        self.pool = None
+        self.checkouts = 0
+        self.wait_count = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self.checkout_failures = 0
+        self.connections_opened = 0
+        self.connections_closed = 0
+        self.connections_invalidated = 0
+        self._lock = threading.Lock()
+
+    def record_wait(self, seconds: float, failed: bool = False):
+        with self._lock:
+            self.wait_count += 1
+            self.wait_seconds += seconds
+            self.max_wait_seconds = max(self.max_wait_seconds, seconds)
+            if failed:
+                self.checkout_failures += 1
+
+    def _count(self, attribute: str):
+        with self._lock:
+            setattr(self, attribute, getattr(self, attribute) + 1)
+
+    def attach(self, engine):
+        # engine is a sync Engine (use async_engine.sync_engine for async ones)
+        self.pool = engine.pool
+        event.listen(engine, "connect", lambda *args: self._count("connections_opened"))
+        event.listen(engine, "close", lambda *args: self._count("connections_closed"))
+        event.listen(engine, "close_detached", lambda *args: self._count("connections_closed"))
+        event.listen(engine, "invalidate", lambda *args: self._count("connections_invalidated"))
+        event.listen(engine, "checkout", lambda *args: self._count("checkouts"))
+        event.listen(engine, "engine_disposed", lambda *args: setattr(self, "pool", engine.pool))
+
+    def snapshot(self) -> dict:
+        pool = self.pool
+        with self._lock:
+            stats = {
+                "checkouts": self.checkouts,
+                "wait_count": self.wait_count,
+                "avg_wait_ms": 1000 * self.wait_seconds / self.wait_count if self.wait_count else 0.0,
+                "max_wait_ms": 1000 * self.max_wait_seconds,
+                "wait_seconds": self.wait_seconds,
+                "checkout_failures": self.checkout_failures,
+                "connections_opened": self.connections_opened,
+                "connections_closed": self.connections_closed,
+                "connections_invalidated": self.connections_invalidated,
+            }
+        if pool is not None and hasattr(pool, "checkedout"):
+            stats.update({
+                "pool_size": pool.size(),
+                "checked_out": pool.checkedout(),
+                "idle": pool.checkedin(),
+                # queue pools count overflow from -pool_size, so size + overflow is what is open now
+                "open": pool.size() + pool.overflow(),
+                "overflow_in_use": max(0, pool.overflow()),
+            })
+        return stats
+
+
+def timed_pool_class(base, stats: PoolStats):
+    # subclass of a queue pool that times how long each checkout waits for a connection.
+    # pool.recreate() (engine.dispose()) builds the same class again, so the timing survives it
+    class TimedPool(base):
+        def _do_get(self):
+            started = time.perf_counter()
+            failed = False
+            try:
+                return super()._do_get()
+            except Exception:
+                # pool timeout or the database refusing new connections
+                failed = True
+                raise
+            finally:
+                stats.record_wait(time.perf_counter() - started, failed)
+
+    TimedPool.__name__ = f"Timed{base.__name__}"
+    return TimedPool
@@ -0,0 +1,218 @@
+# app/profiling.py
+# per-request timing. every query through an instrumented engine is counted and timed, code
+# can time its own phases with `with phase("serialize"):`, and the breakdown goes back to the
+# client in a Server-Timing header (shown in the browser's network panel).
+# with PROFILE_SLOW_MS set, a sample of requests also runs under cProfile and the profile of
+# any that took longer than the threshold is written to PROFILE_DIR (open with pstats/snakeviz).
+# cProfile only sees the thread that enabled it. sync endpoints run in the threadpool, so they
+# are decorated with @profiled_in_thread and their streamed bodies wrapped in
+# profiled_iterator(): each piece of threadpool work gets its own profile, and all of them are
+# added to the event loop's in the one dump.
+import contextvars
+import cProfile
+import functools
+import os
+import pstats
+import random
+import re
+import threading
+import time
+from contextlib import contextmanager
+
+from sqlalchemy import event
+
+SERVER_TIMING = os.getenv("SERVER_TIMING", "true").lower() in ("1", "true", "yes")
+PROFILE_SLOW_MS = float(os.getenv("PROFILE_SLOW_MS", 0))  # 0 turns profiling off
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", 0.05))  # share of requests profiled
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+
+
+class RequestTimings:
+    def __init__(self):
+        self.db_queries = 0
+        self.db_seconds = 0.0
+        self.rows = None  # rows turned into the response, for endpoints that call count_rows()
+        self.phases = {}  # name -> seconds, in the order they first ran
+
+    def add_phase(self, name: str, seconds: float):
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    def server_timing(self, app_seconds: float) -> str:
+        metrics = [f'db;dur={self.db_seconds * 1000:.2f};desc="{self.db_queries} queries"']
+        metrics += [f"{name};dur={seconds * 1000:.2f}" for name, seconds in self.phases.items()]
+        metrics.append(f"app;dur={app_seconds * 1000:.2f}")
+        return ", ".join(metrics)
+
+
+current_timings = contextvars.ContextVar("current_timings", default=None)
+
+
+@contextmanager
+def phase(name: str):
+    timings = current_timings.get()
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        if timings is not None:
+            timings.add_phase(name, time.perf_counter() - started)
+
+
+def count_rows(rows: int):
+    # every endpoint that reads rows from data_import (or its summaries) calls this with the
+    # rows its queries returned, answers from a cache count none
+    timings = current_timings.get()
+    if timings is not None:
+        timings.rows = (timings.rows or 0) + rows
+
+
+def track_sql(engine):
+    # engine is a sync Engine (use async_engine.sync_engine for async ones). the async driver runs
+    # these events inside the request's context, so both engines report to the same request
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info["query_started"].pop()
+        timings = current_timings.get()
+        if timings is not None:
+            timings.db_queries += 1
+            timings.db_seconds += time.perf_counter() - started
+
+
+class RequestProfile:
+    # the profiles of one sampled request: the event loop thread's, and one per piece of
+    # threadpool work
+    def __init__(self):
+        self.loop_thread = threading.get_ident()
+        self.profiles = [cProfile.Profile()]
+        self._lock = threading.Lock()
+
+    def add(self, profile: cProfile.Profile):
+        with self._lock:
+            self.profiles.append(profile)
+
+    def stats(self) -> pstats.Stats:
+        with self._lock:
+            profiles = [profile for profile in self.profiles if profile.getstats()]
+        return pstats.Stats(*profiles)
+
+
+current_profile = contextvars.ContextVar("current_profile", default=None)
+
+
+@contextmanager
+def thread_profile():
+    # profiles the current worker thread if the request is sampled. the event loop thread is
+    # profiled already, a second profiler there would replace the first
+    request_profile = current_profile.get()
+    if request_profile is None or threading.get_ident() == request_profile.loop_thread:
+        yield
+        return
+    profile = cProfile.Profile()
+    profile.enable()
+    try:
+        yield
+    finally:
+        profile.disable()
+        request_profile.add(profile)
+
+
+def profiled_in_thread(endpoint):
+    # for sync (def) endpoints, which fastapi calls in the threadpool
+    @functools.wraps(endpoint)
+    def wrapper(*args, **kwargs):
+        with thread_profile():
+            return endpoint(*args, **kwargs)
+    return wrapper
+
+
+def profiled_iterator(iterator):
+    # the body of a StreamingResponse from a sync endpoint. starlette pulls every item in a
+    # threadpool call of its own, so each next() is profiled on its own
+    iterator = iter(iterator)
+    while True:
+        with thread_profile():
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+        yield item
+
+
+class SlowRequestProfiler:
+    # cProfile sees the whole thread, so other requests served by the event loop meanwhile
+    # show up in the profile too. one profile runs at a time.
+    def __init__(self, slow_ms: float = PROFILE_SLOW_MS, sample_rate: float = PROFILE_SAMPLE_RATE,
+                 directory: str = PROFILE_DIR):
+        self.slow_ms = slow_ms
+        self.sample_rate = sample_rate
+        self.directory = directory
+        self.dumped = 0
+        self._busy = threading.Lock()
+
+    def start(self):
+        # a RequestProfile with the event loop thread's profile running, or None when this
+        # request is not sampled
+        if not self.slow_ms or random.random() >= self.sample_rate:
+            return None
+        if not self._busy.acquire(blocking=False):
+            return None
+        request_profile = RequestProfile()
+        request_profile.profiles[0].enable()
+        return request_profile
+
+    def finish(self, request_profile: RequestProfile, method: str, path: str, elapsed_ms: float):
+        request_profile.profiles[0].disable()
+        try:
+            if elapsed_ms < self.slow_ms:
+                return
+            os.makedirs(self.directory, exist_ok=True)
+            name = re.sub(r"[^A-Za-z0-9]+", "_", path).strip("_") or "root"
+            filename = f"{time.strftime('%Y%m%d-%H%M%S')}-{method}-{name}-{elapsed_ms:.0f}ms.prof"
+            request_profile.stats().dump_stats(os.path.join(self.directory, filename))
+            self.dumped += 1
+        finally:
+            self._busy.release()
+
+
+slow_request_profiler = SlowRequestProfiler()
+
+
+class ProfilingMiddleware:
+    # plain ASGI so the timings contextvar is set in the same context the endpoint runs in.
+    # headers leave before a streamed body, so Server-Timing on a StreamingResponse only covers
+    # the work done before the first chunk
+    def __init__(self, app, server_timing: bool = SERVER_TIMING, profiler: SlowRequestProfiler = slow_request_profiler):
+        self.app = app
+        self.server_timing = server_timing
+        self.profiler = profiler
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings = RequestTimings()
+        token = current_timings.set(timings)
+        started = time.perf_counter()
+        profiler = self.profiler.start()
+        profile_token = current_profile.set(profiler)
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start" and self.server_timing:
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", timings.server_timing(time.perf_counter() - started).encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            current_timings.reset(token)
+            current_profile.reset(profile_token)
+            if profiler is not None:
+                elapsed_ms = (time.perf_counter() - started) * 1000
+                self.profiler.finish(profiler, scope["method"], scope["path"], elapsed_ms)
@@ -0,0 +1,117 @@
+# app/query_cache.py
+# cache for /query-data-imports/ response bodies. entries are keyed by the filter hash and the
+# data version, so a write makes all older entries (and ETags) stale at once without tracking
+# which results it touched.
+# the version is data_version_seq in the database, shared by every worker and kept across
+# restarts. write paths bump it with nextval() right after their commit: a sequence takes no
+# row lock, so writers do not queue on it, and bumping after the commit means a reader that sees
+# the new version also sees the new rows. readers look it up at most every
+# QUERY_CACHE_VERSION_TTL seconds, this process's own writes are seen at once.
+import os
+import threading
+import time
+from typing import Optional
+
+from sqlalchemy import text
+
+from .cache import LRUCache
+
+# 0 turns the cache off, every request runs the query
+QUERY_CACHE_MAX_BYTES = int(os.getenv("QUERY_CACHE_MAX_BYTES", 32 * 1024 * 1024))
+# how long another worker's write can go unnoticed, 0 reads the version for every request
+QUERY_CACHE_VERSION_TTL = float(os.getenv("QUERY_CACHE_VERSION_TTL", 1.0))
+
+# 0 until the first nextval(), which returns 1
+READ_VERSION_SQL = text("SELECT CASE WHEN is_called THEN last_value ELSE 0 END FROM data_version_seq")
+# nextval() is not undone by a rollback, the caller does not need to commit after it
+BUMP_VERSION_SQL = text("SELECT nextval('data_version_seq')")
+
+
+class QueryCache:
+    def __init__(self, max_bytes: int = QUERY_CACHE_MAX_BYTES, version_ttl: float = QUERY_CACHE_VERSION_TTL):
+        self._cache = LRUCache(max_bytes)
+        self.version_ttl = version_ttl
+        self.version = 0
+        self.version_reads = 0
+        self.not_modified = 0
+        self._read_at = None
+        self._bumped_at = None
+        self._lock = threading.Lock()
+
+    def _seen(self, version: int, read_started: Optional[float] = None):
+        # any change invalidates, a sequence reset or a database restore can move it backwards.
+        # a read that started before this process's last bump may return the version from before
+        # it, that one is dropped rather than undoing the bump
+        with self._lock:
+            if read_started is not None and self._bumped_at is not None and read_started < self._bumped_at:
+                return
+            changed = version != self.version
+            if changed:
+                self.version = version
+            self._read_at = time.monotonic()
+            if read_started is None:
+                self._bumped_at = self._read_at
+        # entries for other versions can never be hit again
+        if changed:
+            self._cache.clear()
+
+    def _expired(self) -> bool:
+        with self._lock:
+            return self._read_at is None or time.monotonic() - self._read_at >= self.version_ttl
+
+    async def current_version(self, db) -> int:
+        if self._expired():
+            read_started = time.monotonic()
+            version = await db.scalar(READ_VERSION_SQL)
+            with self._lock:
+                self.version_reads += 1
+            self._seen(version, read_started)
+        return self.version
+
+    async def bump_version(self, db) -> int:
+        # call after the write committed. returns the new version
+        version = await db.scalar(BUMP_VERSION_SQL)
+        self._seen(version)
+        return version
+
+    def bump_version_sync(self, db) -> int:
+        version = db.scalar(BUMP_VERSION_SQL)
+        self._seen(version)
+        return version
+
+    def etag(self, version: int, filters_key: str) -> str:
+        return f'"{version}-{filters_key}"'
+
+    def is_fresh(self, if_none_match, etag: str, exists: bool = False) -> bool:
+        # If-None-Match may list several tags, or be "*". "*" matches any representation, so it
+        # only counts once the caller knows there is one (the query did not end in a 404)
+        if not if_none_match:
+            return False
+        tags = [tag.strip() for tag in if_none_match.split(",")]
+        fresh = (exists and "*" in tags) or etag in tags or f"W/{etag}" in tags
+        if fresh:
+            with self._lock:
+                self.not_modified += 1
+        return fresh
+
+    def get(self, version: int, filters_key: str):
+        # (body, next cursor) or None
+        return self._cache.get((version, filters_key))
+
+    def put(self, version: int, filters_key: str, body: bytes, next_cursor):
+        self._cache.put((version, filters_key), (body, next_cursor), size=len(body))
+
+    def clear(self):
+        # after rows were written without a bump: drops every entry and reads the version again
+        with self._lock:
+            self._read_at = None
+            self._bumped_at = None
+        self._cache.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"version": self.version, "version_reads": self.version_reads,
+                    "not_modified": self.not_modified, **self._cache.stats()}
+
+
+query_cache = QueryCache()
@@ -0,0 +1,205 @@
+# app/regions.py
+# WEA13 region lookup. the region polygons are loaded once at startup into a shapely STRtree and
+# every new report takes wea13_id / wea13_type from the region its point falls in, instead of
+# what the reporter typed. points outside every region keep the typed values.
+# regions come from a GeoJSON FeatureCollection (WEA13_REGIONS_PATH) of Polygon / MultiPolygon
+# features with wea13_id and wea13_type properties. without it nothing is reassigned.
+#
+#   python -m app.regions --backfill    reassign the rows already in data_import
+import argparse
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple
+
+import numpy as np
+import shapely
+from shapely import STRtree
+from sqlalchemy import text
+
+WEA13_REGIONS_PATH = os.getenv("WEA13_REGIONS_PATH", "")
+BACKFILL_CHUNK_ROWS = int(os.getenv("WEA13_BACKFILL_CHUNK_ROWS", 20_000))
+BACKFILL_WORKERS = int(os.getenv("WEA13_BACKFILL_WORKERS", min(4, os.cpu_count() or 1)))
+
+# keyset pages of data_import for the backfill
+BACKFILL_PAGE_SQL = text("""
+    SELECT landslideid, longitude, latitude
+    FROM data_import
+    WHERE landslideid > :after AND longitude IS NOT NULL AND latitude IS NOT NULL
+    ORDER BY landslideid
+    LIMIT :limit
+""")
+
+# only rows whose region actually changed are written
+BACKFILL_UPDATE_SQL = text("""
+    UPDATE data_import AS d
+    SET wea13_id = v.wea13_id, wea13_type = v.wea13_type
+    FROM unnest(CAST(:landslideids AS varchar[]), CAST(:wea13_ids AS integer[]),
+                CAST(:wea13_types AS varchar[])) AS v(landslideid, wea13_id, wea13_type)
+    WHERE d.landslideid = v.landslideid
+      AND (d.wea13_id, d.wea13_type) IS DISTINCT FROM (v.wea13_id, v.wea13_type)
+""")
+
+Region = Tuple[int, Optional[str]]
+
+
+class RegionIndex:
+    def __init__(self):
+        self.tree = None
+        self.regions: List[Region] = []
+        self.path = None
+        self.loaded_seconds = 0.0
+        self.assigned = 0
+        self.unmatched = 0
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self.tree is not None
+
+    def load_features(self, features: list):
+        geometries, regions = [], []
+        for feature in features:
+            properties = feature.get("properties") or {}
+            if feature.get("geometry") is None or properties.get("wea13_id") is None:
+                continue
+            geometries.append(shapely.from_geojson(json.dumps(feature["geometry"])))
+            regions.append((int(properties["wea13_id"]), properties.get("wea13_type")))
+
+        geometries = np.array(geometries, dtype=object)
+        # prepared polygons make the point-in-polygon tests after the tree lookup much cheaper
+        shapely.prepare(geometries)
+        self.tree = STRtree(geometries)
+        self.regions = regions
+
+    def load(self, path: str = WEA13_REGIONS_PATH):
+        if not path:
+            return
+        started = time.perf_counter()
+        with open(path, encoding="utf-8") as f:
+            collection = json.load(f)
+        if collection.get("type") != "FeatureCollection":
+            raise ValueError(f"{path} is not a GeoJSON FeatureCollection")
+        self.load_features(collection.get("features") or [])
+        self.path = path
+        self.loaded_seconds = time.perf_counter() - started
+
+    def lookup(self, longitudes, latitudes) -> List[Optional[Region]]:
+        # one vectorized tree query for all the points. a point on a shared border is in
+        # both regions, the one listed first in the file wins
+        if not self.loaded or len(longitudes) == 0:
+            return [None] * len(longitudes)
+
+        points = shapely.points(np.asarray(longitudes, dtype=float), np.asarray(latitudes, dtype=float))
+        point_index, region_index = self.tree.query(points, predicate="intersects")
+        order = np.lexsort((region_index, point_index))
+        point_index, region_index = point_index[order], region_index[order]
+        first_points, first = np.unique(point_index, return_index=True)
+
+        found: List[Optional[Region]] = [None] * len(longitudes)
+        for point, region in zip(first_points.tolist(), region_index[first].tolist()):
+            found[point] = self.regions[region]
+
+        with self._lock:
+            self.assigned += len(first_points)
+            self.unmatched += len(longitudes) - len(first_points)
+        return found
+
+    def assign(self, reports) -> None:
+        # reports are DataImportCreate objects, updated in place
+        if not self.loaded:
+            return
+        found = self.lookup([rec.longitude for rec in reports], [rec.latitude for rec in reports])
+        for rec, region in zip(reports, found):
+            if region is not None:
+                rec.wea13_id = str(region[0])
+                rec.wea13_type = region[1]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "loaded": self.loaded,
+                "path": self.path,
+                "regions": len(self.regions),
+                "load_ms": 1000 * self.loaded_seconds,
+                "assigned": self.assigned,
+                "unmatched": self.unmatched,
+            }
+
+
+wea13_regions = RegionIndex()
+
+
+def _backfill_chunk(engine, regions: RegionIndex, rows) -> int:
+    found = regions.lookup([row.longitude for row in rows], [row.latitude for row in rows])
+    matched = [(row.landslideid, region) for row, region in zip(rows, found) if region is not None]
+    if not matched:
+        return 0
+    with engine.begin() as conn:
+        return conn.execute(BACKFILL_UPDATE_SQL, {
+            "landslideids": [landslideid for landslideid, _ in matched],
+            "wea13_ids": [region[0] for _, region in matched],
+            "wea13_types": [region[1] for _, region in matched],
+        }).rowcount
+
+
+def backfill(engine, regions: RegionIndex, chunk_rows: int = BACKFILL_CHUNK_ROWS,
+             workers: int = BACKFILL_WORKERS) -> dict:
+    # one connection pages through the table, chunks are matched and written on worker threads
+    # (shapely and the database driver both release the GIL) with their own connections.
+    # at most two chunks per worker are held in memory
+    scanned = 0
+    updated = 0
+    in_flight = []
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="wea13-backfill") as executor:
+        with engine.connect() as conn:
+            after = ""
+            while True:
+                rows = conn.execute(BACKFILL_PAGE_SQL, {"after": after, "limit": chunk_rows}).all()
+                if not rows:
+                    break
+                after = rows[-1].landslideid
+                scanned += len(rows)
+                in_flight.append(executor.submit(_backfill_chunk, engine, regions, rows))
+                if len(in_flight) >= 2 * workers:
+                    updated += in_flight.pop(0).result()
+        for future in in_flight:
+            updated += future.result()
+    return {"scanned": scanned, "updated": updated}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="assign WEA13 regions to the rows already in data_import")
+    parser.add_argument("--backfill", action="store_true", help="reassign wea13_id / wea13_type of every row")
+    parser.add_argument("--regions", default=WEA13_REGIONS_PATH, help="GeoJSON FeatureCollection of the regions")
+    parser.add_argument("--chunk-rows", type=int, default=BACKFILL_CHUNK_ROWS)
+    parser.add_argument("--workers", type=int, default=BACKFILL_WORKERS)
+    args = parser.parse_args()
+    if not args.backfill:
+        parser.print_help()
+        return
+    if not args.regions:
+        parser.error("set WEA13_REGIONS_PATH or pass --regions")
+
+    from .database import engine, SessionLocal
+    from . import facets
+    from .query_cache import BUMP_VERSION_SQL
+
+    regions = RegionIndex()
+    regions.load(args.regions)
+    started = time.perf_counter()
+    result = backfill(engine, regions, args.chunk_rows, args.workers)
+    # wea13_type is one of the facets
+    if result["updated"]:
+        with SessionLocal() as db:
+            facets.rebuild(db)
+            # cached /query-data-imports/ results still have the old regions
+            db.execute(BUMP_VERSION_SQL)
+    print(f"{len(regions.regions)} regions, {result['scanned']:,} rows scanned, {result['updated']:,} updated "
+          f"in {time.perf_counter() - started:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
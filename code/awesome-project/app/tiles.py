@@ -0,0 +1,87 @@
+# app/tiles.py
+# web mercator tile helpers and the cache for the /tiles endpoint. the cache follows the data
+# version of app/query_cache.py: a write by this process drops the tiles around its point, a
+# version change it did not make (another worker's write, a restored database) drops them all
+import hashlib
+import json
+import math
+import os
+import threading
+
+from .cache import LRUCache
+
+MAX_ZOOM = 22
+
+# web mercator stops at about +-85.0511 degrees
+MAX_LATITUDE = 85.0511287798
+
+TILE_CACHE_MAX_BYTES = int(os.getenv("TILE_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+
+
+def is_valid_tile(z: int, x: int, y: int) -> bool:
+    return 0 <= z <= MAX_ZOOM and 0 <= x < 2 ** z and 0 <= y < 2 ** z
+
+
+def lonlat_to_tile(lon: float, lat: float, z: int):
+    n = 2 ** z
+    lat = max(min(lat, MAX_LATITUDE), -MAX_LATITUDE)
+    x = int((lon + 180.0) / 360.0 * n)
+    y = int((1.0 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2.0 * n)
+    return min(max(x, 0), n - 1), min(max(y, 0), n - 1)
+
+
+def filter_hash(filters: dict) -> str:
+    # filters with no value are left out so "not given" and "None" hash the same
+    given = {name: value for name, value in filters.items() if value is not None}
+    # dates and datetimes hash by their string form
+    return hashlib.sha1(json.dumps(given, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+class TileCache:
+    # keys are (z, x, y, filter hash)
+    def __init__(self, max_bytes: int = TILE_CACHE_MAX_BYTES):
+        self._cache = LRUCache(max_bytes)
+        self.version = None
+        self.version_clears = 0
+        self._lock = threading.Lock()
+
+    def observe(self, version: int):
+        # the data version a request read before using the cache
+        with self._lock:
+            changed = version != self.version
+            self.version = version
+            if changed:
+                self.version_clears += 1
+        if changed:
+            self._cache.clear()
+
+    def get(self, z: int, x: int, y: int, filters_key: str):
+        return self._cache.get((z, x, y, filters_key))
+
+    def put(self, z: int, x: int, y: int, filters_key: str, tile: bytes):
+        self._cache.put((z, x, y, filters_key), tile)
+
+    def invalidate_point(self, lon: float, lat: float, version=None) -> int:
+        # drops only the cached tiles (at any zoom, for any filters) that contain the point.
+        # version is the one the write bumped the data version to: when that bump is the only
+        # change since the version the cache is at, the cache moves to it without being cleared
+        def contains_point(key):
+            z, x, y, _ = key
+            return lonlat_to_tile(lon, lat, z) == (x, y)
+
+        dropped = self._cache.pop_matching(contains_point)
+        with self._lock:
+            if version is not None and self.version is not None and version == self.version + 1:
+                self.version = version
+        return dropped
+
+    def clear(self):
+        self._cache.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            version_clears = self.version_clears
+        return {**self._cache.stats(), "version_clears": version_clears}
+
+
+tile_cache = TileCache()
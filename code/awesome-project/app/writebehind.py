@@ -0,0 +1,116 @@
+# app/writebehind.py
+# group commit for report submissions. concurrent submits are queued in-process and written
+# by one task as a single multi-row insert and commit, every WRITE_BEHIND_FLUSH_MS or as soon
+# as WRITE_BEHIND_BATCH_SIZE rows are waiting. a submit only returns once its batch has been
+# committed, so a report acknowledged to the client is as durable as with a commit per request.
+import asyncio
+import os
+
+WRITE_BEHIND = os.getenv("WRITE_BEHIND", "false").lower() in ("1", "true", "yes")
+WRITE_BEHIND_FLUSH_MS = float(os.getenv("WRITE_BEHIND_FLUSH_MS", 5))
+WRITE_BEHIND_BATCH_SIZE = int(os.getenv("WRITE_BEHIND_BATCH_SIZE", 100))
+
+
+class WriteBehindQueue:
+    def __init__(self, write_batch, flush_ms: float = WRITE_BEHIND_FLUSH_MS,
+                 batch_size: int = WRITE_BEHIND_BATCH_SIZE):
+        # write_batch(items) writes and commits all items in one transaction and returns one
+        # result per item, in order. if it raises, the items are retried one at a time so a bad
+        # row (a duplicate landslideID) only fails its own submit
+        self.write_batch = write_batch
+        self.flush_seconds = flush_ms / 1000
+        self.batch_size = batch_size
+        self.batches = 0
+        self.rows = 0
+        self.fallbacks = 0
+        self._pending = []
+        self._task = None
+        self._stopping = False
+
+    def start(self):
+        self._stopping = False
+        self._wakeup = asyncio.Event()
+        self._full = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        # writes whatever is still queued before returning
+        if self._task is None:
+            return
+        self._stopping = True
+        self._wakeup.set()
+        self._full.set()
+        await self._task
+        self._task = None
+
+    async def submit(self, item):
+        if self._task is None or self._stopping:
+            raise RuntimeError("write-behind queue is not running")
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((item, future))
+        self._wakeup.set()
+        if len(self._pending) >= self.batch_size:
+            self._full.set()
+        return await future
+
+    async def _run(self):
+        while True:
+            if not self._pending:
+                if self._stopping:
+                    return
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            # give other submits up to the flush interval to join this batch
+            if len(self._pending) < self.batch_size and not self._stopping:
+                self._full.clear()
+                try:
+                    await asyncio.wait_for(self._full.wait(), self.flush_seconds)
+                except asyncio.TimeoutError:
+                    pass
+
+            batch, self._pending = self._pending[:self.batch_size], self._pending[self.batch_size:]
+            await self._flush(batch)
+
+    async def _flush(self, batch):
+        try:
+            results = await self.write_batch([item for item, _ in batch])
+        except Exception as e:
+            if len(batch) == 1:
+                _resolve(batch[0][1], exception=e)
+                return
+            self.fallbacks += 1
+            for item, future in batch:
+                try:
+                    [result] = await self.write_batch([item])
+                except Exception as e:
+                    _resolve(future, exception=e)
+                else:
+                    _resolve(future, result)
+            return
+
+        self.batches += 1
+        self.rows += len(batch)
+        for (_, future), result in zip(batch, results):
+            _resolve(future, result)
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self._task is not None,
+            "pending": len(self._pending),
+            "batches": self.batches,
+            "rows": self.rows,
+            "avg_batch_rows": self.rows / self.batches if self.batches else 0.0,
+            "fallbacks": self.fallbacks,
+        }
+
+
+def _resolve(future, result=None, exception=None):
+    # the caller may have gone away (client disconnected), its row is still written
+    if future.done():
+        return
+    if exception is not None:
+        future.set_exception(exception)
+    else:
+        future.set_result(result)
@@ -0,0 +1,150 @@
+# benchmarks/async_vs_sync.py
+# requests/s for /query-data-imports/ through the old path (async def handler using the sync
+# Session, so every query blocks the event loop) and the current AsyncSession path, at 200
+# concurrent clients. each app runs in its own single worker uvicorn process.
+# the current app runs with the query cache off (QUERY_CACHE_MAX_BYTES=0): the legacy app has
+# none, and after the warm up every request for the same query string would be a cache hit.
+#
+#   DATABASE_URL=postgresql://... python -m benchmarks.async_vs_sync --clients 200 --duration 30
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+
+import httpx
+
+from benchmarks.stats import summarize
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def legacy_app():
+    # the query endpoint as it was before the async port
+    from fastapi import FastAPI, Depends
+    from sqlalchemy.orm import Session
+
+    from app.database import get_db
+    from app.models import DataImport
+    from main import DataImportFilters, data_import_response_columns, data_import_responses
+
+    app = FastAPI()
+
+    @app.get('/')
+    def home():
+        return {"message": "we are home"}
+
+    @app.get("/query-data-imports/")
+    async def query_data_imports(limit: int = 100, filters: DataImportFilters = Depends(),
+                                 db: Session = Depends(get_db)):
+        query = filters.apply(db.query(*data_import_response_columns()))
+        records = query.order_by(DataImport.landslideid).limit(limit).all()
+        return data_import_responses(records)
+
+    return app
+
+
+def serve(which: str, port: int):
+    import uvicorn
+
+    if which == "sync":
+        app = legacy_app()
+    else:
+        # read at import, so it has to be set before main is imported
+        os.environ["QUERY_CACHE_MAX_BYTES"] = "0"
+        from main import app
+    uvicorn.run(app, host="127.0.0.1", port=port, log_level="warning")
+
+
+async def wait_until_up(base_url: str, timeout: float = 30):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        while True:
+            try:
+                if (await client.get("/")).status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"server at {base_url} did not start")
+            await asyncio.sleep(0.2)
+
+
+async def drive(base_url: str, path: str, clients: int, duration: float) -> dict:
+    latencies = []
+    errors = 0
+    stop_at = time.perf_counter() + duration
+
+    async def client_loop(client):
+        nonlocal errors
+        while time.perf_counter() < stop_at:
+            started = time.perf_counter()
+            try:
+                response = await client.get(path)
+                ok = response.status_code in (200, 404)
+            except httpx.HTTPError:
+                ok = False
+            if ok:
+                latencies.append((time.perf_counter() - started) * 1000)
+            else:
+                errors += 1
+
+    limits = httpx.Limits(max_connections=clients, max_keepalive_connections=clients)
+    async with httpx.AsyncClient(base_url=base_url, timeout=120, limits=limits) as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(client_loop(client) for _ in range(clients)))
+        elapsed = time.perf_counter() - started
+
+    return {"requests_per_second": len(latencies) / elapsed, "errors": errors, **summarize(latencies)}
+
+
+def run(args) -> dict:
+    results = {}
+    for offset, which in enumerate(("sync", "async")):
+        port = args.port + offset
+        server = subprocess.Popen(
+            [sys.executable, "-m", "benchmarks.async_vs_sync", "--serve", which, "--port", str(port)],
+            cwd=PROJECT_DIR,
+        )
+        try:
+            base_url = f"http://127.0.0.1:{port}"
+            asyncio.run(wait_until_up(base_url))
+            asyncio.run(drive(base_url, args.path, args.clients, min(args.duration, 5)))  # warm up
+            results[which] = asyncio.run(drive(base_url, args.path, args.clients, args.duration))
+        finally:
+            server.terminate()
+            server.wait()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="sync Session vs AsyncSession request throughput")
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--duration", type=float, default=30, help="seconds per path")
+    parser.add_argument("--path", default="/query-data-imports/?limit=100")
+    parser.add_argument("--port", type=int, default=8101)
+    parser.add_argument("--serve", choices=["sync", "async"], help=argparse.SUPPRESS)
+    parser.add_argument("--json", action="store_true", help="print results as json")
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.serve, args.port)
+        return
+
+    results = run(args)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"{args.path} with {args.clients} concurrent clients")
+    for which, result in results.items():
+        print(f"  {which:<6} {result['requests_per_second']:8.1f} req/s   "
+              f"p50 {result.get('p50_ms', 0):8.1f} ms   p99 {result.get('p99_ms', 0):8.1f} ms   "
+              f"errors {result['errors']}")
+
+
+if __name__ == "__main__":
+    main()
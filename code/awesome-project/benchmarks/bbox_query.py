@@ -0,0 +1,133 @@
+# benchmarks/bbox_query.py
+# bbox query latency with the old schema (varchar lat/lon compared as strings, no spatial index)
+# and the new one (coords && ST_MakeEnvelope served by the GiST index).
+# builds two scratch tables next to data_import, seeds them with the same random points and
+# runs the same random map-sized boxes against both.
+#
+#   DATABASE_URL=postgresql://... python -m benchmarks.bbox_query --rows 1000000
+import argparse
+import json
+import os
+import random
+import time
+
+from sqlalchemy import create_engine, text
+
+from benchmarks.stats import summarize
+
+SEED_SQL = """
+    INSERT INTO {table} (landslideid, latitude, longitude, lstype, coords)
+    SELECT g::text, lat, lon, (ARRAY['Debris', 'Flow', 'Rock', 'Lateral', 'Coherent'])[1 + g % 5],
+           ST_SetSRID(ST_MakePoint(lon, lat), 4326)
+    FROM (
+        SELECT g, 25 + random() * 24 AS lat, -125 + random() * 58 AS lon
+        FROM generate_series(1, :rows) AS g
+    ) AS points
+"""
+
+SCHEMAS = {
+    "before": {
+        "table": "bench_bbox_before",
+        "create": """
+            CREATE TABLE bench_bbox_before (
+                landslideid varchar PRIMARY KEY,
+                latitude varchar,
+                longitude varchar,
+                lstype varchar,
+                coords geometry(POINT, 4326)
+            )
+        """,
+        "indexes": [],
+        "query": """
+            SELECT count(*) FROM bench_bbox_before
+            WHERE latitude >= :min_lat AND latitude <= :max_lat
+              AND longitude >= :min_lon AND longitude <= :max_lon
+        """,
+        "as_text": True,
+    },
+    "after": {
+        "table": "bench_bbox_after",
+        "create": """
+            CREATE TABLE bench_bbox_after (
+                landslideid varchar PRIMARY KEY,
+                latitude double precision,
+                longitude double precision,
+                lstype varchar,
+                coords geometry(POINT, 4326)
+            )
+        """,
+        "indexes": ["CREATE INDEX ON bench_bbox_after USING GIST (coords)"],
+        "query": """
+            SELECT count(*) FROM bench_bbox_after
+            WHERE coords && ST_MakeEnvelope(:min_lon, :min_lat, :max_lon, :max_lat, 4326)
+        """,
+        "as_text": False,
+    },
+}
+
+
+def random_boxes(count: int, size_degrees: float, seed: int):
+    rng = random.Random(seed)
+    boxes = []
+    for _ in range(count):
+        min_lat = rng.uniform(25, 49 - size_degrees)
+        min_lon = rng.uniform(-125, -67 - size_degrees)
+        boxes.append({
+            "min_lat": min_lat, "max_lat": min_lat + size_degrees,
+            "min_lon": min_lon, "max_lon": min_lon + size_degrees,
+        })
+    return boxes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="bbox query latency before / after the numeric lat/lon + GiST change")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--box-size", type=float, default=1.0, help="box edge in degrees")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--keep", action="store_true", help="keep the scratch tables")
+    parser.add_argument("--json", action="store_true", help="print results as json")
+    args = parser.parse_args()
+
+    engine = create_engine(os.environ["DATABASE_URL"])
+    boxes = random_boxes(args.queries, args.box_size, args.seed)
+    results = {}
+
+    try:
+        for name, schema in SCHEMAS.items():
+            with engine.begin() as conn:
+                conn.execute(text(f"DROP TABLE IF EXISTS {schema['table']}"))
+                conn.execute(text(schema["create"]))
+                conn.execute(text("SELECT setseed(:seed)"), {"seed": args.seed / 1000})
+                conn.execute(text(SEED_SQL.format(table=schema["table"])), {"rows": args.rows})
+                for index in schema["indexes"]:
+                    conn.execute(text(index))
+                conn.execute(text(f"ANALYZE {schema['table']}"))
+
+            latencies = []
+            with engine.connect() as conn:
+                for box in boxes:
+                    params = {k: str(v) for k, v in box.items()} if schema["as_text"] else box
+                    started = time.perf_counter()
+                    conn.execute(text(schema["query"]), params).scalar()
+                    latencies.append((time.perf_counter() - started) * 1000)
+
+            results[name] = {"rows": args.rows, **summarize(latencies)}
+    finally:
+        if not args.keep:
+            with engine.begin() as conn:
+                for schema in SCHEMAS.values():
+                    conn.execute(text(f"DROP TABLE IF EXISTS {schema['table']}"))
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"bbox query latency, {args.rows:,} rows, {args.queries} boxes of {args.box_size} degrees")
+    for name, result in results.items():
+        print(f"  {name:<7} mean {result['mean_ms']:8.2f} ms   p50 {result['p50_ms']:8.2f} ms   "
+              f"p95 {result['p95_ms']:8.2f} ms   p99 {result['p99_ms']:8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
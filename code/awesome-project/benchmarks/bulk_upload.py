@@ -0,0 +1,124 @@
+# benchmarks/bulk_upload.py
+# rows/s for POST /data-imports/bulk against the 50,000 rows/s target, for a csv and a geojson
+# upload of --rows reports each. the app runs in its own single worker uvicorn process (or use
+# --base-url), the time is the whole request: upload, parsing, validation, COPY and commits.
+# the rows written are tagged lsSource=benchmark and deleted afterwards.
+#
+#   DATABASE_URL=postgresql://... python -m benchmarks.bulk_upload --rows 500000 --repeat 3
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+
+import httpx
+from sqlalchemy import create_engine
+
+from benchmarks.async_vs_sync import PROJECT_DIR, wait_until_up
+from benchmarks.run import BENCH_SOURCE, clean_up, new_report
+
+TARGET_ROWS_PER_SECOND = 50_000
+
+
+def csv_upload(rng: random.Random, rows: int) -> bytes:
+    lines = ["latitude,longitude,lsType,lsSource,impact,event_date"]
+    for _ in range(rows):
+        report = new_report(rng)
+        lines.append(f"{report['latitude']},{report['longitude']},{report['lsType']},{BENCH_SOURCE},None,2024-01-15")
+    return ("\n".join(lines) + "\n").encode()
+
+
+def geojson_upload(rng: random.Random, rows: int) -> bytes:
+    features = []
+    for _ in range(rows):
+        report = new_report(rng)
+        features.append({
+            "type": "Feature",
+            "geometry": {"type": "Point", "coordinates": [report["longitude"], report["latitude"]]},
+            "properties": {"lsType": report["lsType"], "lsSource": BENCH_SOURCE, "impact": "None",
+                           "event_date": "2024-01-15"},
+        })
+    return json.dumps({"type": "FeatureCollection", "features": features}).encode()
+
+
+# name -> (file name, content type, body builder)
+FORMATS = {
+    "csv": ("bench.csv", "text/csv", csv_upload),
+    "geojson": ("bench.geojson", "application/geo+json", geojson_upload),
+}
+
+
+def upload(base_url: str, name: str, body: bytes) -> dict:
+    filename, content_type, _ = FORMATS[name]
+    started = time.perf_counter()
+    response = httpx.post(f"{base_url}/data-imports/bulk", files={"file": (filename, body, content_type)},
+                          timeout=None)
+    elapsed = time.perf_counter() - started
+    response.raise_for_status()
+    result = response.json()
+    return {"seconds": elapsed, "accepted": result["accepted"], "rejected": result["rejected"],
+            "rows_per_second": result["accepted"] / elapsed}
+
+
+def run(args) -> dict:
+    rng = random.Random(args.seed)
+    bodies = {name: FORMATS[name][2](rng, args.rows) for name in args.formats}
+
+    server = None
+    base_url = args.base_url
+    if base_url is None:
+        server = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--port", str(args.port), "--log-level", "warning"],
+            cwd=PROJECT_DIR,
+        )
+        base_url = f"http://127.0.0.1:{args.port}"
+    engine = create_engine(os.environ["DATABASE_URL"])
+    results = {}
+    try:
+        asyncio.run(wait_until_up(base_url))
+        for name, body in bodies.items():
+            runs = []
+            for _ in range(args.repeat):
+                runs.append(upload(base_url, name, body))
+                # every run inserts into the same table size
+                clean_up(engine)
+            best = max(attempt["rows_per_second"] for attempt in runs)
+            results[name] = {"bytes": len(body), "best_rows_per_second": best,
+                             "meets_target": best >= TARGET_ROWS_PER_SECOND, "runs": runs}
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+        clean_up(engine)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="bulk upload rows/s against the 50k rows/s target")
+    parser.add_argument("--rows", type=int, default=500_000, help="rows per upload")
+    parser.add_argument("--repeat", type=int, default=3, help="uploads per format, the best one counts")
+    parser.add_argument("--formats", nargs="+", choices=list(FORMATS), default=list(FORMATS))
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--base-url", help="use a running server instead of starting one")
+    parser.add_argument("--port", type=int, default=8131)
+    parser.add_argument("--json", action="store_true", help="print results as json")
+    args = parser.parse_args()
+
+    results = run(args)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"POST /data-imports/bulk, {args.rows:,} rows per upload, target {TARGET_ROWS_PER_SECOND:,} rows/s")
+    for name, result in results.items():
+        verdict = "meets target" if result["meets_target"] else "BELOW TARGET"
+        print(f"  {name:<8} {result['best_rows_per_second']:10,.0f} rows/s   "
+              f"{result['bytes'] / 1e6:7.1f} MB   {verdict}")
+
+
+if __name__ == "__main__":
+    main()
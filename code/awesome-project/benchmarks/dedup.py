@@ -0,0 +1,81 @@
+# benchmarks/dedup.py
+# time to check an upload's worth of points for near duplicates (app/dedup.py) against the
+# seeded data_import: the in-memory pass over the batch plus the chunked ST_DWithin queries.
+# half the points are placed a few metres from stored reports, so both outcomes are exercised.
+# run python -m benchmarks.seed first.
+#
+#   DATABASE_URL=postgresql://... python -m benchmarks.dedup --points 100000
+import argparse
+import json
+import random
+import time
+from types import SimpleNamespace
+
+from sqlalchemy import text
+
+from app.database import SessionLocal
+from app.dedup import DuplicateChecker, DUPLICATE_DISTANCE_M, METRES_PER_DEGREE, DUPLICATE_QUERY_CHUNK
+from benchmarks.run import near_hotspot
+
+SAMPLE_SQL = text("""
+    SELECT landslideid, longitude, latitude, lstype
+    FROM data_import TABLESAMPLE SYSTEM (1)
+    WHERE coords IS NOT NULL
+    LIMIT :limit
+""")
+
+
+def incoming_points(db, count: int, seed: int):
+    rng = random.Random(seed)
+    stored = db.execute(SAMPLE_SQL, {"limit": count // 2}).all()
+    points = []
+    for i in range(count):
+        if i % 2 == 0 and stored:
+            # a few metres away from a stored report of the same type
+            row = stored[(i // 2) % len(stored)]
+            offset = rng.uniform(1, DUPLICATE_DISTANCE_M / 2) / METRES_PER_DEGREE
+            lon, lat, ls_type = row.longitude + offset, row.latitude, row.lstype
+        else:
+            lat, lon = near_hotspot(rng)
+            ls_type = rng.choice(["Debris", "Flow", "Rock"])
+        points.append(SimpleNamespace(
+            landslideID=f"bench-dedup-{i}", longitude=lon, latitude=lat, lsType=ls_type,
+            lsSource=None, impact=None, wea13_type=None))
+    return points
+
+
+def main():
+    parser = argparse.ArgumentParser(description="near duplicate check time for a batch of incoming points")
+    parser.add_argument("--points", type=int, default=100_000)
+    parser.add_argument("--chunk", type=int, default=DUPLICATE_QUERY_CHUNK, help="points per ST_DWithin query")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", action="store_true", help="print results as json")
+    args = parser.parse_args()
+
+    with SessionLocal() as db:
+        points = incoming_points(db, args.points, args.seed)
+        checker = DuplicateChecker(action="flag", chunk=args.chunk)
+
+        started = time.perf_counter()
+        found = checker.find_sync(db, points)
+        elapsed = time.perf_counter() - started
+
+    results = {
+        "points": len(points),
+        "seconds": elapsed,
+        "points_per_second": len(points) / elapsed if elapsed else 0.0,
+        "duplicates": sum(match is not None for match in found),
+        **checker.stats(),
+    }
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"{results['points']:,} points checked in {results['seconds']:.2f} s "
+          f"({results['points_per_second']:,.0f} points/s), {results['duplicates']:,} near duplicates "
+          f"({results['found_in_memory']:,} in memory, {results['found_in_database']:,} in the database)")
+
+
+if __name__ == "__main__":
+    main()
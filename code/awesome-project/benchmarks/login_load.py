@@ -0,0 +1,107 @@
+# benchmarks/login_load.py
+# checks that logins do not stall the rest of the api: measures /query-data-imports/ latency
+# on its own, then again while logins are fired at a fixed rate (100/s by default).
+# run against a started server, the test user is registered if it does not exist yet.
+#
+#   uvicorn main:app --port 8000
+#   python -m benchmarks.login_load --base-url http://127.0.0.1:8000 --logins-per-second 100
+import argparse
+import asyncio
+import json
+import time
+
+import httpx
+
+from benchmarks.stats import summarize
+
+
+async def query_loop(client: httpx.AsyncClient, path: str, stop: asyncio.Event, latencies: list):
+    while not stop.is_set():
+        started = time.perf_counter()
+        response = await client.get(path)
+        if response.status_code in (200, 404):
+            latencies.append((time.perf_counter() - started) * 1000)
+
+
+async def login_loop(client: httpx.AsyncClient, email: str, password: str, rate: float,
+                     stop: asyncio.Event, outcomes: dict):
+    async def login():
+        started = time.perf_counter()
+        response = await client.post("/token", data={"email": email, "password": password})
+        outcomes.setdefault(response.status_code, []).append((time.perf_counter() - started) * 1000)
+
+    in_flight = set()
+    interval = 1.0 / rate
+    next_at = time.perf_counter()
+    while not stop.is_set():
+        task = asyncio.create_task(login())
+        in_flight.add(task)
+        task.add_done_callback(in_flight.discard)
+        next_at += interval
+        await asyncio.sleep(max(0.0, next_at - time.perf_counter()))
+    await asyncio.gather(*in_flight, return_exceptions=True)
+
+
+async def measure(base_url: str, args, with_logins: bool) -> dict:
+    latencies = []
+    login_outcomes = {}
+    stop = asyncio.Event()
+    limits = httpx.Limits(max_connections=args.query_clients + 500)
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=60, limits=limits) as client:
+        tasks = [asyncio.create_task(query_loop(client, args.query_path, stop, latencies))
+                 for _ in range(args.query_clients)]
+        if with_logins:
+            tasks.append(asyncio.create_task(
+                login_loop(client, args.email, args.password, args.logins_per_second, stop, login_outcomes)))
+        await asyncio.sleep(args.duration)
+        stop.set()
+        await asyncio.gather(*tasks)
+
+    result = {"query": summarize(latencies)}
+    if with_logins:
+        result["logins"] = {str(code): summarize(samples) for code, samples in login_outcomes.items()}
+    return result
+
+
+async def run(args):
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=60) as client:
+        await client.post("/register", json={
+            "username": args.email.split("@")[0], "email": args.email, "password": args.password})
+
+    baseline = await measure(args.base_url, args, with_logins=False)
+    under_load = await measure(args.base_url, args, with_logins=True)
+    return {"baseline": baseline, "under_login_load": under_load}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="query latency with and without a login burst")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--query-path", default="/query-data-imports/?limit=100")
+    parser.add_argument("--query-clients", type=int, default=10)
+    parser.add_argument("--logins-per-second", type=float, default=100)
+    parser.add_argument("--duration", type=float, default=30, help="seconds per phase")
+    parser.add_argument("--email", default="loadtest@example.com")
+    parser.add_argument("--password", default="loadtest-password")
+    parser.add_argument("--json", action="store_true", help="print results as json")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    for phase, result in results.items():
+        query = result["query"]
+        print(f"{phase}: {query['requests']} queries", end="")
+        if query["requests"]:
+            print(f", p50 {query['p50_ms']:.1f} ms, p99 {query['p99_ms']:.1f} ms", end="")
+        print()
+        for code, logins in result.get("logins", {}).items():
+            print(f"  logins {code}: {logins['requests']}, p50 {logins['p50_ms']:.1f} ms, "
+                  f"p99 {logins['p99_ms']:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+# benchmarks/payload_size.py
+# bytes on the wire for /query-data-imports/ in the full shape and in the compact map shape
+# (fields=landslideID,lsType,geometry&precision=5), uncompressed, gzip and brotli (if installed).
+# rows are built in memory like benchmarks/serialization.py, no database needed.
+#
+#   DATABASE_URL=postgresql://... python -m benchmarks.payload_size --rows 10000
+import argparse
+import json
+from collections import namedtuple
+
+from app import compression, fastjson
+from benchmarks.serialization import make_rows
+
+MAP_FIELDS = ("landslideID", "lsType", "geometry_json_string")
+MapRow = namedtuple("MapRow", MAP_FIELDS)
+
+
+def compact_rows(rows, precision: int):
+    # what the projection and ST_AsGeoJSON(coords, precision) return for the same rows
+    compact = []
+    for row in rows:
+        lon, lat = json.loads(row.geometry_json_string)["coordinates"]
+        geometry = json.dumps({"type": "Point", "coordinates": [round(lon, precision), round(lat, precision)]},
+                              separators=(",", ":"))
+        compact.append(MapRow(row.landslideID, row.lsType, geometry))
+    return compact
+
+
+def sizes(body: bytes) -> dict:
+    result = {"identity": len(body), "gzip": len(compression.compress(body, "gzip"))}
+    if compression.brotli is not None:
+        result["br"] = len(compression.compress(body, "br"))
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="response size of the full and the compact map payload")
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--precision", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", action="store_true", help="print results as json")
+    args = parser.parse_args()
+
+    rows = make_rows(args.rows, args.seed)
+    results = {
+        "full": sizes(fastjson.dump_rows(rows)),
+        "compact": sizes(fastjson.dump_rows(compact_rows(rows, args.precision))),
+    }
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    baseline = results["full"]["identity"]
+    print(f"{args.rows:,} rows")
+    for shape, by_encoding in results.items():
+        for encoding, size in by_encoding.items():
+            print(f"  {shape:<8} {encoding:<9} {size:>12,} bytes   {baseline / size:5.1f}x smaller")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,311 @@
+# benchmarks/run.py
+# load test for every endpoint in main.py, app/router.py and app/internal.py against a database filled by
+# benchmarks/seed.py. each endpoint is driven in turn by --clients concurrent clients for
+# --duration seconds, and the report gives requests/s, p50/p95/p99 latency and the time each
+# request spent in the database, read from the Server-Timing header (app/profiling.py; the
+# COPY of a bulk upload and the chunks of a streamed response are not in it). results are
+# json, so runs on two commits can be compared:
+#
+#   DATABASE_URL=postgresql://.../bench python -m benchmarks.seed --rows 1000000 --truncate
+#   DATABASE_URL=postgresql://.../bench python -m benchmarks.run --output before.json
+#   (change things)
+#   DATABASE_URL=postgresql://.../bench python -m benchmarks.run --output after.json --baseline before.json
+import argparse
+import asyncio
+import datetime
+import json
+import math
+import os
+import platform
+import random
+import re
+import subprocess
+import sys
+import time
+import uuid
+
+import httpx
+from sqlalchemy import create_engine, text
+
+from app.facets import REMOVE_FACETS_SQL
+from app.query_cache import BUMP_VERSION_SQL
+from app.tiles import lonlat_to_tile
+from benchmarks.async_vs_sync import PROJECT_DIR, wait_until_up
+from benchmarks.seed import BENCH_EMAIL, BENCH_PASSWORD, FIRST_ID, HOTSPOTS
+from benchmarks.stats import summarize
+
+BENCH_SOURCE = "benchmark"  # lsSource of rows written by the run, deleted afterwards
+
+
+def db_time_ms(server_timing: str):
+    # the db metric of the Server-Timing header set by app.profiling
+    match = re.search(r"(?:^|,)\s*db;dur=([0-9.]+)", server_timing)
+    return float(match.group(1)) if match else None
+
+
+def near_hotspot(rng: random.Random):
+    lat, lon, spread, _ = rng.choice(HOTSPOTS)
+    return max(-89, min(89, lat + rng.gauss(0, spread))), max(-180, min(180, lon + rng.gauss(0, spread)))
+
+
+def bbox_params(rng: random.Random, size: float) -> dict:
+    lat, lon = near_hotspot(rng)
+    return {
+        "min_latitude": lat - size / 2, "max_latitude": lat + size / 2,
+        "min_longitude": lon - size / 2, "max_longitude": lon + size / 2,
+    }
+
+
+def new_report(rng: random.Random) -> dict:
+    lat, lon = near_hotspot(rng)
+    return {
+        "latitude": lat, "longitude": lon,
+        "lsType": rng.choice(["Debris", "Flow", "Rock"]), "lsSource": BENCH_SOURCE, "impact": "None",
+    }
+
+
+def bulk_upload(rng: random.Random, rows: int = 200) -> dict:
+    lines = ["latitude,longitude,lsType,lsSource,impact"]
+    for _ in range(rows):
+        report = new_report(rng)
+        lines.append(f"{report['latitude']},{report['longitude']},{report['lsType']},{BENCH_SOURCE},None")
+    return {"files": {"file": ("bench.csv", "\n".join(lines), "text/csv")}}
+
+
+def typed_id(rng: random.Random) -> str:
+    # the first few keystrokes of a seeded landslide id
+    landslide_id = str(FIRST_ID + rng.randint(1, 1_000_000))
+    return landslide_id[:rng.randint(1, len(landslide_id))]
+
+
+def area_polygon(rng: random.Random, size: float = 1.0, vertices: int = 64) -> dict:
+    # an irregular ring around a hotspot, like a small watershed outline
+    lat, lon = near_hotspot(rng)
+    ring = []
+    for i in range(vertices):
+        angle = 2 * math.pi * i / vertices
+        radius = size / 2 * rng.uniform(0.6, 1.0)
+        ring.append([lon + radius * math.cos(angle), lat + radius * math.sin(angle)])
+    ring.append(ring[0])
+    return {"type": "Polygon", "coordinates": [ring]}
+
+
+def tile_path(rng: random.Random) -> str:
+    lat, lon = near_hotspot(rng)
+    z = rng.randint(6, 12)
+    x, y = lonlat_to_tile(lon, lat, z)
+    return f"/tiles/{z}/{x}/{y}.mvt"
+
+
+INTERNAL_PATHS = ["/internal/hashing", "/internal/db-pool", "/internal/caches", "/internal/regions",
+                  "/internal/duplicates"]
+
+
+# name -> (method, request builder(rng, token) -> (path, httpx request kwargs), accepted statuses)
+ENDPOINTS = {
+    "home": ("GET", lambda rng, token: ("/", {}), {200}),
+    "report_form": ("GET", lambda rng, token: ("/report/form", {}), {200}),
+    "report_success": ("GET", lambda rng, token: ("/report/success", {}), {200}),
+    "register": ("POST", lambda rng, token: ("/register", {"json": {
+        "username": f"bench-{uuid.uuid4().hex}", "email": f"bench-{uuid.uuid4().hex}@example.com",
+        "password": BENCH_PASSWORD}}), {200}),
+    "token": ("POST", lambda rng, token: ("/token", {"data": {"email": BENCH_EMAIL, "password": BENCH_PASSWORD}}), {200}),
+    "users_me": ("GET", lambda rng, token: ("/users/me", {"headers": {"Authorization": f"Bearer {token}"}}), {200}),
+    "create_data_import": ("POST", lambda rng, token: ("/data-imports/", {"json": new_report(rng)}), {201}),
+    "bulk_upload": ("POST", lambda rng, token: ("/data-imports/bulk", bulk_upload(rng)), {200}),
+    "reserve_ids": ("POST", lambda rng, token: ("/landslide-ids/reserve", {"params": {"count": 10}}), {200}),
+    "suggest": ("GET", lambda rng, token: ("/data-imports/suggest", {"params": {"q": typed_id(rng)}}), {200}),
+    "query_data_imports": ("GET", lambda rng, token: ("/query-data-imports/", {
+        "params": {**bbox_params(rng, 1.0), "limit": 1000}}), {200, 404}),
+    "query_area": ("POST", lambda rng, token: ("/query-data-imports/area", {"json": area_polygon(rng)}), {200, 404}),
+    "query_geojson": ("GET", lambda rng, token: ("/query-data-imports.geojson", {
+        "params": bbox_params(rng, 1.0)}), {200}),
+    "tiles": ("GET", lambda rng, token: (tile_path(rng), {}), {200}),
+    "clusters": ("GET", lambda rng, token: ("/clusters", {"params": {**bbox_params(rng, 5.0), "zoom": 7}}), {200}),
+    "near": ("GET", lambda rng, token: ("/data-imports/near", {"params": dict(zip(
+        ("lat", "lon"), near_hotspot(rng)), radius_m=20000, k=10)}), {200}),
+    "timeline": ("GET", lambda rng, token: ("/stats/timeline", {
+        "params": {**bbox_params(rng, 2.0), "bucket": "month"}}), {200}),
+    "facets": ("GET", lambda rng, token: ("/stats/facets", {"params": bbox_params(rng, 5.0)}), {200}),
+    # no bbox: the whole table from the largest summary cells
+    "facets_world": ("GET", lambda rng, token: ("/stats/facets", {}), {200}),
+    "export_parquet": ("GET", lambda rng, token: ("/export/data-imports.parquet", {
+        "params": bbox_params(rng, 2.0)}), {200}),
+    "export_arrow": ("GET", lambda rng, token: ("/export/data-imports.arrow", {
+        "params": bbox_params(rng, 2.0)}), {200}),
+    "metrics": ("GET", lambda rng, token: ("/metrics", {}), {200}),
+    "internal": ("GET", lambda rng, token: (rng.choice(INTERNAL_PATHS), {}), {200}),
+}
+
+
+async def drive(client: httpx.AsyncClient, name: str, clients: int, duration: float, token: str, seed: int) -> dict:
+    method, build, accepted = ENDPOINTS[name]
+    latencies = []
+    db_times = []
+    statuses = {}
+    errors = 0
+    stop_at = time.perf_counter() + duration
+
+    async def client_loop(rng):
+        nonlocal errors
+        while time.perf_counter() < stop_at:
+            path, kwargs = build(rng, token)
+            started = time.perf_counter()
+            try:
+                response = await client.request(method, path, **kwargs)
+                await response.aread()
+            except httpx.HTTPError:
+                errors += 1
+                continue
+            elapsed = (time.perf_counter() - started) * 1000
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+            if response.status_code not in accepted:
+                errors += 1
+                continue
+            latencies.append(elapsed)
+            db_ms = db_time_ms(response.headers.get("server-timing", ""))
+            if db_ms is not None:
+                db_times.append(db_ms)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client_loop(random.Random(f"{seed}-{name}-{i}")) for i in range(clients)))
+    elapsed = time.perf_counter() - started
+
+    return {
+        "requests_per_second": len(latencies) / elapsed,
+        "errors": errors,
+        "statuses": {str(code): count for code, count in sorted(statuses.items())},
+        **summarize(latencies),
+        "db": summarize(db_times),
+    }
+
+
+async def run_endpoints(base_url: str, args) -> dict:
+    limits = httpx.Limits(max_connections=args.clients, max_keepalive_connections=args.clients)
+    async with httpx.AsyncClient(base_url=base_url, timeout=120, limits=limits) as client:
+        login = await client.post("/token", data={"email": BENCH_EMAIL, "password": BENCH_PASSWORD})
+        login.raise_for_status()
+        token = login.json()["access_token"]
+
+        results = {}
+        for name in args.endpoints:
+            if args.warmup:
+                await drive(client, name, args.clients, args.warmup, token, args.seed + 1)
+            results[name] = await drive(client, name, args.clients, args.duration, token, args.seed)
+            print(f"  {name:<20} {results[name]['requests_per_second']:9.1f} req/s", file=sys.stderr)
+        return results
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=PROJECT_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def clean_up(engine):
+    with engine.begin() as conn:
+        landslideids = conn.execute(text("SELECT landslideid FROM data_import WHERE lssource = :source"),
+                                    {"source": BENCH_SOURCE}).scalars().all()
+        # the rows leave the facet counts before they leave the table
+        if landslideids:
+            conn.execute(REMOVE_FACETS_SQL, {"landslideids": landslideids})
+        conn.execute(text("DELETE FROM data_import WHERE lssource = :source"), {"source": BENCH_SOURCE})
+        conn.execute(text("DELETE FROM user_info WHERE user_email LIKE 'bench-%@example.com'"))
+    # after the commit, like the api's write paths: a server left running (--base-url) would
+    # otherwise keep serving the bench rows from its query cache
+    with engine.begin() as conn:
+        conn.execute(BUMP_VERSION_SQL)
+
+
+def run(args) -> dict:
+    engine = create_engine(os.environ["DATABASE_URL"])
+    with engine.connect() as conn:
+        rows = conn.execute(text("SELECT count(*) FROM data_import")).scalar()
+
+    server = None
+    base_url = args.base_url
+    if base_url is None:
+        server = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--port", str(args.port), "--log-level", "warning"],
+            cwd=PROJECT_DIR,
+        )
+        base_url = f"http://127.0.0.1:{args.port}"
+    try:
+        asyncio.run(wait_until_up(base_url))
+        endpoints = asyncio.run(run_endpoints(base_url, args))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+        clean_up(engine)
+
+    return {
+        "meta": {
+            "commit": git_commit(),
+            "started_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "rows": rows,
+            "clients": args.clients,
+            "duration": args.duration,
+            "seed": args.seed,
+            "python": platform.python_version(),
+        },
+        "endpoints": endpoints,
+    }
+
+
+def percent_change(new: float, old: float) -> str:
+    if not old:
+        return "     n/a"
+    return f"{(new - old) / old * 100:+7.1f}%"
+
+
+def print_report(results: dict, baseline=None):
+    meta = results["meta"]
+    print(f"{meta['rows']:,} rows, {meta['clients']} clients, {meta['duration']} s per endpoint, commit {meta['commit']}")
+    print(f"  {'endpoint':<20} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'db p50':>9} {'errors':>7}")
+    for name, result in results["endpoints"].items():
+        line = (f"  {name:<20} {result['requests_per_second']:9.1f} {result.get('p50_ms', 0):9.1f} "
+                f"{result.get('p95_ms', 0):9.1f} {result.get('p99_ms', 0):9.1f} "
+                f"{result['db'].get('p50_ms', 0):9.2f} {result['errors']:7}")
+        old = (baseline or {}).get("endpoints", {}).get(name)
+        if old:
+            line += (f"   req/s {percent_change(result['requests_per_second'], old['requests_per_second'])}"
+                     f"  p99 {percent_change(result.get('p99_ms', 0), old.get('p99_ms', 0))}")
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="throughput and latency of every endpoint against a seeded database")
+    parser.add_argument("--clients", type=int, default=20)
+    parser.add_argument("--duration", type=float, default=10, help="seconds per endpoint")
+    parser.add_argument("--warmup", type=float, default=2, help="seconds per endpoint before measuring, 0 to skip")
+    parser.add_argument("--endpoints", nargs="+", choices=list(ENDPOINTS), default=list(ENDPOINTS))
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--base-url", help="use a running server instead of starting one")
+    parser.add_argument("--port", type=int, default=8121)
+    parser.add_argument("--output", help="write the results as json to this file")
+    parser.add_argument("--baseline", help="results json of an earlier run to compare against")
+    parser.add_argument("--json", action="store_true", help="print results as json")
+    args = parser.parse_args()
+
+    results = run(args)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    print_report(results, baseline)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+# benchmarks/seed.py
+# fills data_import in a local PostGIS with a synthetic, spatially realistic landslide inventory:
+# most points scatter (gaussian) around known landslide regions, the rest land anywhere in the
+# lower 48. rows are generated inside postgres with a fixed seed, so the same --rows and --seed
+# always give the same table. also creates the benchmark user used by benchmarks/run.py.
+#
+#   DATABASE_URL=postgresql://.../bench python -m benchmarks.seed --rows 1000000 --truncate
+import argparse
+import time
+import uuid
+
+import bcrypt
+from sqlalchemy import text
+
+from app.clusters import GEOHASH_PRECISION
+from app.database import engine, Base
+from app.models import UserInfo
+from app.hashing import BCRYPT_ROUNDS
+
+FIRST_ID = 1_000_000  # seeded ids are FIRST_ID + n, the id sequence is moved past them afterwards
+
+BENCH_EMAIL = "bench@example.com"
+BENCH_PASSWORD = "bench-password"
+
+# (latitude, longitude, spread in degrees, weight)
+HOTSPOTS = [
+    (44.5, -123.5, 1.2, 5),   # oregon coast range
+    (47.5, -121.8, 1.0, 4),   # washington cascades
+    (40.5, -123.8, 0.9, 4),   # northern california coast
+    (37.3, -122.1, 0.5, 3),   # santa cruz mountains / bay area
+    (34.2, -118.2, 0.7, 3),   # transverse ranges
+    (39.3, -106.3, 1.5, 2),   # colorado rockies
+    (38.0, -81.5, 1.5, 3),    # central appalachians
+    (40.4, -80.0, 0.5, 2),    # pittsburgh
+    (18.2, -66.5, 0.3, 2),    # puerto rico
+    (58.3, -134.4, 1.0, 1),   # southeast alaska
+    (21.4, -157.9, 0.3, 1),   # oahu
+]
+
+SEED_SQL = text("""
+    INSERT INTO data_import (landslideid, latitude, longitude, lstype, lssource, impact,
+                             wea13_id, wea13_type, coords, geohash, reported_at, event_date)
+    SELECT id, lat, lon, lstype, lssource, impact, wea13_id, wea13_type,
+           point, ST_GeoHash(point, :geohash_precision), reported_at, event_date
+    FROM (
+        SELECT *, ST_SetSRID(ST_MakePoint(lon, lat), 4326) AS point
+        FROM (
+            SELECT (:first_id + g)::text AS id,
+                   CASE WHEN background THEN 25 + random() * 24
+                        ELSE greatest(-89, least(89, (:lats)[h] + (:spreads)[h] * radius * cos(angle))) END AS lat,
+                   CASE WHEN background THEN -125 + random() * 58
+                        ELSE greatest(-180, least(180, (:lons)[h] + (:spreads)[h] * radius * sin(angle))) END AS lon,
+                   (ARRAY['Debris', 'Debris', 'Debris', 'Flow', 'Flow', 'Rock', 'Lateral', 'Coherent'])[1 + floor(random() * 8)::int] AS lstype,
+                   (ARRAY['Natural', 'Natural', 'Natural', 'Modified'])[1 + floor(random() * 4)::int] AS lssource,
+                   (ARRAY['None', 'None', 'None', 'Road', 'Road', 'Econ', 'Structure'])[1 + floor(random() * 7)::int] AS impact,
+                   CASE WHEN random() < 0.4 THEN 1 + floor(random() * 40)::int END AS wea13_id,
+                   (ARRAY['Coherent', 'Lateral Spread', 'Disrupted', NULL])[1 + floor(random() * 4)::int] AS wea13_type,
+                   -- reports arrive in id order over five years, like the real append-only table
+                   timestamptz '2020-01-01 00:00+00' + interval '5 years' * (g::float8 / :total) AS reported_at,
+                   CASE WHEN random() < 0.7 THEN date '1990-01-01' + floor(random() * 12500)::int END AS event_date
+            FROM (
+                -- one draw per row: a weighted hotspot and a box-muller gaussian offset
+                SELECT g, random() < :background AS background,
+                       1 + floor(random() * :hotspot_slots)::int AS h,
+                       sqrt(-2 * ln(1 - random())) AS radius, 2 * pi() * random() AS angle
+                FROM generate_series(:start, :stop) AS g
+            ) AS draw
+        ) AS generated
+    ) AS seeded
+""")
+
+# landslide_id_seq continues after the seeded ids
+MOVE_SEQUENCE_SQL = text("""
+    SELECT setval('landslide_id_seq',
+                  GREATEST(100089, (SELECT max(landslideid::bigint) FROM data_import WHERE landslideid ~ '^[0-9]+$')) + 1,
+                  false)
+""")
+
+
+def hotspot_arrays():
+    # each hotspot is repeated once per unit of weight, so a uniform pick is a weighted one
+    lats, lons, spreads = [], [], []
+    for lat, lon, spread, weight in HOTSPOTS:
+        lats += [lat] * weight
+        lons += [lon] * weight
+        spreads += [spread] * weight
+    return {"lats": lats, "lons": lons, "spreads": spreads, "hotspot_slots": len(lats)}
+
+
+def ensure_bench_user(conn):
+    exists = conn.execute(text("SELECT 1 FROM user_info WHERE user_email = :email"), {"email": BENCH_EMAIL}).first()
+    if exists:
+        return
+    hashed = bcrypt.hashpw(BENCH_PASSWORD.encode("utf-8"), bcrypt.gensalt(rounds=BCRYPT_ROUNDS)).decode("utf-8")
+    conn.execute(UserInfo.__table__.insert().values(
+        user_id=str(uuid.uuid4()), username="bench", user_email=BENCH_EMAIL, user_password=hashed))
+
+
+def seed(rows: int, seed_value: float, background: float, chunk_rows: int, truncate: bool):
+    with engine.begin() as conn:
+        conn.execute(text("CREATE EXTENSION IF NOT EXISTS postgis"))
+    Base.metadata.create_all(bind=engine)
+
+    params = {**hotspot_arrays(), "background": background, "first_id": FIRST_ID, "total": rows,
+              "geohash_precision": GEOHASH_PRECISION}
+
+    with engine.connect() as conn:
+        if truncate:
+            conn.execute(text("TRUNCATE data_import"))
+        # random() is per backend, seeding once makes the whole run reproducible
+        conn.execute(text("SELECT setseed(:seed)"), {"seed": seed_value})
+        for start in range(1, rows + 1, chunk_rows):
+            stop = min(rows, start + chunk_rows - 1)
+            started = time.perf_counter()
+            conn.execute(SEED_SQL, {**params, "start": start, "stop": stop})
+            conn.commit()
+            print(f"  rows {start:,}-{stop:,} in {time.perf_counter() - started:.1f} s")
+
+        conn.execute(MOVE_SEQUENCE_SQL)
+        ensure_bench_user(conn)
+        conn.commit()
+
+    # autocommit for ANALYZE so the planner sees the new distribution right away
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text("ANALYZE data_import"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="seed data_import with a synthetic landslide inventory")
+    parser.add_argument("--rows", type=int, default=100_000, help="10k to 5M is the tested range")
+    parser.add_argument("--seed", type=float, default=0.42, help="postgres setseed() value, -1 to 1")
+    parser.add_argument("--background", type=float, default=0.1, help="share of points outside the hotspots")
+    parser.add_argument("--chunk-rows", type=int, default=250_000, help="rows per insert / commit")
+    parser.add_argument("--truncate", action="store_true", help="empty data_import first")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    seed(args.rows, args.seed, args.background, args.chunk_rows, args.truncate)
+    print(f"seeded {args.rows:,} rows in {time.perf_counter() - started:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
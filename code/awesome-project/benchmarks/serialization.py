@@ -0,0 +1,89 @@
+# benchmarks/serialization.py
+# cpu time to turn /query-data-imports/ rows into a response body: the pydantic path
+# (model_validate per row, then FastAPI's jsonable_encoder + json.dumps) against
+# app.fastjson.dump_rows. rows are built in memory, no database needed.
+#
+#   DATABASE_URL=postgresql://... python -m benchmarks.serialization --rows 10000 100000
+import argparse
+import json
+import random
+import time
+from collections import namedtuple
+from datetime import date, datetime, timedelta, timezone
+
+from fastapi.encoders import jsonable_encoder
+
+from app import fastjson
+from benchmarks.stats import summarize
+from main import data_import_responses
+
+Row = namedtuple("Row", [
+    "landslideID", "latitude", "longitude", "lsType", "lsSource", "impact", "wea13_id",
+    "wea13_type", "geometry_json_string", "user_id", "reported_at", "event_date",
+])
+
+
+def make_rows(count: int, seed: int):
+    # shaped like data_import_response_columns() results
+    rng = random.Random(seed)
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    rows = []
+    for i in range(count):
+        lat, lon = round(rng.uniform(25, 49), 6), round(rng.uniform(-125, -67), 6)
+        rows.append(Row(
+            str(100090 + i), lat, lon, rng.choice(["Debris", "Flow", "Rock"]), "Natural", "None",
+            str(rng.randint(1, 40)) if rng.random() < 0.5 else None, rng.choice(["Coherent", None]),
+            json.dumps({"type": "Point", "coordinates": [lon, lat]}), None,
+            start + timedelta(seconds=rng.randint(0, 10_000_000), microseconds=rng.randint(0, 999_999)),
+            date(2023, 1, 1) + timedelta(days=rng.randint(0, 365)) if rng.random() < 0.3 else None,
+        ))
+    return rows
+
+
+def pydantic_path(rows) -> bytes:
+    return json.dumps(jsonable_encoder(data_import_responses(rows))).encode("utf-8")
+
+
+def fast_path(rows) -> bytes:
+    return fastjson.dump_rows(rows)
+
+
+def timed(function, rows, repeats: int):
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        function(rows)
+        timings.append((time.perf_counter() - started) * 1000)
+    return summarize(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="pydantic vs orjson response serialization")
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", action="store_true", help="print results as json")
+    args = parser.parse_args()
+
+    results = {}
+    for count in args.rows:
+        rows = make_rows(count, args.seed)
+        # both paths have to produce the same document
+        assert json.loads(pydantic_path(rows[:100])) == json.loads(fast_path(rows[:100]))
+        results[str(count)] = {
+            "pydantic": timed(pydantic_path, rows, args.repeats),
+            "orjson": timed(fast_path, rows, args.repeats),
+        }
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    for count, by_path in results.items():
+        pydantic_ms, orjson_ms = by_path["pydantic"]["p50_ms"], by_path["orjson"]["p50_ms"]
+        print(f"{int(count):>8,} rows   pydantic {pydantic_ms:9.1f} ms   orjson {orjson_ms:8.1f} ms   "
+              f"{pydantic_ms / orjson_ms:5.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,20 @@
+# benchmarks/stats.py
+# latency summaries shared by the benchmark scripts, all values in milliseconds
+import statistics
+
+
+def percentile(samples, pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def summarize(samples) -> dict:
+    if not samples:
+        return {"requests": 0}
+    return {
+        "requests": len(samples),
+        "mean_ms": statistics.fmean(samples),
+        "p50_ms": percentile(samples, 50),
+        "p95_ms": percentile(samples, 95),
+        "p99_ms": percentile(samples, 99),
+    }
@@ -0,0 +1,111 @@
+# benchmarks/write_coalescing.py
+# inserts/s for POST /data-imports/ with a commit per request and with the write-behind group
+# commit (WRITE_BEHIND=true), at 1, 10 and 100 concurrent writers. each mode runs the app in its
+# own single worker uvicorn process. the rows written are tagged lsSource=benchmark and deleted
+# afterwards.
+#
+#   DATABASE_URL=postgresql://... python -m benchmarks.write_coalescing --duration 20
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+
+import httpx
+from sqlalchemy import create_engine, text
+
+from benchmarks.async_vs_sync import PROJECT_DIR, wait_until_up
+from benchmarks.stats import summarize
+
+MODES = {"per_request": "false", "write_behind": "true"}
+
+
+async def drive(base_url: str, writers: int, duration: float) -> dict:
+    latencies = []
+    errors = 0
+    stop_at = time.perf_counter() + duration
+    rng = random.Random(writers)
+
+    async def writer_loop(client):
+        nonlocal errors
+        while time.perf_counter() < stop_at:
+            report = {
+                "latitude": rng.uniform(25, 49), "longitude": rng.uniform(-125, -67),
+                "lsType": "Debris", "lsSource": "benchmark", "impact": "None",
+            }
+            started = time.perf_counter()
+            try:
+                ok = (await client.post("/data-imports/", json=report)).status_code == 201
+            except httpx.HTTPError:
+                ok = False
+            if ok:
+                latencies.append((time.perf_counter() - started) * 1000)
+            else:
+                errors += 1
+
+    limits = httpx.Limits(max_connections=writers, max_keepalive_connections=writers)
+    async with httpx.AsyncClient(base_url=base_url, timeout=60, limits=limits) as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(writer_loop(client) for _ in range(writers)))
+        elapsed = time.perf_counter() - started
+
+    return {"inserts_per_second": len(latencies) / elapsed, "errors": errors, **summarize(latencies)}
+
+
+def run(args) -> dict:
+    results = {}
+    for offset, (mode, write_behind) in enumerate(MODES.items()):
+        port = args.port + offset
+        env = dict(os.environ, WRITE_BEHIND=write_behind,
+                   WRITE_BEHIND_FLUSH_MS=str(args.flush_ms), WRITE_BEHIND_BATCH_SIZE=str(args.batch_size))
+        server = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+            cwd=PROJECT_DIR, env=env,
+        )
+        try:
+            base_url = f"http://127.0.0.1:{port}"
+            asyncio.run(wait_until_up(base_url))
+            results[mode] = {
+                str(writers): asyncio.run(drive(base_url, writers, args.duration))
+                for writers in args.writers
+            }
+        finally:
+            server.terminate()
+            server.wait()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="report inserts/s with and without group commit")
+    parser.add_argument("--writers", type=int, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--duration", type=float, default=20, help="seconds per writer count")
+    parser.add_argument("--flush-ms", type=float, default=5)
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--port", type=int, default=8111)
+    parser.add_argument("--json", action="store_true", help="print results as json")
+    args = parser.parse_args()
+
+    try:
+        results = run(args)
+    finally:
+        engine = create_engine(os.environ["DATABASE_URL"])
+        with engine.begin() as conn:
+            conn.execute(text("DELETE FROM data_import WHERE lssource = 'benchmark'"))
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"POST /data-imports/, flush every {args.flush_ms} ms or {args.batch_size} rows")
+    for mode, by_writers in results.items():
+        for writers, result in by_writers.items():
+            print(f"  {mode:<13} {writers:>4} writers {result['inserts_per_second']:8.1f} inserts/s   "
+                  f"p50 {result.get('p50_ms', 0):8.1f} ms   p99 {result.get('p99_ms', 0):8.1f} ms   "
+                  f"errors {result['errors']}")
+
+
+if __name__ == "__main__":
+    main()
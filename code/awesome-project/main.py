@@ -1,17 +1,35 @@
-from fastapi import FastAPI, Depends, HTTPException, status, Form, Header
+from fastapi import FastAPI, Depends, HTTPException, status, Form, Header, UploadFile, File, Query, Response, Body
 from sqlalchemy.orm import Session
-from typing import List, Optional, Any 
-from pydantic import BaseModel, Field
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.exc import IntegrityError, DataError
+from typing import List, Optional, Any, Literal, Dict
+from datetime import date, datetime
+from pydantic import BaseModel, Field, ValidationError
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from starlette.middleware.gzip import DEFAULT_EXCLUDED_CONTENT_TYPES
+from fastapi.responses import StreamingResponse, JSONResponse
 import json
 import uuid 
+from contextlib import asynccontextmanager
 from sqlalchemy.sql import func
 from geoalchemy2 import WKTElement, Geometry
-from sqlalchemy import Integer, Column, String
+from sqlalchemy import Integer, Column, String, Text, JSON, Date, Float, Numeric, select, insert, cast, literal_column, text
 
-from app.database import engine, Base, get_db
-from app.models import DataImport, UserInfo
-from app import router
+from app.database import engine, async_engine, AsyncSessionLocal, Base, get_db, get_async_db
+from app.models import DataImport, UserInfo, landslide_id_seq
+from app import router, internal, ingest, pagination, fastjson, compression, export, facets, areas
+from app.profiling import (ProfilingMiddleware, track_sql, phase, count_rows, profiled_in_thread,
+                           profiled_iterator)
+from app.metrics import MetricsMiddleware, registry, render_stats
+from app.hashing import hashing_pool, HashingPoolFull, BCRYPT_ROUNDS
+from app.tiles import tile_cache, is_valid_tile, filter_hash
+from app.query_cache import query_cache
+from app.clusters import GEOHASH_PRECISION, precision_for_zoom
+from app.ids import IdAllocator, MAX_ID_RESERVATION, ID_CONFLICT_RETRIES
+from app.writebehind import WriteBehindQueue, WRITE_BEHIND
+from app.regions import wea13_regions
+from app.dedup import duplicate_checker
 
 import bcrypt
 
@@ -19,7 +37,7 @@ import bcrypt
 
 async def get_current_user(
     authorization: str = Header(...), 
-    db: Session = Depends(get_db) 
+    db: AsyncSession = Depends(get_async_db) 
 ):
     if not authorization.startswith("Bearer "):
         raise HTTPException(
@@ -30,7 +48,7 @@ async def get_current_user(
      
     token = authorization.split(" ")[1]
 
-    user = db.query(UserInfo).filter(UserInfo.user_id == token).first()
+    user = await db.scalar(select(UserInfo).filter(UserInfo.user_id == token))
 
     if user is None:
         raise HTTPException(
@@ -40,7 +58,17 @@ async def get_current_user(
         )
     return user 
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    wea13_regions.load()
+    if WRITE_BEHIND:
+        report_writer.start()
+    yield
+    await report_writer.stop()
+    hashing_pool.shutdown()
+    await async_engine.dispose()
+
+app = FastAPI(lifespan=lifespan)
 
 # to give front end accesss to back end (need to be changed?)
 origins = [
@@ -59,8 +87,22 @@ app.add_middleware(
     allow_credentials=True,        
     allow_methods=["*"],          
     allow_headers=["*"],          
+    expose_headers=["X-Next-Cursor", "ETag", "X-Duplicate-Of"],
 )
 
+# compresses responses for clients that accept gzip. added first so the timings below include it;
+# /query-data-imports/ compresses (and caches) its own bodies and is passed through as is
+# (parquet exports are already zstd compressed)
+app.add_middleware(GZipMiddleware, minimum_size=compression.MIN_COMPRESS_BYTES, compresslevel=compression.GZIP_LEVEL,
+                   exclude_content_types=DEFAULT_EXCLUDED_CONTENT_TYPES + ("application/vnd.apache.parquet",))
+# per route latency / in flight / rows returned for /metrics. added first so it runs inside
+# ProfilingMiddleware and sees the request's timings
+app.add_middleware(MetricsMiddleware)
+# Server-Timing header with sql / serialization time per request, and slow request profiles
+app.add_middleware(ProfilingMiddleware)
+track_sql(engine)
+track_sql(async_engine.sync_engine)
+
 #to hash passowrd
 class Hasher:
     @staticmethod #checks password when user is logging in
@@ -69,11 +111,30 @@ class Hasher:
     
     @staticmethod #hashes password
     def get_password_hash(password: str) -> str:
-        s = bcrypt.gensalt()
+        s = bcrypt.gensalt(rounds=BCRYPT_ROUNDS)
         hashed_password_bytes = bcrypt.hashpw(password.encode('utf-8'), s)
         return hashed_password_bytes.decode('latin-1') #to be stored in db
 
+    # same as above but run on the bcrypt pool, use these from endpoints
+    @staticmethod
+    async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+        return await hashing_pool.run(Hasher.verify_password, plain_password, hashed_password)
+
+    @staticmethod
+    async def get_password_hash_async(password: str) -> str:
+        return await hashing_pool.run(Hasher.get_password_hash, password)
+
 app.include_router(router.router)
+app.include_router(internal.router)
+
+# the bcrypt pool is full, ask the client to come back instead of queueing forever
+@app.exception_handler(HashingPoolFull)
+async def hashing_pool_full_handler(request, exc: HashingPoolFull):
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": str(exc)},
+        headers={"Retry-After": "1"},
+    )
 
 @app.get('/')
 def home():
@@ -101,15 +162,17 @@ class Token(BaseModel):
     email: str
 
 class DataImportCreate(BaseModel):
-    landslideID: str
-    latitude: float
-    longitude: float
+    # left out, the server assigns the next id from landslide_id_seq
+    landslideID: Optional[str] = None
+    latitude: float = Field(ge=-90, le=90)
+    longitude: float = Field(ge=-180, le=180)
     lsType: str     
     lsSource: str   
     impact: str
     wea13_id: Optional[str] = None
     wea13_type: Optional[str] = None
     user_id: Optional[str] = None
+    event_date: Optional[date] = None
 
 # Data model for data that will be sent in API responses
 class DataImportResponse(BaseModel):
@@ -123,15 +186,17 @@ class DataImportResponse(BaseModel):
     wea13_type: Optional[str]
     geometry: Any 
     user_id: Optional[str]
+    reported_at: Optional[datetime] = None
+    event_date: Optional[date] = None
 
     model_config = {'from_attributes': True}
 
 #for sign up
 @app.post("/register", response_model=UserResponse)
-def register_user(user: UserCreate, db: Session = Depends(get_db)):
+async def register_user(user: UserCreate, db: AsyncSession = Depends(get_async_db)):
 
     #checks db for email
-    db_user = db.query(UserInfo).filter(UserInfo.user_email == user.email).first()
+    db_user = await db.scalar(select(UserInfo).filter(UserInfo.user_email == user.email))
     if db_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -140,7 +205,7 @@ def register_user(user: UserCreate, db: Session = Depends(get_db)):
     
     #checks db for username (case insensitive)
     lowercaseUsername = user.username.lower()
-    db_user2 = db.query(UserInfo).filter(UserInfo.username == lowercaseUsername).first()
+    db_user2 = await db.scalar(select(UserInfo).filter(UserInfo.username == lowercaseUsername))
     if db_user2:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -151,20 +216,18 @@ def register_user(user: UserCreate, db: Session = Depends(get_db)):
     new_user_id = str(uuid.uuid4()) 
 
     #creates the hashed password
-    hashed_password_string = Hasher.get_password_hash(user.password)
+    hashed_password_string = await Hasher.get_password_hash_async(user.password)
 
     #sends user info through to db
     db_user = UserInfo(user_id=new_user_id, username=user.username, user_email=user.email, user_password=hashed_password_string) 
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
     return db_user
 
 #the user
 @app.get("/users/me", response_model=UserResponse)
 async def read_users_me(
     current_user: UserInfo = Depends(get_current_user),
-    db: Session = Depends(get_db)
 ):
     return current_user
 
@@ -173,10 +236,10 @@ async def read_users_me(
 async def login_for_access_token(
     email: str = Form(..., alias="email"),
     password: str = Form(...),                
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     #checks email 
-    user = db.query(UserInfo).filter(UserInfo.user_email == email).first()
+    user = await db.scalar(select(UserInfo).filter(UserInfo.user_email == email))
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -185,7 +248,7 @@ async def login_for_access_token(
         )
 
     #checks password
-    if not Hasher.verify_password(password, user.user_password):
+    if not await Hasher.verify_password_async(password, user.user_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password", 
@@ -199,135 +262,455 @@ async def login_for_access_token(
         "email": user.user_email,
     }
 
-#report form
-@app.post("/data-imports/", response_model=DataImportResponse, status_code=status.HTTP_201_CREATED)
-async def create_data_import(data_import: DataImportCreate, db: Session = Depends(get_db)):
+# column values for inserting a report into data_import
+def data_import_values(data_import: DataImportCreate, duplicate_of: Optional[str] = None) -> dict:
     point_geom = WKTElement(f"POINT({data_import.longitude} {data_import.latitude})", srid=4326)
 
-    db_data_import = DataImport(
+    return dict(
         landslideid=data_import.landslideID,
         latitude=data_import.latitude,  
         longitude=data_import.longitude,
         lstype=data_import.lsType,
         lssource=data_import.lsSource,
         impact=data_import.impact,
-        wea13_id=data_import.wea13_id,
+        wea13_id=int(data_import.wea13_id) if data_import.wea13_id is not None else None,
         wea13_type=data_import.wea13_type,
         coords=point_geom,
         user_id=data_import.user_id,
+        geohash=func.ST_GeoHash(point_geom, GEOHASH_PRECISION),
+        event_date=data_import.event_date,
+        duplicate_of=duplicate_of,
     )
 
-    db.add(db_data_import)
-    db.commit()
-    db.refresh(db_data_import)
+# what the database fills in on insert
+def inserted_columns():
+    return [
+        DataImport.landslideid,
+        DataImport.reported_at,
+        func.ST_AsGeoJSON(DataImport.coords).label('geometry_json_string'),
+    ]
+
+# write-behind mode: a batch of reports in one multi-row insert and one commit
+async def insert_data_imports(values_list: List[dict]):
+    async with AsyncSessionLocal() as db:
+        stmt = insert(DataImport).values(values_list).returning(*inserted_columns())
+        rows = (await db.execute(stmt)).all()
+        await db.execute(facets.ADD_FACETS_SQL, {"landslideids": [row.landslideid for row in rows]})
+        await db.commit()
+    # returning order is not guaranteed to follow the values list
+    by_id = {row.landslideid: row for row in rows}
+    return [by_id[values["landslideid"]] for values in values_list]
+
+report_writer = WriteBehindQueue(insert_data_imports)
+
+WRITE_BEHIND_METRICS = [
+    ("pending", "write_behind_pending", "gauge", "Reports queued for the next batch."),
+    ("batches", "write_behind_batches_total", "counter", "Batches committed."),
+    ("rows", "write_behind_rows_total", "counter", "Reports committed in batches."),
+    ("fallbacks", "write_behind_fallbacks_total", "counter", "Batches that failed and were retried row by row."),
+]
+
+def write_behind_metrics():
+    stats = report_writer.stats()
+    lines = []
+    for key, name, metric_type, help_text in WRITE_BEHIND_METRICS:
+        lines += render_stats(name, metric_type, help_text, "queue", {"reports": stats[key]})
+    return lines
+
+registry.add_collector(internal.stats_metrics)
+registry.add_collector(write_behind_metrics)
+
+#prometheus scrape target
+@app.get("/metrics", include_in_schema=False)
+def get_metrics():
+    return Response(content=registry.render(), media_type="text/plain; version=0.0.4")
+
+#report form
+@app.post("/data-imports/", response_model=DataImportResponse, status_code=status.HTTP_201_CREATED)
+async def create_data_import(data_import: DataImportCreate, response: Response,
+                             db: AsyncSession = Depends(get_async_db)):
+    problem = ingest.check_row(data_import)
+    if problem is not None:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=problem)
+
+    # the region the point is in overrides the typed wea13_id / wea13_type
+    wea13_regions.assign([data_import])
+
+    [duplicate_of] = await duplicate_checker.find(db, [data_import])
+    if duplicate_of is not None and duplicate_checker.action == "merge":
+        merged = await merge_data_import(db, data_import, duplicate_of)
+        if merged is not None:
+            response.status_code = status.HTTP_200_OK
+            response.headers["X-Duplicate-Of"] = duplicate_of
+            return merged
+        # the matching report has been deleted (or flagged) since, this one is stored as a new report
+        duplicate_of = None
+    if duplicate_of is not None:
+        response.headers["X-Duplicate-Of"] = duplicate_of
 
-    geometry_geojson_string = db.scalar(func.ST_AsGeoJSON(db_data_import.coords))
-    geometry_geojson_dict = json.loads(geometry_geojson_string)
+    server_assigned = data_import.landslideID is None
+    if server_assigned:
+        [new_id] = await landslide_ids.reserve(db, 1)
+        data_import.landslideID = str(new_id)
+
+    for attempt in range(ID_CONFLICT_RETRIES + 1):
+        try:
+            if WRITE_BEHIND:
+                # committed together with other reports submitted in the same few milliseconds
+                inserted = await report_writer.submit(data_import_values(data_import, duplicate_of))
+            else:
+                # one round trip: the insert hands back what the database filled in
+                stmt = insert(DataImport).values(**data_import_values(data_import, duplicate_of)).returning(*inserted_columns())
+                inserted = (await db.execute(stmt)).one()
+                await db.execute(facets.ADD_FACETS_SQL, {"landslideids": [data_import.landslideID]})
+                await db.commit()
+            break
+        except IntegrityError:
+            await db.rollback()
+            if not server_assigned or attempt == ID_CONFLICT_RETRIES:
+                raise HTTPException(
+                    status_code=status.HTTP_409_CONFLICT,
+                    detail=f"Landslide ID {data_import.landslideID} already exists."
+                )
+            # another report brought this id itself, see app/ids.py
+            [new_id] = await landslide_ids.reserve(db, 1)
+            data_import.landslideID = str(new_id)
+
+    if not server_assigned:
+        await landslide_ids.advance_past(db, [data_import.landslideID])
+
+    duplicate_checker.remember([data_import], [duplicate_of])
+    version = await query_cache.bump_version(db)
+    tile_cache.invalidate_point(data_import.longitude, data_import.latitude, version)
 
     return DataImportResponse.model_validate({
-        "landslideID": db_data_import.landslideid,
-        "latitude": db_data_import.latitude,
-        "longitude": db_data_import.longitude,
-        "lsType": db_data_import.lstype,
-        "lsSource": db_data_import.lssource,
-        "impact": db_data_import.impact,
-        "wea13_id": db_data_import.wea13_id,
-        "wea13_type": db_data_import.wea13_type,
-        "geometry": geometry_geojson_dict,
+        "landslideID": data_import.landslideID,
+        "latitude": data_import.latitude,
+        "longitude": data_import.longitude,
+        "lsType": data_import.lsType,
+        "lsSource": data_import.lsSource,
+        "impact": data_import.impact,
+        "wea13_id": data_import.wea13_id,
+        "wea13_type": data_import.wea13_type,
+        "geometry": json.loads(inserted.geometry_json_string),
+        "user_id": data_import.user_id,
+        "reported_at": inserted.reported_at,
+        "event_date": data_import.event_date,
     })
 
-class MaxIDsResponse(BaseModel):
-    max_landslide_id: Optional[int]
+# DUPLICATE_ACTION=merge: the report's attributes go into the existing one, which is returned
+async def merge_data_import(db: AsyncSession, data_import: DataImportCreate, duplicate_of: str):
+    merged_into = await duplicate_checker.merge(db, [data_import], [duplicate_of])
+    await db.commit()
+    if duplicate_of not in merged_into:
+        return None
 
-#for report form (gets the max ls ID)
-@app.get("/get-max-ids/", response_model=MaxIDsResponse)
-async def get_max_ids(db: Session = Depends(get_db)):
-    
-    max_landslide_id = db.query(func.max(DataImport.landslideid.cast(Integer))).scalar()
+    version = await query_cache.bump_version(db)
+    # the merged row keeps its own position, up to DUPLICATE_DISTANCE_M from the report's
+    longitude, latitude = merged_into[duplicate_of]
+    if longitude is not None and latitude is not None:
+        tile_cache.invalidate_point(longitude, latitude, version)
 
-    if max_landslide_id is not None:
-        try:
-            max_landslide_id = int(max_landslide_id)
-        except ValueError:
-            max_landslide_id = None 
-            print("Warning: max id is not valid integer.")
+    query = select(*data_import_response_columns()).filter(DataImport.landslideid == duplicate_of)
+    records = data_import_responses((await db.execute(query)).all())
+    return records[0] if records else None
+
+class BulkImportResponse(BaseModel):
+    accepted: int
+    rejected: int
+    # accepted rows that were near duplicates (flagged, or merged into the existing report)
+    duplicates: int = 0
+    errors: List[dict]
 
+# only the first few rejected rows are described in the response
+MAX_REPORTED_ERRORS = 100
 
-    return MaxIDsResponse(
-        max_landslide_id=max_landslide_id,
+def read_upload_rows(file: UploadFile):
+    # rows of a csv file or a geojson FeatureCollection, read lazily
+    filename = (file.filename or "").lower()
+    content_type = file.content_type or ""
+
+    if filename.endswith(".csv") or content_type == "text/csv":
+        return ingest.read_csv_rows(file.file)
+    if filename.endswith((".json", ".geojson")) or content_type in ("application/json", "application/geo+json"):
+        return ingest.read_geojson_rows(file.file)
+    raise HTTPException(
+        status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+        detail="Upload a .csv file or a GeoJSON FeatureCollection."
     )
 
-#query form
-@app.get("/query-data-imports/", response_model=List[DataImportResponse])
-async def query_data_imports(
-    # Query parameters 
-    search_landslideid: Optional[str] = None,
-    min_latitude: Optional[float] = None,
-    max_latitude: Optional[float] = None,
-    min_longitude:Optional[float] = None,
-    max_longitude:Optional[float] = None,
-    landslide_type: Optional[str] = None,
-    landslide_source: Optional[str] = None,
-    impact: Optional[str] = None,
-    wea13_id: Optional[str] = None,
-    wea13_type: Optional[str] = None,
-    coordinates: Optional[str] = None,
-    db: Session = Depends(get_db)
-):
-    
-    query = db.query(
-        DataImport.landslideid.label('landslideID'),
-        DataImport.latitude.label('latitude'),
-        DataImport.longitude.label('longitude'),
-        DataImport.lstype.label('lsType'),          
-        DataImport.lssource.label('lsSource'),       
-        DataImport.impact.label('impact'),
-        DataImport.wea13_id.label('wea13_id'),
-        DataImport.wea13_type.label('wea13_type'),
-        func.ST_AsGeoJSON(DataImport.coords).label('geometry_json_string'),
-        DataImport.user_id.label('user_id')
-       )
+# one bulk upload, chunk by chunk: validate() the rows, then store() the valid ones.
+# each chunk is committed on its own, the counts cover every chunk stored so far
+class BulkImport:
+    def __init__(self, db: Session):
+        self.db = db
+        self.accepted = 0
+        self.rejected = 0
+        self.duplicates = 0
+        self.errors = []
+        self.row_number = 0
+        # upload row number of each valid row of the chunk, for errors the database reports
+        self.row_numbers = {}
+        # rows of the chunk the database refused, already in errors
+        self.refused = set()
+        # rows whose landslideID came from landslide_id_seq, not from the upload
+        self.server_assigned = set()
 
-    if search_landslideid:
-        query = query.filter(DataImport.landslideid == search_landslideid)
+    def error(self, row_number: int, detail: str):
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"row": row_number, "detail": detail})
 
-    if min_latitude is not None:
-        query = query.filter(DataImport.latitude >= min_latitude)
+    def validate(self, chunk) -> List[DataImportCreate]:
+        self.row_numbers.clear()
+        self.refused.clear()
+        self.server_assigned.clear()
+        valid_rows = []
+        for raw in chunk:
+            self.row_number += 1
+            try:
+                data_import = DataImportCreate.model_validate(raw)
+            except ValidationError as e:
+                problem = "; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors())
+            else:
+                problem = ingest.check_row(data_import)
 
-    if max_latitude is not None:
-        query = query.filter(DataImport.latitude <= max_latitude)
+            if problem is None:
+                valid_rows.append(data_import)
+                self.row_numbers[id(data_import)] = self.row_number
+            else:
+                self.rejected += 1
+                self.error(self.row_number, problem)
 
-    if min_longitude is not None:
-        query = query.filter(DataImport.longitude >= min_longitude)
+        # one vectorized lookup for the whole chunk
+        wea13_regions.assign(valid_rows)
 
-    if max_longitude is not None:
-        query = query.filter(DataImport.longitude <= max_longitude)
+        without_id = [row for row in valid_rows if row.landslideID is None]
+        if without_id:
+            for row, new_id in zip(without_id, landslide_ids.reserve_sync(self.db, len(without_id))):
+                row.landslideID = str(new_id)
+                self.server_assigned.add(id(row))
+        return valid_rows
 
-    if landslide_type is not None:
-        query = query.filter(DataImport.lstype == landslide_type)
+    def copy(self, rows, duplicate_of) -> set:
+        # landslideids of the rows inserted, a row whose landslideID is already taken is skipped
+        if not rows:
+            return set()
+        try:
+            return set(ingest.copy_rows(self.db, rows, duplicate_of))
+        except DataError:
+            # a value postgres refuses, find it and keep the rest of the chunk
+            self.db.rollback()
+            inserted, failed = ingest.copy_rows_one_by_one(self.db, rows, duplicate_of)
+            for i, problem in failed:
+                self.refused.add(id(rows[i]))
+                self.error(self.row_numbers[id(rows[i])], problem)
+            return set(inserted)
 
-    if landslide_source is not None:
-        query  = query.filter(DataImport.lssource == landslide_source)
+    def copy_with_retries(self, rows, duplicate_of) -> set:
+        stored = self.copy(rows, duplicate_of)
+        for _ in range(ID_CONFLICT_RETRIES):
+            # a server assigned id another report brought itself gets a new one, see app/ids.py
+            retry = [(row, original) for row, original in zip(rows, duplicate_of)
+                     if row.landslideID not in stored and id(row) in self.server_assigned and id(row) not in self.refused]
+            if not retry:
+                break
+            for (row, _), new_id in zip(retry, landslide_ids.reserve_sync(self.db, len(retry))):
+                row.landslideID = str(new_id)
+            stored |= self.copy([row for row, _ in retry], [original for _, original in retry])
 
-    if impact is not None:
-        query = query.filter(DataImport.impact == impact)
+        explicit = [row.landslideID for row in rows if id(row) not in self.server_assigned]
+        landslide_ids.advance_past_sync(self.db, [landslideid for landslideid in explicit if landslideid in stored])
+        for row in rows:
+            if row.landslideID not in stored and id(row) not in self.refused:
+                self.error(self.row_numbers[id(row)], f"Landslide ID {row.landslideID} already exists.")
+        return stored
 
-    if wea13_id is not None:
-        query = query.filter(DataImport.wea13_id == wea13_id)
+    def store(self, valid_rows: List[DataImportCreate]):
+        if not valid_rows:
+            return
+        # checked against stored reports and the earlier rows of the upload in a few queries
+        duplicate_of = duplicate_checker.find_sync(self.db, valid_rows)
 
-    if wea13_type is not None:
-        query = query.filter(DataImport.wea13_type == wea13_type)
+        merging = []
+        if duplicate_checker.action == "merge":
+            merging = [(row, original) for row, original in zip(valid_rows, duplicate_of) if original is not None]
+            valid_rows = [row for row, original in zip(valid_rows, duplicate_of) if original is None]
+            duplicate_of = [None] * len(valid_rows)
 
-    if coordinates is not None:
-        lon, lat = map(float, coordinates.split())
-        point_geom = WKTElement(f"POINT({lon} {lat})", srid=4326)
-        query = query.filter(func.ST_Equals(DataImport.coords, point_geom))
+        stored = self.copy_with_retries(valid_rows, duplicate_of)
+        stored_rows = [(row, original) for row, original in zip(valid_rows, duplicate_of)
+                       if row.landslideID in stored]
+        duplicate_checker.remember([row for row, _ in stored_rows], [original for _, original in stored_rows])
+        self.accepted += len(stored)
+        self.duplicates += sum(original is not None for _, original in stored_rows)
+        # rows skipped because the landslideID is already in the table, or refused
+        self.rejected += len(valid_rows) - len(stored)
 
-    records = query.all()
+        if merging:
+            stored |= self.merge(merging, {row.landslideID for row in valid_rows}, stored)
 
-    if not records:
-        raise HTTPException(status_code=404, detail="No data import records found matching your criteria.")
+        if stored:
+            query_cache.bump_version_sync(self.db)
+
+    def merge(self, merging, chunk_ids: set, stored: set) -> set:
+        # after the copy, a row can be merged into an earlier row of the same upload, but only
+        # one that was stored: a skipped row's landslideID belongs to another report
+        mergeable = [(row, original) for row, original in merging
+                     if original not in chunk_ids or original in stored]
+        merged_into = duplicate_checker.merge_sync(
+            self.db, [row for row, _ in mergeable], [original for _, original in mergeable])
+        self.db.commit()
+        merged = sum(original in merged_into for _, original in merging)
+        self.accepted += merged
+        self.duplicates += merged
+
+        # what they matched is not in the table (any more), they are new reports
+        unmatched = [row for row, original in merging if original not in merged_into]
+        stored_unmatched = self.copy_with_retries(unmatched, [None] * len(unmatched))
+        duplicate_checker.remember([row for row in unmatched if row.landslideID in stored_unmatched])
+        self.accepted += len(stored_unmatched)
+        self.rejected += len(unmatched) - len(stored_unmatched)
+        return stored_unmatched | set(merged_into)
+
+    def response(self) -> BulkImportResponse:
+        return BulkImportResponse(accepted=self.accepted, rejected=self.rejected,
+                                  duplicates=self.duplicates, errors=self.errors)
+
+#bulk upload (csv file or geojson FeatureCollection of points)
+@app.post("/data-imports/bulk", response_model=BulkImportResponse)
+@profiled_in_thread
+def create_data_imports_bulk(file: UploadFile = File(...), db: Session = Depends(get_db)):
+    rows = read_upload_rows(file)
+    upload = BulkImport(db)
+
+    try:
+        for chunk in ingest.chunked(rows):
+            upload.store(upload.validate(chunk))
+    except (ValueError, UnicodeDecodeError) as e:
+        # ValueError also covers json.JSONDecodeError and malformed csv. the chunks before the
+        # bad row are committed, the counts tell the client where to resume
+        db.rollback()
+        if upload.accepted:
+            tile_cache.clear()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail={
+                "message": (f"Could not read upload after row {upload.row_number}: {e}. "
+                            f"Rows 1 to {upload.row_number} were processed, none after them were stored."),
+                **upload.response().model_dump(),
+            }
+        )
+
+    # a bulk load touches too many tiles to track one by one
+    if upload.accepted:
+        tile_cache.clear()
+
+    return upload.response()
+
+class LandslideIdsResponse(BaseModel):
+    ids: List[str]
+
+# ids come out of this process's block of landslide_id_seq, see app/ids.py
+landslide_ids = IdAllocator(landslide_id_seq)
+
+#for report form (reserves the id shown on the form)
+@app.post("/landslide-ids/reserve", response_model=LandslideIdsResponse)
+async def reserve_landslide_ids(count: int = Query(1, ge=1, le=MAX_ID_RESERVATION),
+                                db: AsyncSession = Depends(get_async_db)):
+    ids = await landslide_ids.reserve(db, count)
+    return LandslideIdsResponse(ids=[str(new_id) for new_id in ids])
+
+class LandslideSuggestion(BaseModel):
+    landslideID: str
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
+
+MAX_SUGGESTIONS = 20
+# trigrams of shorter input match almost everything
+MIN_FUZZY_QUERY_LENGTH = 3
+
+#typeahead for landslide ids: prefix matches first, then the closest fuzzy matches
+@app.get("/data-imports/suggest", response_model=List[LandslideSuggestion])
+async def suggest_landslide_ids(
+    q: str = Query(..., min_length=1, max_length=64),
+    limit: int = Query(10, ge=1, le=MAX_SUGGESTIONS),
+    db: AsyncSession = Depends(get_async_db)
+):
+    columns = (DataImport.landslideid, DataImport.latitude, DataImport.longitude)
+
+    # USING ~<~ is the order of the text_pattern_ops index, so the scan stops after limit rows
+    # even when a one character prefix matches most of the table
+    prefix_query = select(*columns).filter(
+        DataImport.landslideid.startswith(q, autoescape=True)
+    ).order_by(text('landslideid USING ~<~')).limit(limit)
+    rows = (await db.execute(prefix_query)).all()
+
+    if len(rows) < limit and len(q) >= MIN_FUZZY_QUERY_LENGTH:
+        # % and <-> are both served by the trigram GiST index
+        fuzzy_query = select(*columns).filter(
+            DataImport.landslideid.op('%')(q)
+        ).order_by(DataImport.landslideid.op('<->')(q)).limit(limit)
+        seen = {row.landslideid for row in rows}
+        rows += [row for row in await db.execute(fuzzy_query) if row.landslideid not in seen]
+
+    return [
+        LandslideSuggestion(landslideID=rec.landslideid, latitude=rec.latitude, longitude=rec.longitude)
+        for rec in rows[:limit]
+    ]
+
+# columns for DataImportResponse, the geometry comes back as a geojson string.
+# precision rounds the coordinates to that many decimals (5 is about a metre)
+def data_import_response_columns(precision: Optional[int] = None):
+    if precision is None:
+        latitude, longitude = DataImport.latitude, DataImport.longitude
+        geometry = func.ST_AsGeoJSON(DataImport.coords)
+    else:
+        latitude = cast(func.round(cast(DataImport.latitude, Numeric), precision), Float)
+        longitude = cast(func.round(cast(DataImport.longitude, Numeric), precision), Float)
+        geometry = func.ST_AsGeoJSON(DataImport.coords, precision)
 
+    return [
+        DataImport.landslideid.label('landslideID'),
+        latitude.label('latitude'),
+        longitude.label('longitude'),
+        DataImport.lstype.label('lsType'),          
+        DataImport.lssource.label('lsSource'),       
+        DataImport.impact.label('impact'),
+        # the response models carry wea13_id as a string
+        cast(DataImport.wea13_id, String).label('wea13_id'),
+        DataImport.wea13_type.label('wea13_type'),
+        geometry.label('geometry_json_string'),
+        DataImport.user_id.label('user_id'),
+        DataImport.reported_at.label('reported_at'),
+        DataImport.event_date.label('event_date'),
+    ]
+
+# fields=landslideID,lsType,geometry -> the matching columns. landslideID is always included
+# (pagination needs it) and latitude / longitude are left out whenever the geometry is asked
+# for, since it carries the same coordinates
+def projected_columns(fields: Optional[List[str]], precision: Optional[int] = None):
+    columns = data_import_response_columns(precision)
+    if fields is None:
+        return columns
+    wanted = {"geometry_json_string" if name == "geometry" else name for name in fields} | {"landslideID"}
+    if "geometry_json_string" in wanted:
+        wanted -= {"latitude", "longitude"}
+    return [column for column in columns if column.name in wanted]
+
+def parse_fields(fields: Optional[str]) -> Optional[List[str]]:
+    if fields is None:
+        return None
+    names = [name.strip() for name in fields.split(",") if name.strip()]
+    unknown = [name for name in names if name not in DataImportResponse.model_fields]
+    if unknown or not names:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown fields: {', '.join(unknown)}" if unknown else "fields is empty."
+        )
+    return names
+
+# turns rows selected with data_import_response_columns() into response models
+def data_import_responses(records, response_model=DataImportResponse):
     final_response_data = []
     for rec in records:
         rec_dict = rec._asdict() 
@@ -338,13 +721,565 @@ async def query_data_imports(
             try:
                 rec_dict['geometry'] = json.loads(rec_dict['geometry_json_string'])
             except json.JSONDecodeError:
-                print(f"Error parsing geometry string in query_data_imports: {rec_dict['geometry_json_string']}")
+                print(f"Error parsing geometry string: {rec_dict['geometry_json_string']}")
                 rec_dict['geometry'] = None 
         else:
             rec_dict['geometry'] = None 
 
         del rec_dict['geometry_json_string'] 
         
-        final_response_data.append(DataImportResponse.model_validate(rec_dict))
+        final_response_data.append(response_model.model_validate(rec_dict))
+
+    return final_response_data
+
+# filters shared by the query endpoints, used as a dependency so every endpoint takes the same query parameters
+class DataImportFilters:
+    def __init__(
+        self,
+        search_landslideid: Optional[str] = None,
+        landslideid_prefix: Optional[str] = None,
+        duplicate: Optional[bool] = None,
+        min_latitude: Optional[float] = None,
+        max_latitude: Optional[float] = None,
+        min_longitude: Optional[float] = None,
+        max_longitude: Optional[float] = None,
+        landslide_type: Optional[str] = None,
+        landslide_source: Optional[str] = None,
+        impact: Optional[str] = None,
+        wea13_id: Optional[int] = None,
+        wea13_type: Optional[str] = None,
+        coordinates: Optional[str] = None,
+        reported_after: Optional[datetime] = None,
+        reported_before: Optional[datetime] = None,
+        event_after: Optional[date] = None,
+        event_before: Optional[date] = None,
+    ):
+        self.search_landslideid = search_landslideid
+        self.landslideid_prefix = landslideid_prefix
+        self.duplicate = duplicate
+        self.min_latitude = min_latitude
+        self.max_latitude = max_latitude
+        self.min_longitude = min_longitude
+        self.max_longitude = max_longitude
+        self.landslide_type = landslide_type
+        self.landslide_source = landslide_source
+        self.impact = impact
+        self.wea13_id = wea13_id
+        self.wea13_type = wea13_type
+        self.coordinates = coordinates
+        self.reported_after = reported_after
+        self.reported_before = reported_before
+        self.event_after = event_after
+        self.event_before = event_before
+
+    def has_bbox(self) -> bool:
+        return any(bound is not None for bound in (
+            self.min_latitude, self.max_latitude, self.min_longitude, self.max_longitude))
+
+    # works on both db.query(...) and select(...)
+    def apply(self, query):
+        if self.search_landslideid:
+            query = query.filter(DataImport.landslideid == self.search_landslideid)
+
+        # LIKE 'prefix%', served by ix_data_import_landslideid_pattern
+        if self.landslideid_prefix:
+            query = query.filter(DataImport.landslideid.startswith(self.landslideid_prefix, autoescape=True))
+
+        # true for the reports flagged as near duplicates (app/dedup.py), false for the rest
+        if self.duplicate is not None:
+            query = query.filter(DataImport.duplicate_of.isnot(None) if self.duplicate else DataImport.duplicate_of.is_(None))
+
+        # the lat/lon bounds become one envelope so the GiST index on coords can serve them
+        if self.has_bbox():
+            envelope = func.ST_MakeEnvelope(
+                self.min_longitude if self.min_longitude is not None else -180,
+                self.min_latitude if self.min_latitude is not None else -90,
+                self.max_longitude if self.max_longitude is not None else 180,
+                self.max_latitude if self.max_latitude is not None else 90,
+                4326,
+            )
+            query = query.filter(DataImport.coords.op('&&')(envelope))
+
+        if self.landslide_type is not None:
+            query = query.filter(DataImport.lstype == self.landslide_type)
+
+        if self.landslide_source is not None:
+            query  = query.filter(DataImport.lssource == self.landslide_source)
+
+        if self.impact is not None:
+            query = query.filter(DataImport.impact == self.impact)
+
+        if self.wea13_id is not None:
+            query = query.filter(DataImport.wea13_id == self.wea13_id)
+
+        if self.wea13_type is not None:
+            query = query.filter(DataImport.wea13_type == self.wea13_type)
+
+        if self.coordinates is not None:
+            lon, lat = map(float, self.coordinates.split())
+            point_geom = WKTElement(f"POINT({lon} {lat})", srid=4326)
+            query = query.filter(func.ST_Equals(DataImport.coords, point_geom))
+
+        # time windows are half open: after <= t < before
+        if self.reported_after is not None:
+            query = query.filter(DataImport.reported_at >= self.reported_after)
+
+        if self.reported_before is not None:
+            query = query.filter(DataImport.reported_at < self.reported_before)
+
+        if self.event_after is not None:
+            query = query.filter(DataImport.event_date >= self.event_after)
+
+        if self.event_before is not None:
+            query = query.filter(DataImport.event_date < self.event_before)
+
+        return query
+
+#query form
+@app.get("/query-data-imports/", response_model=List[DataImportResponse])
+async def query_data_imports(
+    filters: DataImportFilters = Depends(),
+    # opt-in keyset pagination, the next page's cursor is sent back in the X-Next-Cursor header
+    limit: Optional[int] = Query(None, ge=1, le=pagination.MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    # compact map payloads: only these comma separated fields (see projected_columns) and
+    # coordinates rounded to this many decimals
+    fields: Optional[str] = None,
+    precision: Optional[int] = Query(None, ge=0, le=9),
+    if_none_match: Optional[str] = Header(None),
+    accept_encoding: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_async_db)
+):
+
+    if cursor is not None and limit is None:
+        limit = pagination.DEFAULT_PAGE_SIZE
+
+    field_names = parse_fields(fields)
+    encoding = compression.choose_encoding(accept_encoding)
+
+    # read the version before querying, a write that lands meanwhile only makes this entry stale
+    version = await query_cache.current_version(db)
+    filters_key = filter_hash({
+        **vars(filters), "limit": limit, "cursor": cursor,
+        "fields": sorted(field_names) if field_names else None, "precision": precision,
+    })
+    # each encoding is its own cache entry and its own representation (ETag)
+    if encoding is not None:
+        filters_key = f"{filters_key}-{encoding}"
+    etag = query_cache.etag(version, filters_key)
+
+    # the client already has this result, no database work at all
+    if query_cache.is_fresh(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag, "Cache-Control": "no-cache"})
+
+    cached = query_cache.get(version, filters_key)
+    if cached is None:
+        body, next_cursor = await run_data_import_query(db, filters, limit, cursor, field_names, precision)
+        if encoding is not None:
+            with phase("compress"):
+                body = compression.compress(body, encoding)
+        cached = (body, next_cursor)
+        query_cache.put(version, filters_key, *cached)
+    body, next_cursor = cached
+
+    # "*" only matches now that the query found rows, an empty result was a 404 above
+    if query_cache.is_fresh(if_none_match, etag, exists=True):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag, "Cache-Control": "no-cache"})
+
+    # no-cache: browsers keep the body but revalidate with If-None-Match every time
+    headers = {"ETag": etag, "Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+    if encoding is not None:
+        headers["Content-Encoding"] = encoding
+    if next_cursor is not None:
+        headers["X-Next-Cursor"] = next_cursor
+    return Response(content=body, media_type="application/json", headers=headers)
+
+# returns (json body, next page cursor or None)
+async def run_data_import_query(db: AsyncSession, filters: DataImportFilters, limit: Optional[int],
+                                cursor: Optional[str], fields: Optional[List[str]] = None,
+                                precision: Optional[int] = None):
+    query = select(*projected_columns(fields, precision))
+
+    query = filters.apply(query)
+
+    if limit is not None:
+        if cursor is not None:
+            try:
+                after_landslideid = pagination.decode_cursor(cursor)
+            except pagination.InvalidCursor as e:
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+            query = query.filter(DataImport.landslideid > after_landslideid)
+
+        # one extra row tells us whether there is a next page
+        query = query.order_by(DataImport.landslideid).limit(limit + 1)
+
+    records = (await db.execute(query)).all()
+
+    next_cursor = None
+    if limit is not None and len(records) > limit:
+        records = records[:limit]
+        next_cursor = pagination.encode_cursor(records[-1].landslideID)
+
+    if not records:
+        raise HTTPException(status_code=404, detail="No data import records found matching your criteria.")
+
+    # same shape as List[DataImportResponse], without a pydantic model per row
+    return fastjson.dump_rows(records), next_cursor
+
+AREA_CHUNK_ROWS = 2000
+
+#"slides inside this watershed": rows inside a posted GeoJSON polygon, streamed as the same
+#json array as /query-data-imports/
+@app.post("/query-data-imports/area", response_model=List[DataImportResponse])
+@profiled_in_thread
+def query_data_imports_area(
+    area: dict = Body(..., description="GeoJSON Polygon or MultiPolygon, or a Feature with one"),
+    filters: DataImportFilters = Depends(),
+    fields: Optional[str] = None,
+    precision: Optional[int] = Query(None, ge=0, le=9),
+    db: Session = Depends(get_db)
+):
+    field_names = parse_fields(fields)
+    try:
+        geojson = areas.parse_area(area)
+    except areas.InvalidArea as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    # the area's bbox is the index condition on data_import (an EXISTS over the pieces cannot
+    # use the GiST index on coords), the pieces are then checked per candidate point: bbox
+    # first, the exact test only against the small piece that passed it. EXISTS returns a
+    # point on the border of two pieces once
+    shape = areas.area_shape(geojson)
+    pieces = areas.area_pieces(shape)
+    inside = select(literal_column('1')).select_from(pieces).where(
+        pieces.c.geom.op('&&')(DataImport.coords),
+        func.ST_Intersects(pieces.c.geom, DataImport.coords),
+    ).exists()
+    query = filters.apply(select(*projected_columns(field_names, precision))).filter(
+        DataImport.coords.op('&&')(areas.area_envelope(shape)),
+        inside,
+    )
+
+    # parse_area refused invalid polygons, a database error here is a real one
+    partitions = db.execute(query.execution_options(yield_per=AREA_CHUNK_ROWS)).partitions()
+    # the first rows are read before answering, so an empty result is still a 404
+    first = next(partitions, None)
+    if first is None:
+        raise HTTPException(status_code=404, detail="No data import records found matching your criteria.")
+
+    def stream_rows():
+        # each chunk is a json array, written without its brackets
+        yield b"[" + fastjson.dump_rows(first)[1:-1]
+        for rows in partitions:
+            yield b"," + fastjson.dump_rows(rows)[1:-1]
+        yield b"]"
+
+    return StreamingResponse(profiled_iterator(stream_rows()), media_type="application/json")
+
+# rows fetched from the server side cursor per round trip / per chunk sent to the client
+GEOJSON_CHUNK_ROWS = 2000
+
+#for the map, postgis builds each feature so python only joins strings
+@app.get("/query-data-imports.geojson")
+@profiled_in_thread
+def query_data_imports_geojson(
+    filters: DataImportFilters = Depends(),
+    db: Session = Depends(get_db)
+):
+    feature = func.json_build_object(
+        'type', 'Feature',
+        'id', DataImport.landslideid,
+        'geometry', cast(func.ST_AsGeoJSON(DataImport.coords), JSON),
+        'properties', func.json_build_object(
+            'landslideID', DataImport.landslideid,
+            'latitude', DataImport.latitude,
+            'longitude', DataImport.longitude,
+            'lsType', DataImport.lstype,
+            'lsSource', DataImport.lssource,
+            'impact', DataImport.impact,
+            'wea13_id', DataImport.wea13_id,
+            'wea13_type', DataImport.wea13_type,
+            'user_id', DataImport.user_id,
+            'reported_at', DataImport.reported_at,
+            'event_date', DataImport.event_date,
+        ),
+    )
+    # cast to text so the driver hands back the json string instead of parsing it
+    query = filters.apply(select(cast(feature, Text)))
+
+    def stream_features():
+        yield b'{"type":"FeatureCollection","features":['
+        result = db.execute(query.execution_options(yield_per=GEOJSON_CHUNK_ROWS))
+        separator = ""
+        for features in result.scalars().partitions():
+            count_rows(len(features))
+            yield (separator + ",".join(features)).encode()
+            separator = ","
+        yield b']}'
+
+    return StreamingResponse(profiled_iterator(stream_features()), media_type="application/geo+json")
+
+# columns in app.export.EXPORT_FIELDS order, geometry as WKB
+def export_columns():
+    return [
+        DataImport.landslideid,
+        DataImport.latitude,
+        DataImport.longitude,
+        DataImport.lstype,
+        DataImport.lssource,
+        DataImport.impact,
+        DataImport.wea13_id,
+        DataImport.wea13_type,
+        DataImport.user_id,
+        DataImport.reported_at,
+        DataImport.event_date,
+        func.ST_AsBinary(DataImport.coords),
+    ]
+
+def export_response(filters: DataImportFilters, db: Session, stream, media_type: str, filename: str):
+    query = filters.apply(select(*export_columns())).execution_options(yield_per=export.EXPORT_BATCH_ROWS)
+
+    def partitions():
+        # psycopg2 hands bytea back as memoryview
+        for rows in db.execute(query).partitions():
+            count_rows(len(rows))
+            yield [row[:-1] + (bytes(row[-1]) if row[-1] is not None else None,) for row in rows]
+
+    return StreamingResponse(
+        profiled_iterator(stream(partitions())),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+#for analysts, the whole (filtered) inventory as GeoParquet
+@app.get("/export/data-imports.parquet")
+@profiled_in_thread
+def export_data_imports_parquet(
+    filters: DataImportFilters = Depends(),
+    db: Session = Depends(get_db)
+):
+    return export_response(filters, db, export.stream_parquet, "application/vnd.apache.parquet", "data-imports.parquet")
+
+#same as an arrow IPC stream
+@app.get("/export/data-imports.arrow")
+@profiled_in_thread
+def export_data_imports_arrow(
+    filters: DataImportFilters = Depends(),
+    db: Session = Depends(get_db)
+):
+    return export_response(filters, db, export.stream_arrow, "application/vnd.apache.arrow.stream", "data-imports.arrow")
+
+
+#vector tiles for the map, only the visible tiles are requested by the frontend
+@app.get("/tiles/{z}/{x}/{y}.mvt")
+async def get_tile(
+    z: int,
+    x: int,
+    y: int,
+    landslide_type: Optional[str] = None,
+    landslide_source: Optional[str] = None,
+    impact: Optional[str] = None,
+    wea13_type: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    if not is_valid_tile(z, x, y):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Tile out of range.")
+
+    filters = DataImportFilters(
+        landslide_type=landslide_type,
+        landslide_source=landslide_source,
+        impact=impact,
+        wea13_type=wea13_type,
+    )
+    filters_key = filter_hash({
+        "landslide_type": landslide_type,
+        "landslide_source": landslide_source,
+        "impact": impact,
+        "wea13_type": wea13_type,
+    })
+
+    # writes of other workers only show up in the data version
+    tile_cache.observe(await query_cache.current_version(db))
+    tile = tile_cache.get(z, x, y, filters_key)
+    if tile is None:
+        envelope = func.ST_TileEnvelope(z, x, y)
+        features = select(
+            func.ST_AsMVTGeom(func.ST_Transform(DataImport.coords, 3857), envelope).label('geom'),
+            DataImport.landslideid.label('landslideID'),
+            DataImport.lstype.label('lsType'),
+            DataImport.lssource.label('lsSource'),
+            DataImport.impact.label('impact'),
+            DataImport.wea13_id.label('wea13_id'),
+            DataImport.wea13_type.label('wea13_type'),
+        ).filter(DataImport.coords.op('&&')(func.ST_Transform(envelope, 4326)))
+        features = filters.apply(features).subquery('tile_features')
+
+        tile, rows = (await db.execute(select(
+            func.ST_AsMVT(literal_column('tile_features'), 'landslides'), func.count(),
+        ).select_from(features))).one()
+        count_rows(rows)
+        tile = bytes(tile) if tile is not None else b""
+        tile_cache.put(z, x, y, filters_key, tile)
+
+    return Response(content=tile, media_type="application/vnd.mapbox-vector-tile")
+
+
+class ClusterResponse(BaseModel):
+    cell: str
+    latitude: float
+    longitude: float
+    count: int
+    lsTypes: dict
+
+# the same expression object goes into the SELECT and the GROUP BY: with asyncpg every literal
+# is a bind parameter, and coalesce(lstype, $2) / coalesce(lstype, $8) are different
+# expressions to postgres ("must appear in the GROUP BY clause")
+def clusters_query(min_longitude: float, min_latitude: float, max_longitude: float, max_latitude: float,
+                   zoom: int):
+    cell = func.left(DataImport.geohash, precision_for_zoom(zoom)).label('cell')
+    ls_type = func.coalesce(DataImport.lstype, literal_column("'unknown'"))
+    envelope = func.ST_MakeEnvelope(min_longitude, min_latitude, max_longitude, max_latitude, 4326)
+
+    per_type = select(
+        cell,
+        ls_type.label('lstype'),
+        func.count().label('n'),
+        func.sum(func.ST_X(DataImport.coords)).label('sum_x'),
+        func.sum(func.ST_Y(DataImport.coords)).label('sum_y'),
+    ).filter(
+        DataImport.coords.op('&&')(envelope)
+    ).group_by(cell, ls_type).subquery()
+
+    total = func.sum(per_type.c.n)
+    return select(
+        per_type.c.cell,
+        (func.sum(per_type.c.sum_x) / total).label('longitude'),
+        (func.sum(per_type.c.sum_y) / total).label('latitude'),
+        total.label('count'),
+        func.json_object_agg(per_type.c.lstype, per_type.c.n).label('lsTypes'),
+    ).group_by(per_type.c.cell)
+
+#clusters for the map at low zoom, grouped by the geohash stored with each row
+@app.get("/clusters", response_model=List[ClusterResponse])
+async def get_clusters(
+    min_longitude: float = Query(..., ge=-180, le=180),
+    min_latitude: float = Query(..., ge=-90, le=90),
+    max_longitude: float = Query(..., ge=-180, le=180),
+    max_latitude: float = Query(..., ge=-90, le=90),
+    zoom: int = Query(..., ge=0, le=22),
+    db: AsyncSession = Depends(get_async_db)
+):
+    query = clusters_query(min_longitude, min_latitude, max_longitude, max_latitude, zoom)
+    records = (await db.execute(query)).all()
+    count_rows(len(records))
+
+    return [
+        ClusterResponse(
+            cell=rec.cell,
+            latitude=rec.latitude,
+            longitude=rec.longitude,
+            count=rec.count,
+            lsTypes=rec.lsTypes,
+        )
+        for rec in records
+    ]
+
+
+class DataImportNearResponse(DataImportResponse):
+    distance_m: float
+
+MAX_NEAR_RADIUS_M = 500_000
+MAX_NEAR_RESULTS = 100
+
+#for field crews, closest landslides to a point
+@app.get("/data-imports/near", response_model=List[DataImportNearResponse])
+async def query_data_imports_near(
+    lon: float = Query(..., ge=-180, le=180),
+    lat: float = Query(..., ge=-90, le=90),
+    radius_m: float = Query(5000, gt=0, le=MAX_NEAR_RADIUS_M),
+    k: int = Query(10, ge=1, le=MAX_NEAR_RESULTS),
+    db: AsyncSession = Depends(get_async_db)
+):
+    # geography(coords) matches the idx_data_import_coords_geography index so both the
+    # radius filter and the knn ordering are answered from the index
+    coords_geography = func.geography(DataImport.coords)
+    point_geography = func.geography(func.ST_SetSRID(func.ST_MakePoint(lon, lat), 4326))
+
+    query = select(
+        *data_import_response_columns(),
+        func.ST_Distance(coords_geography, point_geography).label('distance_m'),
+    ).filter(
+        func.ST_DWithin(coords_geography, point_geography, radius_m)
+    ).order_by(
+        coords_geography.op('<->')(point_geography)
+    ).limit(k)
+
+    records = (await db.execute(query)).all()
+
+    # same shape as List[DataImportNearResponse]
+    return Response(content=fastjson.dump_rows(records), media_type="application/json")
+
+
+class TimelineBucket(BaseModel):
+    bucket: date
+    count: int
+
+#counts per day / week / month, grouped in the database
+@app.get("/stats/timeline", response_model=List[TimelineBucket])
+async def get_timeline(
+    bucket: Literal["day", "week", "month"] = "day",
+    field: Literal["reported_at", "event_date"] = "reported_at",
+    filters: DataImportFilters = Depends(),
+    db: AsyncSession = Depends(get_async_db)
+):
+    column = DataImport.reported_at if field == "reported_at" else DataImport.event_date
+    bucket_start = cast(func.date_trunc(bucket, column), Date).label('bucket')
+
+    query = select(bucket_start, func.count().label('count')).filter(column.isnot(None))
+    query = filters.apply(query).group_by(bucket_start).order_by(bucket_start)
+
+    records = (await db.execute(query)).all()
+    count_rows(len(records))
+    return [TimelineBucket(bucket=rec.bucket, count=rec.count) for rec in records]
+
+
+class FacetsResponse(BaseModel):
+    total: int
+    exact: bool
+    facets: Dict[str, Dict[str, int]]
+
+#counts by lstype / lssource / impact / wea13_type for the query form and dashboards,
+#summed from data_import_facets instead of scanning data_import
+@app.get("/stats/facets", response_model=FacetsResponse)
+async def get_facets(
+    min_longitude: float = Query(-180, ge=-180, le=180),
+    min_latitude: float = Query(-90, ge=-90, le=90),
+    max_longitude: float = Query(180, ge=-180, le=180),
+    max_latitude: float = Query(90, ge=-90, le=90),
+    exact: bool = False,
+    db: AsyncSession = Depends(get_async_db)
+):
+    if min_longitude > max_longitude or min_latitude > max_latitude:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="min values must not exceed max values.")
+
+    inside, edge = facets.cover_bbox(min_longitude, min_latitude, max_longitude, max_latitude)
+    # without exact the cells along the edge are counted whole, so points slightly outside the box are included
+    summary_cells = inside if exact else inside + edge
+
+    counts = facets.empty_counts()
+    if summary_cells:
+        rows = (await db.execute(facets.FACETS_FROM_SUMMARY_SQL, facets.summary_params(summary_cells))).all()
+        count_rows(len(rows))
+        facets.add_counts(counts, rows)
+    if exact and edge:
+        rows = (await db.execute(facets.FACETS_FROM_ROWS_SQL[len(edge[0])], {
+            "cells": edge,
+            "min_lon": min_longitude, "min_lat": min_latitude,
+            "max_lon": max_longitude, "max_lat": max_latitude,
+        })).all()
+        count_rows(len(rows))
+        facets.add_counts(counts, rows)
 
-    return final_response_data
\ No newline at end of file
+    # every row is counted once under each facet
+    total = sum(counts["lstype"].values())
+    return FacetsResponse(total=total, exact=exact or not edge, facets=counts)
@@ -0,0 +1,9 @@
+-- Grid cell key for the /clusters endpoint.
+-- Stores the geohash of each point once, the cluster cell at any zoom is a prefix of it.
+-- Apply with: psql "$DATABASE_URL" -f migrations/001_data_import_geohash.sql
+
+ALTER TABLE data_import ADD COLUMN IF NOT EXISTS geohash varchar(8);
+
+UPDATE data_import SET geohash = ST_GeoHash(coords, 8) WHERE geohash IS NULL AND coords IS NOT NULL;
+
+CREATE INDEX IF NOT EXISTS ix_data_import_geohash ON data_import (geohash);
@@ -0,0 +1,12 @@
+-- latitude / longitude were varchar, so the bbox filters compared strings.
+-- Converts them to double precision and makes sure coords has its GiST index,
+-- bbox queries are now a single coords && envelope predicate served by that index.
+-- Apply with: psql "$DATABASE_URL" -f migrations/002_numeric_lat_lon_gist.sql
+
+ALTER TABLE data_import
+    ALTER COLUMN latitude TYPE double precision USING NULLIF(trim(latitude), '')::double precision,
+    ALTER COLUMN longitude TYPE double precision USING NULLIF(trim(longitude), '')::double precision;
+
+CREATE INDEX IF NOT EXISTS idx_data_import_coords ON data_import USING GIST (coords);
+
+ANALYZE data_import;
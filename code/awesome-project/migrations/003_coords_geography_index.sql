@@ -0,0 +1,5 @@
+-- GiST index on coords as geography, used by /data-imports/near for ST_DWithin in metres
+-- and for <-> nearest neighbour ordering.
+-- Apply with: psql "$DATABASE_URL" -f migrations/003_coords_geography_index.sql
+
+CREATE INDEX IF NOT EXISTS idx_data_import_coords_geography ON data_import USING GIST (geography(coords));
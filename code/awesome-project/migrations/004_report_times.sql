@@ -0,0 +1,31 @@
+-- reported_at (set on insert) and event_date (from the reporter) for time window queries.
+-- Rows are appended in reported_at order so a BRIN index is enough for it, event_date comes
+-- from historical inventories in any order and gets a b-tree.
+-- The rows already in the table were never stamped: they take their event_date where there is
+-- one instead of the time this migration runs, which would put the whole backlog into one
+-- /stats/timeline bucket. Rows without either stay NULL, the check constraint still makes
+-- every new row carry a reported_at.
+-- Apply with: psql "$DATABASE_URL" -f migrations/004_report_times.sql
+
+ALTER TABLE data_import
+    ADD COLUMN IF NOT EXISTS reported_at timestamptz,
+    ADD COLUMN IF NOT EXISTS event_date date;
+
+UPDATE data_import SET reported_at = event_date::timestamptz
+WHERE reported_at IS NULL AND event_date IS NOT NULL;
+
+ALTER TABLE data_import ALTER COLUMN reported_at SET DEFAULT now();
+
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM data_import WHERE reported_at IS NULL) THEN
+        ALTER TABLE data_import ALTER COLUMN reported_at SET NOT NULL;
+    ELSIF NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conname = 'data_import_reported_at_not_null') THEN
+        -- NOT VALID: enforced for new and updated rows, the historical NULLs are left alone
+        ALTER TABLE data_import ADD CONSTRAINT data_import_reported_at_not_null
+            CHECK (reported_at IS NOT NULL) NOT VALID;
+    END IF;
+END $$;
+
+CREATE INDEX IF NOT EXISTS brin_data_import_reported_at ON data_import USING BRIN (reported_at);
+CREATE INDEX IF NOT EXISTS ix_data_import_event_date ON data_import (event_date);
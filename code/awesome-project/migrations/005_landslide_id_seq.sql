@@ -0,0 +1,11 @@
+-- Sequence for new landslide ids, replacing max(landslideid) on every report form open.
+-- Each nextval() reserves a block of 100 ids that the api hands out from memory (app/ids.py),
+-- so INCREMENT BY must match the Sequence in app/models.py.
+-- Apply with: psql "$DATABASE_URL" -f migrations/005_landslide_id_seq.sql
+
+CREATE SEQUENCE IF NOT EXISTS landslide_id_seq INCREMENT BY 100 START WITH 100090;
+
+-- continue after the highest numeric id already stored (100089 is the form's old fallback)
+SELECT setval('landslide_id_seq',
+              GREATEST(100089, (SELECT max(landslideid::bigint) FROM data_import WHERE landslideid ~ '^[0-9]+$')) + 1,
+              false);
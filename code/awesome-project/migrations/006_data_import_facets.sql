@@ -0,0 +1,30 @@
+-- Facet counts (lstype, lssource, impact, wea13_type) for /stats/facets.
+-- One row per 4 character geohash cell, facet and value, so a bbox is answered by summing
+-- a few cells instead of scanning data_import (coarser cells are summed from these, see
+-- 010_data_import_facets_fine_cells.sql). Re-running this file drops rows of coarser cells
+-- left by an earlier version.
+-- The api adds to it in the same transaction as every insert, `python -m app.facets --rebuild`
+-- recounts it from scratch.
+-- Apply with: psql "$DATABASE_URL" -f migrations/006_data_import_facets.sql
+
+CREATE TABLE IF NOT EXISTS data_import_facets (
+    cell varchar(4) NOT NULL,
+    facet varchar NOT NULL,
+    value varchar NOT NULL,
+    count bigint NOT NULL,
+    PRIMARY KEY (cell, facet, value)
+);
+
+-- the cells along a bbox edge are counted exactly from the rows
+CREATE INDEX IF NOT EXISTS ix_data_import_geohash_cell ON data_import (left(geohash, 4));
+
+BEGIN;
+TRUNCATE data_import_facets;
+INSERT INTO data_import_facets (cell, facet, value, count)
+SELECT left(d.geohash, 4) AS cell, f.facet, coalesce(f.value, 'unknown') AS value, count(*) AS count
+FROM data_import AS d
+CROSS JOIN LATERAL (VALUES ('lstype', d.lstype), ('lssource', d.lssource),
+                           ('impact', d.impact), ('wea13_type', d.wea13_type)) AS f(facet, value)
+WHERE d.geohash IS NOT NULL
+GROUP BY 1, 2, 3;
+COMMIT;
@@ -0,0 +1,10 @@
+-- Prefix and fuzzy lookup of landslide ids for /data-imports/suggest.
+-- The primary key index follows the database collation, so LIKE 'abc%' can only use it under
+-- the C locale; text_pattern_ops compares byte-wise and serves prefix matches everywhere.
+-- The trigram GiST index serves both the % similarity filter and ORDER BY landslideid <-> q.
+-- Apply with: psql "$DATABASE_URL" -f migrations/007_landslideid_search.sql
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE INDEX IF NOT EXISTS ix_data_import_landslideid_pattern ON data_import (landslideid text_pattern_ops);
+CREATE INDEX IF NOT EXISTS ix_data_import_landslideid_trgm ON data_import USING GIST (landslideid gist_trgm_ops);
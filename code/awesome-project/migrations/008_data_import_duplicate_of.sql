@@ -0,0 +1,9 @@
+-- Near duplicate reports (app/dedup.py). With DUPLICATE_ACTION=flag a report within
+-- DUPLICATE_DISTANCE_M of an existing one is stored with duplicate_of pointing at it.
+-- Only flagged rows are indexed, they are the ones looked up for review.
+-- Apply with: psql "$DATABASE_URL" -f migrations/008_data_import_duplicate_of.sql
+
+ALTER TABLE data_import ADD COLUMN IF NOT EXISTS duplicate_of varchar;
+
+CREATE INDEX IF NOT EXISTS ix_data_import_duplicate_of ON data_import (duplicate_of)
+    WHERE duplicate_of IS NOT NULL;
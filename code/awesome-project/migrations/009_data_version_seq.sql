@@ -0,0 +1,6 @@
+-- Data version for the /query-data-imports/ cache (app/query_cache.py). Every write path calls
+-- nextval() after it commits, so cached results and ETags go stale in every worker and stay
+-- valid across restarts only while nothing was written.
+-- Apply with: psql "$DATABASE_URL" -f migrations/009_data_version_seq.sql
+
+CREATE SEQUENCE IF NOT EXISTS data_version_seq;
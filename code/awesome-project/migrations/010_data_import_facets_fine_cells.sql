@@ -0,0 +1,10 @@
+-- data_import_facets keeps only the 4 character geohash cells (app/facets.py). The coarser
+-- cells were updated by every insert in their region and concurrent writers queued on them,
+-- they are now summed from the fine cells through these prefix indexes.
+-- Apply with: psql "$DATABASE_URL" -f migrations/010_data_import_facets_fine_cells.sql
+
+CREATE INDEX IF NOT EXISTS ix_data_import_facets_cell_1 ON data_import_facets (left(cell, 1));
+CREATE INDEX IF NOT EXISTS ix_data_import_facets_cell_2 ON data_import_facets (left(cell, 2));
+CREATE INDEX IF NOT EXISTS ix_data_import_facets_cell_3 ON data_import_facets (left(cell, 3));
+
+DELETE FROM data_import_facets WHERE length(cell) < 4;
@@ -0,0 +1,42 @@
+import json
+
+import pytest
+
+from app.areas import parse_area, InvalidArea
+
+SQUARE = [[[-122.5, 37.7], [-122.3, 37.7], [-122.3, 37.9], [-122.5, 37.9], [-122.5, 37.7]]]
+
+
+def test_parse_area_accepts_polygons_and_features():
+    polygon = {"type": "Polygon", "coordinates": SQUARE}
+    assert json.loads(parse_area(polygon)) == polygon
+
+    feature = {"type": "Feature", "properties": {"name": "watershed"}, "geometry": polygon}
+    assert json.loads(parse_area(feature)) == polygon
+
+    multi = {"type": "MultiPolygon", "coordinates": [SQUARE, SQUARE]}
+    assert json.loads(parse_area(multi))["type"] == "MultiPolygon"
+
+
+@pytest.mark.parametrize("area, message", [
+    ({"type": "Point", "coordinates": [0, 0]}, "Polygon or MultiPolygon"),
+    ({"type": "Polygon", "coordinates": []}, "no coordinates"),
+    ({"type": "Polygon", "coordinates": [[[0, 0], [1, 0], [0, 0]]]}, "at least 4 positions"),
+    ({"type": "Polygon", "coordinates": [[[0, 0], [1, 0], [1, 1], [0, 1]]]}, "not closed"),
+    ({"type": "Polygon", "coordinates": [[[0, 0], [200, 0], [1, 1], [0, 0]]]}, "outside"),
+    ({"type": "Polygon", "coordinates": [[[0, 0], ["a", 0], [1, 1], [0, 0]]]}, "not [longitude, latitude]"),
+    ([1, 2], "GeoJSON object"),
+    # bow tie
+    ({"type": "Polygon", "coordinates": [[[0, 0], [1, 1], [1, 0], [0, 1], [0, 0]]]}, "Self-intersection"),
+    ({"type": "MultiPolygon", "coordinates": [SQUARE, [[[0, 0], [1, 1], [1, 0], [0, 1], [0, 0]]]]},
+     "polygon 1 is not a valid polygon"),
+])
+def test_parse_area_rejects_bad_shapes(area, message):
+    with pytest.raises(InvalidArea, match=message.replace("[", r"\[").replace("]", r"\]")):
+        parse_area(area)
+
+
+def test_parse_area_limits_vertices(monkeypatch):
+    monkeypatch.setattr("app.areas.AREA_MAX_VERTICES", 4)
+    with pytest.raises(InvalidArea, match="vertices"):
+        parse_area({"type": "Polygon", "coordinates": SQUARE})
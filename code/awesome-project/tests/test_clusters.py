@@ -0,0 +1,8 @@
+from app.clusters import precision_for_zoom, GEOHASH_PRECISION
+
+
+def test_precision_grows_with_zoom():
+    precisions = [precision_for_zoom(zoom) for zoom in range(0, 23)]
+    assert precisions[0] == 1
+    assert precisions == sorted(precisions)
+    assert max(precisions) == GEOHASH_PRECISION
@@ -0,0 +1,17 @@
+import gzip
+
+from app import compression
+
+
+def test_choose_encoding_follows_accept_encoding():
+    assert compression.choose_encoding(None) is None
+    assert compression.choose_encoding("identity") is None
+    assert compression.choose_encoding("gzip;q=0, deflate") is None
+    assert compression.choose_encoding("deflate, gzip") == "gzip"
+    expected = "br" if compression.brotli is not None else "gzip"
+    assert compression.choose_encoding("gzip, br") == expected
+
+
+def test_gzip_round_trip():
+    body = b'[{"landslideID":"1"}]' * 100
+    assert gzip.decompress(compression.compress(body, "gzip")) == body
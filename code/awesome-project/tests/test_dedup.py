@@ -0,0 +1,106 @@
+from types import SimpleNamespace
+
+import pytest
+
+from app.dedup import SpatialHash, DuplicateChecker, distance_m, METRES_PER_DEGREE, MERGE_SQL
+
+
+def report(landslide_id, lon, lat, ls_type="Debris"):
+    return SimpleNamespace(landslideID=landslide_id, longitude=lon, latitude=lat, lsType=ls_type,
+                           lsSource=None, impact=None, wea13_id=None, wea13_type=None, event_date=None)
+
+
+def test_distance_m():
+    assert distance_m(0, 0, 0, 1) == pytest.approx(METRES_PER_DEGREE)
+    assert distance_m(-122.4, 37.7, -122.4, 37.7) == 0
+
+
+def test_spatial_hash_finds_closest_point_within_distance():
+    points = SpatialHash(25)
+    points.add("a", -122.4, 37.7)
+    points.add("b", -122.4, 37.7 + 20 / METRES_PER_DEGREE)
+    assert points.nearest(-122.4, 37.7 + 15 / METRES_PER_DEGREE) == "b"
+    assert points.nearest(-122.4, 37.7 + 60 / METRES_PER_DEGREE) is None
+
+
+def test_spatial_hash_searches_wider_in_longitude_near_the_poles():
+    points = SpatialHash(25)
+    points.add("north", 10.0, 80.0)
+    # 20 m east at 80 degrees north is several longitude cells away
+    assert points.nearest(10.0 + 20 / (METRES_PER_DEGREE * 0.1736), 80.0) == "north"
+
+
+def test_spatial_hash_matches_attributes_and_evicts_oldest():
+    points = SpatialHash(25, max_points=2)
+    points.add("a", 1.0, 1.0, ("Debris",))
+    assert points.nearest(1.0, 1.0, ("Rock",)) is None
+    points.add("b", 2.0, 2.0)
+    points.add("c", 3.0, 3.0)
+    assert len(points) == 2
+    assert points.nearest(1.0, 1.0, ("Debris",)) is None
+    assert points.nearest(3.0, 3.0) == "c"
+
+
+def test_checker_rejects_bad_settings():
+    with pytest.raises(ValueError):
+        DuplicateChecker(action="delete")
+    with pytest.raises(ValueError):
+        DuplicateChecker(match_fields=("user_id",))
+
+
+def test_checker_finds_recent_and_same_batch_duplicates_in_memory():
+    checker = DuplicateChecker(action="flag", distance=25, match_fields=("lstype",))
+    checker.remember([report("1", -122.4, 37.7)])
+    near = 10 / METRES_PER_DEGREE
+    batch = [
+        report("2", -122.4, 37.7 + near),           # near the stored report
+        report("3", -100.0, 40.0),
+        report("4", -100.0, 40.0 + near),           # near row 3 of the same batch
+        report("5", -100.0, 40.0 + near, "Rock"),   # near, but another landslide type
+    ]
+    assert checker._check_memory(batch) == ["1", None, "3", None]
+    assert checker.stats()["found_in_memory"] == 2
+
+
+def test_checker_off_checks_nothing():
+    checker = DuplicateChecker(action="off")
+    assert checker.find_sync(None, [report("1", 0.0, 0.0)]) == [None]
+    checker.remember([report("1", 0.0, 0.0)])
+    assert len(checker.recent) == 0
+
+
+def test_flagged_duplicates_are_not_remembered_as_candidates():
+    checker = DuplicateChecker(action="flag", distance=25, match_fields=())
+    checker.remember([report("1", 0.0, 0.0), report("2", 0.0, 0.0)], [None, "1"])
+    assert len(checker.recent) == 1
+
+
+class FakeResult:
+    def __init__(self, values):
+        self.values = values
+
+    def scalars(self):
+        return self
+
+    def all(self):
+        return self.values
+
+
+class FakeMergeSession:
+    # only the targets in existing are still in the table
+    def __init__(self, existing):
+        self.existing = existing
+
+    def execute(self, statement, params):
+        if statement is MERGE_SQL:
+            return FakeResult([(target, 1.0, 2.0) for target in sorted(set(params["landslideids"]) & self.existing)])
+        return FakeResult([])
+
+
+def test_merges_into_missing_targets_are_not_counted():
+    checker = DuplicateChecker(action="merge", distance=25, match_fields=())
+    reports = [report("2", 0.0, 0.0), report("3", 0.0, 0.0), report("4", 5.0, 5.0)]
+    merged_into = checker.merge_sync(FakeMergeSession({"1"}), reports, ["1", "1", "9"])
+    # where the target is, for its tile
+    assert merged_into == {"1": (1.0, 2.0)}
+    assert checker.stats()["merged"] == 2
@@ -0,0 +1,43 @@
+import io
+import json
+from datetime import date, datetime, timezone
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from app.export import stream_arrow, stream_parquet
+
+# POINT(-122.5 45.5) as little endian WKB
+POINT_WKB = bytes.fromhex("01010000000000000000a05ec00000000000c04640")
+
+
+def make_rows(count, start=0):
+    return [
+        (str(100090 + i), 45.5, -122.5, "Debris", "Natural", "None", 7 if i % 2 else None, None, None,
+         datetime(2024, 5, 1, tzinfo=timezone.utc), date(2024, 4, 30), POINT_WKB)
+        for i in range(start, start + count)
+    ]
+
+
+def test_parquet_stream_writes_a_row_group_per_batch_with_geo_metadata():
+    chunks = list(stream_parquet([make_rows(3), make_rows(2, start=3)]))
+
+    parquet_file = pq.ParquetFile(io.BytesIO(b"".join(chunks)))
+    assert parquet_file.metadata.num_row_groups == 2
+    table = parquet_file.read()
+    assert table.column("landslideID").to_pylist() == [str(100090 + i) for i in range(5)]
+    assert table.column("wea13_id").to_pylist() == [None, 7, None, 7, None]
+    assert table.column("geometry")[0].as_py() == POINT_WKB
+    geo = json.loads(parquet_file.schema_arrow.metadata[b"geo"])
+    assert geo["primary_column"] == "geometry"
+    assert geo["columns"]["geometry"]["encoding"] == "WKB"
+
+
+def test_arrow_stream_round_trip():
+    table = pa.ipc.open_stream(b"".join(stream_arrow([make_rows(4)]))).read_all()
+    assert table.num_rows == 4
+    assert table.schema.field("geometry").metadata == {b"ARROW:extension:name": b"geoarrow.wkb"}
+
+
+def test_empty_export_is_still_a_valid_file():
+    assert pq.ParquetFile(io.BytesIO(b"".join(stream_parquet([])))).metadata.num_rows == 0
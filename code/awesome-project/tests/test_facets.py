@@ -0,0 +1,60 @@
+from app.facets import (cover_bbox, edge_precision, geohash_bounds, add_counts, empty_counts, summary_params,
+                        FACET_PRECISION, GEOHASH_ALPHABET)
+
+
+def test_geohash_bounds():
+    # 9q8y is the San Francisco cell
+    min_lon, min_lat, max_lon, max_lat = geohash_bounds("9q8y")
+    assert min_lon < -122.4 < max_lon
+    assert min_lat < 37.7 < max_lat
+    assert geohash_bounds("") == (-180.0, -90.0, 180.0, 90.0)
+
+
+def test_whole_world_is_the_one_character_cells():
+    assert cover_bbox(-180, -90, 180, 90) == (sorted(GEOHASH_ALPHABET), [])
+
+
+def test_cover_splits_inside_and_edge_cells():
+    box = (-125.0, 25.0, -67.0, 49.0)
+    inside, edge = cover_bbox(*box)
+    assert inside and edge
+    assert not set(inside) & set(edge)
+    for cell in inside:
+        min_lon, min_lat, max_lon, max_lat = geohash_bounds(cell)
+        assert box[0] <= min_lon and max_lon <= box[2] and box[1] <= min_lat and max_lat <= box[3]
+    assert len({len(cell) for cell in edge}) == 1
+    # no cell is covered twice
+    cells = inside + edge
+    assert not any(a != b and b.startswith(a) for a in cells for b in cells)
+
+
+def test_small_box_is_only_edge_cells():
+    inside, edge = cover_bbox(-122.45, 37.75, -122.40, 37.78)
+    assert inside == []
+    assert edge == ["9q8y"]
+
+
+def test_large_boxes_get_coarser_edge_cells():
+    assert edge_precision(-122.45, 37.75, -122.40, 37.78) == FACET_PRECISION
+    # most of the world: a FACET_PRECISION outline would be tens of thousands of cells
+    inside, edge = cover_bbox(-179, -89, 179, 89, max_edge_cells=256)
+    assert len(edge) <= 256
+    assert len(inside) + len(edge) < 1000
+    assert len({len(cell) for cell in edge}) == 1
+    assert all(len(cell) < FACET_PRECISION for cell in edge)
+
+
+def test_summary_params_group_cells_by_length():
+    inside, edge = cover_bbox(-125.0, 25.0, -67.0, 49.0)
+    params = summary_params(inside + edge)
+    assert sorted(params) == [f"cells_{n}" for n in range(1, FACET_PRECISION + 1)]
+    assert sorted(sum(params.values(), [])) == sorted(inside + edge)
+    assert all(len(cell) == int(name[-1]) for name, cells in params.items() for cell in cells)
+
+
+def test_add_counts():
+    counts = empty_counts()
+    add_counts(counts, [("lstype", "Debris", 2), ("lstype", "Debris", 3), ("impact", "Road", 1)])
+    assert counts["lstype"] == {"Debris": 5}
+    assert counts["impact"] == {"Road": 1}
+    assert counts["lssource"] == {}
@@ -0,0 +1,35 @@
+import json
+from collections import namedtuple
+from datetime import date, datetime, timezone
+
+from app.fastjson import dump_rows
+
+Row = namedtuple("Row", ["landslideID", "latitude", "geometry_json_string", "reported_at", "event_date"])
+
+
+def test_dump_rows_inlines_geometry_and_keeps_field_order():
+    rows = [
+        Row("100090", 45.5, '{"type":"Point","coordinates":[-122.6,45.5]}',
+            datetime(2024, 5, 1, 12, 30, tzinfo=timezone.utc), date(2024, 4, 30)),
+        Row("100091", 46.0, None, datetime(2024, 5, 2, tzinfo=timezone.utc), None),
+    ]
+
+    body = dump_rows(rows)
+
+    assert body.startswith(b'[{"landslideID":"100090","latitude":45.5,"geometry":{"type":"Point"')
+    assert json.loads(body) == [
+        {"landslideID": "100090", "latitude": 45.5,
+         "geometry": {"type": "Point", "coordinates": [-122.6, 45.5]},
+         "reported_at": "2024-05-01T12:30:00Z", "event_date": "2024-04-30"},
+        {"landslideID": "100091", "latitude": 46.0, "geometry": None,
+         "reported_at": "2024-05-02T00:00:00Z", "event_date": None},
+    ]
+
+
+def test_dump_rows_empty():
+    assert dump_rows([]) == b"[]"
+
+
+def test_dump_rows_without_geometry():
+    Projected = namedtuple("Projected", ["landslideID", "lsType"])
+    assert dump_rows([Projected("100090", "Debris")]) == b'[{"landslideID":"100090","lsType":"Debris"}]'
@@ -0,0 +1,59 @@
+import asyncio
+import threading
+
+import pytest
+
+from app.hashing import HashingPool, HashingPoolFull
+
+
+def test_run_returns_result_and_counts_jobs():
+    pool = HashingPool(max_workers=2, max_queue=10)
+    try:
+        assert asyncio.run(pool.run(pow, 2, 10)) == 1024
+        assert pool.run_sync(pow, 3, 2) == 9
+        stats = pool.stats()
+        assert stats["completed"] == 2
+        assert stats["queue_depth"] == 0
+    finally:
+        pool.shutdown()
+
+
+def test_submit_rejects_when_queue_is_full():
+    pool = HashingPool(max_workers=1, max_queue=1)
+    release = threading.Event()
+    try:
+        pool.submit(release.wait)  # occupies the only worker
+        while pool.stats()["running"] == 0:
+            pass
+        pool.submit(release.wait)  # waits in the queue
+        with pytest.raises(HashingPoolFull):
+            pool.submit(release.wait)
+        assert pool.stats()["rejected"] == 1
+    finally:
+        release.set()
+        pool.shutdown()
+
+
+def test_cancelled_queued_job_leaves_the_queue():
+    pool = HashingPool(max_workers=1, max_queue=1)
+    release = threading.Event()
+
+    async def cancel_waiting_login():
+        task = asyncio.ensure_future(pool.run(pow, 2, 10))
+        await asyncio.sleep(0)
+        assert pool.stats()["queue_depth"] == 1
+        task.cancel()  # the client disconnected
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    try:
+        pool.submit(release.wait)  # occupies the only worker
+        while pool.stats()["running"] == 0:
+            pass
+        asyncio.run(cancel_waiting_login())
+        assert pool.stats()["queue_depth"] == 0
+        # the queue has room again
+        pool.submit(release.wait)
+    finally:
+        release.set()
+        pool.shutdown()
@@ -0,0 +1,76 @@
+import asyncio
+
+from sqlalchemy import Sequence
+
+from app.ids import IdAllocator, numeric_ids
+
+
+class FakeResult:
+    def __init__(self, values):
+        self.values = values
+
+    def all(self):
+        return self.values
+
+
+class FakeSequenceSession:
+    # hands out block starts the way nextval() on an INCREMENT BY block_size sequence would
+    def __init__(self, start, block_size):
+        self.next = start
+        self.block_size = block_size
+        self.round_trips = 0
+
+    def scalars(self, query):
+        self.round_trips += 1
+        blocks = query.compile().params["generate_series_2"]
+        starts = [self.next + i * self.block_size for i in range(blocks)]
+        self.next += blocks * self.block_size
+        return FakeResult(starts)
+
+
+class FakeAsyncSequenceSession(FakeSequenceSession):
+    async def scalars(self, query):
+        return super().scalars(query)
+
+
+def test_reserve_serves_ids_from_the_cached_block():
+    allocator = IdAllocator(Sequence("test_seq", start=1000, increment=10))
+    db = FakeSequenceSession(1000, 10)
+
+    assert allocator.reserve_sync(db, 1) == [1000]
+    assert allocator.reserve_sync(db, 3) == [1001, 1002, 1003]
+    assert db.round_trips == 1
+
+
+def test_reserve_fetches_all_missing_blocks_in_one_round_trip():
+    allocator = IdAllocator(Sequence("test_seq", start=1000, increment=10))
+    db = FakeAsyncSequenceSession(1000, 10)
+
+    assert asyncio.run(allocator.reserve(db, 8)) == list(range(1000, 1008))
+    # 2 left in the first block, 23 more need three new blocks
+    assert asyncio.run(allocator.reserve(db, 25)) == list(range(1008, 1033))
+    assert db.round_trips == 2
+    assert allocator.reserve_sync(db, 7) == list(range(1033, 1040))
+    assert db.round_trips == 2
+
+
+class FakeExecuteSession:
+    def __init__(self):
+        self.executed = []
+
+    def execute(self, statement, params=None):
+        self.executed.append((str(statement), params))
+
+
+def test_only_numeric_explicit_ids_advance_the_sequence():
+    allocator = IdAllocator(Sequence("test_seq", start=1000, increment=10))
+    db = FakeExecuteSession()
+
+    assert numeric_ids(["1200", "LS-7", "", None, "١٢", "1" * 19]) == ["1200"]
+    allocator.advance_past_sync(db, ["LS-7"])
+    assert db.executed == []
+
+    allocator.advance_past_sync(db, ["LS-7", "1200"])
+    [(sql, params)] = db.executed
+    assert "setval('test_seq'" in sql and "last_value + 10" in sql
+    assert params == {"landslideids": ["1200"]}
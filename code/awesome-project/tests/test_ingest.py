@@ -0,0 +1,64 @@
+import io
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from app import ingest
+
+
+def test_read_csv_rows_maps_headers_to_schema_fields():
+    upload = io.BytesIO(
+        b"LandslideID,Latitude,Longitude,lstype,lssource,impact,wea13_id,extra\n"
+        b"100200,38.5,-96.1,Debris,Natural,Road,,ignored\n"
+    )
+    rows = list(ingest.read_csv_rows(upload))
+    assert rows == [{
+        "landslideID": "100200",
+        "latitude": "38.5",
+        "longitude": "-96.1",
+        "lsType": "Debris",
+        "lsSource": "Natural",
+        "impact": "Road",
+        "wea13_id": None,
+    }]
+
+
+def test_read_geojson_rows_takes_position_from_point_geometry():
+    collection = {
+        "type": "FeatureCollection",
+        "features": [
+            {"type": "Feature", "geometry": {"type": "Point", "coordinates": [-96.1, 38.5]},
+             "properties": {"landslideID": "1", "latitude": 0, "longitude": 0}},
+            {"type": "Feature", "geometry": {"type": "LineString", "coordinates": [[0, 0], [1, 1]]},
+             "properties": {"landslideID": "2", "latitude": 1, "longitude": 1}},
+        ],
+    }
+    rows = list(ingest.read_geojson_rows(io.BytesIO(json.dumps(collection).encode())))
+    assert rows[0] == {"landslideID": "1", "latitude": 38.5, "longitude": -96.1}
+    assert rows[1] == {"landslideID": "2"}
+
+
+def test_read_geojson_rows_rejects_non_collections():
+    with pytest.raises(ValueError):
+        list(ingest.read_geojson_rows(io.BytesIO(b'{"type": "Feature"}')))
+
+
+def test_chunked():
+    assert list(ingest.chunked(range(5), 2)) == [[0, 1], [2, 3], [4]]
+
+
+@pytest.mark.parametrize("wea13_id, problem", [
+    (None, None),
+    ("12", None),
+    (" -7 ", None),
+    ("2147483647", None),
+    ("--5", "wea13_id must be an integer"),
+    ("²", "wea13_id must be an integer"),
+    ("٣", "wea13_id must be an integer"),
+    ("1_000", "wea13_id must be an integer"),
+    ("abc", "wea13_id must be an integer"),
+    ("2147483648", "wea13_id must be between -2147483648 and 2147483647"),
+])
+def test_check_row_wea13_id(wea13_id, problem):
+    assert ingest.check_row(SimpleNamespace(wea13_id=wea13_id)) == problem
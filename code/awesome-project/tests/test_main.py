@@ -31,10 +31,55 @@ def _db_session_fixture():
         db.close()
         Base.metadata.drop_all(bind=test_engine)
 
-app.dependency_overrides[get_db] = _db_session_fixture
+# a plain generator: pytest does not allow calling the fixture above directly
+def _override_get_db():
+    db = TestingSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+app.dependency_overrides[get_db] = _override_get_db
 
 client = TestClient(app)
 
+
+# the async endpoints use the app's own asyncpg engine (DATABASE_URL, the same test database).
+# the context keeps one event loop for the whole test, asyncpg connections are tied to it
+@pytest.fixture(name="api")
+def _api_fixture():
+    with TestClient(app) as api:
+        yield api
+
+
+# two reports in San Francisco and one in Seattle
+@pytest.fixture(name="data_imports")
+def _data_imports_fixture(db_session: Session):
+    from geoalchemy2 import WKTElement
+    from sqlalchemy import func
+    from datetime import date
+    from app.tiles import tile_cache
+    from app.query_cache import query_cache
+
+    rows = [
+        ("100", -122.42, 37.77, "Debris", date(2024, 1, 15)),
+        ("101", -122.41, 37.78, "Rock", date(2024, 2, 3)),
+        ("200", -122.33, 47.61, "Debris", None),
+    ]
+    for landslide_id, lon, lat, ls_type, event_date in rows:
+        coords = WKTElement(f"POINT({lon} {lat})", srid=4326)
+        db_session.add(DataImport(
+            landslideid=landslide_id, latitude=lat, longitude=lon, lstype=ls_type, lssource="test",
+            coords=coords, geohash=func.ST_GeoHash(coords, 8), event_date=event_date,
+        ))
+    db_session.commit()
+    # rows written behind the api's back
+    tile_cache.clear()
+    query_cache.clear()
+    return rows
+
+SAN_FRANCISCO = {"min_longitude": -123.0, "max_longitude": -122.0, "min_latitude": 37.0, "max_latitude": 38.0}
+
 # --- Actual Tests ---
 
 def test_home_endpoint():
@@ -70,6 +115,355 @@ def test_db_session_can_add_user(db_session: Session):
     print("db_session successfully added and retrieved a user directly.")
 
 
+def test_query_data_imports_geojson(data_imports):
+    response = client.get("/query-data-imports.geojson", params=SAN_FRANCISCO)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/geo+json")
+    collection = response.json()
+    assert collection["type"] == "FeatureCollection"
+    features = sorted(collection["features"], key=lambda feature: feature["id"])
+    assert [feature["id"] for feature in features] == ["100", "101"]
+    assert features[0]["geometry"] == {"type": "Point", "coordinates": [-122.42, 37.77]}
+    assert features[0]["properties"]["lsType"] == "Debris"
+
+
+def test_query_data_imports_geojson_empty(data_imports):
+    response = client.get("/query-data-imports.geojson", params={**SAN_FRANCISCO, "min_latitude": 0.0,
+                                                                 "max_latitude": 1.0})
+    assert response.status_code == 200
+    assert response.json() == {"type": "FeatureCollection", "features": []}
+
+def test_export_parquet_is_filtered_by_bbox(data_imports):
+    import io
+    import pyarrow.parquet as pq
+    import shapely
+
+    response = client.get("/export/data-imports.parquet", params=SAN_FRANCISCO)
+    assert response.status_code == 200
+    table = pq.read_table(io.BytesIO(response.content))
+    assert sorted(table.column("landslideID").to_pylist()) == ["100", "101"]
+    point = shapely.from_wkb(table.column("geometry")[0].as_py())
+    assert -123 < point.x < -122 and 37 < point.y < 38
+
+
+def test_export_arrow_streams_every_row(data_imports):
+    import pyarrow as pa
+
+    response = client.get("/export/data-imports.arrow")
+    assert response.status_code == 200
+    assert response.headers["content-disposition"] == 'attachment; filename="data-imports.arrow"'
+    table = pa.ipc.open_stream(response.content).read_all()
+    assert sorted(table.column("landslideID").to_pylist()) == ["100", "101", "200"]
+
+
+def test_tiles_have_features_only_where_reports_are(api, data_imports):
+    from app.tiles import lonlat_to_tile
+
+    x, y = lonlat_to_tile(-122.42, 37.77, 10)
+    response = api.get(f"/tiles/10/{x}/{y}.mvt")
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/vnd.mapbox-vector-tile"
+    assert b"landslides" in response.content
+
+    x, y = lonlat_to_tile(0.0, 0.0, 10)
+    assert api.get(f"/tiles/10/{x}/{y}.mvt").content == b""
+    assert api.get("/tiles/10/5000/0.mvt").status_code == 404
+
+def test_near_orders_by_distance_within_the_radius(api, data_imports):
+    response = api.get("/data-imports/near", params={"lon": -122.42, "lat": 37.77, "radius_m": 5000})
+    assert response.status_code == 200
+    found = response.json()
+    assert [rec["landslideID"] for rec in found] == ["100", "101"]
+    assert found[0]["distance_m"] < 1
+    # 0.01 degrees of latitude and longitude apart at 37.8 N
+    assert 1300 < found[1]["distance_m"] < 1500
+
+    response = api.get("/data-imports/near", params={"lon": -122.42, "lat": 37.77, "radius_m": 5000, "k": 1})
+    assert [rec["landslideID"] for rec in response.json()] == ["100"]
+    response = api.get("/data-imports/near", params={"lon": 0, "lat": 0, "radius_m": 5000})
+    assert response.json() == []
+
+def test_timeline_buckets_event_dates_and_report_times(api, data_imports):
+    response = api.get("/stats/timeline", params={"field": "event_date", "bucket": "month"})
+    assert response.status_code == 200
+    # the Seattle report has no event date
+    assert response.json() == [{"bucket": "2024-01-01", "count": 1}, {"bucket": "2024-02-01", "count": 1}]
+
+    response = api.get("/stats/timeline", params={"field": "event_date", "bucket": "month",
+                                                  "event_after": "2024-02-01"})
+    assert response.json() == [{"bucket": "2024-02-01", "count": 1}]
+
+    # reported_at is filled in by the database on insert
+    response = api.get("/stats/timeline", params={"bucket": "day"})
+    assert sum(bucket["count"] for bucket in response.json()) == 3
+
+def test_async_query_and_create_share_the_cached_version(api, data_imports):
+    response = api.get("/query-data-imports/", params=SAN_FRANCISCO)
+    assert response.status_code == 200
+    assert sorted(rec["landslideID"] for rec in response.json()) == ["100", "101"]
+    etag = response.headers["etag"]
+    assert api.get("/query-data-imports/", params=SAN_FRANCISCO, headers={"If-None-Match": etag}).status_code == 304
+
+    report = {"latitude": 37.5, "longitude": -122.5, "lsType": "Flow", "lsSource": "test", "impact": "None"}
+    response = api.post("/data-imports/", json=report)
+    assert response.status_code == 201
+    created = response.json()["landslideID"]
+
+    # the write made the old ETag stale
+    response = api.get("/query-data-imports/", params=SAN_FRANCISCO, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+    assert sorted(rec["landslideID"] for rec in response.json()) == sorted(["100", "101", created])
+
+    response = api.get("/query-data-imports/", params={**SAN_FRANCISCO, "min_latitude": 0.0, "max_latitude": 1.0})
+    assert response.status_code == 404
+    # "*" does not hide that there is nothing to match
+    response = api.get("/query-data-imports/", params={**SAN_FRANCISCO, "min_latitude": 0.0, "max_latitude": 1.0},
+                       headers={"If-None-Match": "*"})
+    assert response.status_code == 404
+    assert api.get("/query-data-imports/", params=SAN_FRANCISCO, headers={"If-None-Match": "*"}).status_code == 304
+
+def test_cursor_pages_through_every_row_once(api, data_imports):
+    seen = []
+    params = {"limit": 2}
+    while True:
+        response = api.get("/query-data-imports/", params=params)
+        assert response.status_code == 200
+        page = [rec["landslideID"] for rec in response.json()]
+        assert 0 < len(page) <= 2
+        seen += page
+        if "x-next-cursor" not in response.headers:
+            break
+        params = {"limit": 2, "cursor": response.headers["x-next-cursor"]}
+
+    assert seen == ["100", "101", "200"]
+
+    response = api.get("/query-data-imports/", params={"limit": 2, "cursor": "not a cursor!"})
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Invalid pagination cursor."
+
+def test_area_returns_the_reports_inside_a_polygon(api, data_imports):
+    square = {"type": "Polygon", "coordinates": [[[-122.5, 37.7], [-122.3, 37.7], [-122.3, 37.9], [-122.5, 37.9], [-122.5, 37.7]]]}
+
+    response = api.post("/query-data-imports/area", json=square)
+    assert response.status_code == 200
+    assert sorted(rec["landslideID"] for rec in response.json()) == ["100", "101"]
+
+    # a feature works too, and the other filters still apply
+    response = api.post("/query-data-imports/area", params={"landslide_type": "Rock"},
+                        json={"type": "Feature", "properties": {}, "geometry": square})
+    assert [rec["landslideID"] for rec in response.json()] == ["101"]
+
+def test_area_refuses_a_self_intersecting_polygon(api, data_imports):
+    bow_tie = {"type": "Polygon", "coordinates": [[[-122.5, 37.7], [-122.3, 37.9], [-122.3, 37.7], [-122.5, 37.9], [-122.5, 37.7]]]}
+
+    response = api.post("/query-data-imports/area", json=bow_tie)
+    assert response.status_code == 400
+    assert "Self-intersection" in response.json()["detail"]
+
+def test_subdivided_area_finds_what_a_plain_intersects_finds(api, db_session, monkeypatch):
+    import json
+
+    # many small pieces even for this area
+    monkeypatch.setattr("app.areas.AREA_SUBDIVIDE_VERTICES", 32)
+    step = 0.002
+    # a 100 x 100 grid of reports, half way between the polygon's vertex lines
+    db_session.execute(text("""
+        INSERT INTO data_import (landslideid, latitude, longitude, lstype, lssource, coords, geohash)
+        SELECT 'g' || i || '-' || j, lat, lon, 'Debris', 'test',
+               ST_SetSRID(ST_MakePoint(lon, lat), 4326), ST_GeoHash(ST_SetSRID(ST_MakePoint(lon, lat), 4326), 8)
+        FROM generate_series(0, 99) AS i, generate_series(0, 99) AS j,
+             LATERAL (SELECT -122.5 + :step * (i + 0.5) AS lon, 37.7 + :step * (j + 0.5) AS lat) AS p
+    """), {"step": step})
+    db_session.commit()
+
+    # ten strips whose right edge is a row of teeth, so simplifying keeps every vertex
+    polygons = []
+    for k in range(10):
+        left, right = -122.5 + 10 * step * k, -122.5 + 10 * step * k + 6 * step
+        ring = [[left, 37.7], [right, 37.7]]
+        for m in range(100):
+            x = right + (step if m % 2 else 0)
+            ring += [[x, 37.7 + step * m], [x, 37.7 + step * (m + 1)]]
+        ring += [[left, 37.7 + step * 100], [left, 37.7]]
+        polygons.append([ring])
+    area = {"type": "MultiPolygon", "coordinates": polygons}
+
+    response = api.post("/query-data-imports/area", params={"fields": "landslideID"}, json=area)
+    assert response.status_code == 200
+    expected = db_session.scalar(text(
+        "SELECT count(*) FROM data_import WHERE ST_Intersects(ST_SetSRID(ST_GeomFromGeoJSON(:area), 4326), coords)"),
+        {"area": json.dumps(area)})
+    assert expected > 0
+    assert len(response.json()) == expected
+    assert len({rec["landslideID"] for rec in response.json()}) == expected
+
+def test_suggest_prefix_then_fuzzy_matches(api, data_imports):
+    response = api.get("/data-imports/suggest", params={"q": "10"})
+    assert response.status_code == 200
+    assert [rec["landslideID"] for rec in response.json()] == ["100", "101"]
+    assert [rec["landslideID"] for rec in api.get("/data-imports/suggest", params={"q": "1", "limit": 1}).json()] == ["100"]
+    # _ is a literal character, not a LIKE wildcard
+    assert api.get("/data-imports/suggest", params={"q": "1_"}).json() == []
+    # no id starts with 1001, the trigram neighbours are suggested instead
+    fuzzy = api.get("/data-imports/suggest", params={"q": "1001"}).json()
+    assert {rec["landslideID"] for rec in fuzzy} == {"100", "101"}
+
+def test_facets_match_a_group_by_after_inserts_and_deletes(api, data_imports, db_session):
+    from app import facets
+
+    def grouped(bbox):
+        counts = {}
+        for facet in facets.FACETS:
+            rows = db_session.execute(text(
+                f"SELECT coalesce({facet}, 'unknown'), count(*) FROM data_import"
+                " WHERE longitude BETWEEN :min_longitude AND :max_longitude"
+                " AND latitude BETWEEN :min_latitude AND :max_latitude GROUP BY 1"), bbox).all()
+            counts[facet] = {value: count for value, count in rows}
+        return counts
+
+    world = {"min_longitude": -180, "min_latitude": -90, "max_longitude": 180, "max_latitude": 90}
+    # the fixture's rows went in without the api
+    facets.rebuild(db_session)
+
+    report = {"latitude": 37.76, "longitude": -122.45, "lsType": "Flow", "lsSource": "field", "impact": "Roads"}
+    assert api.post("/data-imports/", json=report).status_code == 201
+    upload = ("latitude,longitude,lsType,lsSource,impact\n"
+              "37.75,-122.44,Flow,field,None\n"
+              "47.62,-122.34,Rock,field,Roads\n")
+    assert api.post("/data-imports/bulk", files={"file": ("reports.csv", upload, "text/csv")}).json()["accepted"] == 2
+
+    # rows leave the facet counts before they leave the table
+    db_session.execute(facets.REMOVE_FACETS_SQL, {"landslideids": ["101", "200"]})
+    db_session.execute(text("DELETE FROM data_import WHERE landslideid IN ('101', '200')"))
+    db_session.commit()
+
+    for bbox in (world, SAN_FRANCISCO):
+        response = api.get("/stats/facets", params={**bbox, "exact": True})
+        assert response.status_code == 200
+        assert response.json()["facets"] == grouped(bbox)
+        assert response.json()["total"] == sum(grouped(bbox)["lstype"].values())
+    assert api.get("/stats/facets", params=world).json()["total"] == 4
+
+def test_flagged_duplicates_are_stored_with_duplicate_of(api, data_imports, db_session, monkeypatch):
+    import main
+    from app.dedup import DuplicateChecker
+
+    # a fresh checker, the module's one remembers points of earlier tests
+    monkeypatch.setattr(main, "duplicate_checker", DuplicateChecker(action="flag"))
+    # about 5 m from report 100, same lsType
+    report = {"latitude": 37.77, "longitude": -122.42005, "lsType": "Debris", "lsSource": "test", "impact": "None"}
+
+    response = api.post("/data-imports/", json=report)
+    assert response.status_code == 201
+    assert response.headers["x-duplicate-of"] == "100"
+    created = response.json()["landslideID"]
+    assert db_session.scalar(text("SELECT duplicate_of FROM data_import WHERE landslideid = :id"), {"id": created}) == "100"
+
+    # another lsType is another slide
+    response = api.post("/data-imports/", json={**report, "lsType": "Flow"})
+    assert response.status_code == 201
+    assert "x-duplicate-of" not in response.headers
+
+def test_merged_duplicates_fill_in_the_existing_report(api, data_imports, db_session, monkeypatch):
+    import main
+    from app.dedup import DuplicateChecker
+
+    monkeypatch.setattr(main, "duplicate_checker", DuplicateChecker(action="merge"))
+    # about 5 m from report 200, which has no impact or event date yet
+    report = {"latitude": 47.61, "longitude": -122.33005, "lsType": "Debris", "lsSource": "other",
+              "impact": "Roads", "event_date": "2024-03-01"}
+
+    response = api.post("/data-imports/", json=report)
+    assert response.status_code == 200
+    assert response.headers["x-duplicate-of"] == "200"
+    assert response.json()["landslideID"] == "200"
+
+    assert db_session.scalar(text("SELECT count(*) FROM data_import")) == 3
+    row = db_session.execute(text("SELECT lssource, impact, event_date FROM data_import WHERE landslideid = '200'")).one()
+    # values it already had are kept
+    assert (row.lssource, row.impact, str(row.event_date)) == ("test", "Roads", "2024-03-01")
+
+def test_explicit_ids_do_not_collide_with_reserved_ones(api, db_session, monkeypatch):
+    import main
+    from app.ids import IdAllocator
+    from app.models import landslide_id_seq
+
+    # a fresh allocator, the module's one may hold a block of an earlier test's sequence
+    monkeypatch.setattr(main, "landslide_ids", IdAllocator(landslide_id_seq))
+    report = {"latitude": 37.5, "longitude": -122.5, "lsType": "Flow", "lsSource": "test", "impact": "None"}
+
+    [first] = api.post("/landslide-ids/reserve").json()["ids"]
+    # inside the block this process holds: the id it would hand out next is replaced
+    taken = str(int(first) + 1)
+    assert api.post("/data-imports/", json={**report, "landslideID": taken}).status_code == 201
+    response = api.post("/data-imports/", json=report)
+    assert response.status_code == 201
+    assert response.json()["landslideID"] != taken
+
+    # past every block handed out: the sequence moves beyond it
+    far = int(first) + 1000
+    assert api.post("/data-imports/", json={**report, "landslideID": str(far)}).status_code == 201
+    upload = (f"landslideID,latitude,longitude,lsType,lsSource,impact\n"
+              f"{far},37.5,-122.5,Flow,test,None\n"
+              f"{far + 5000},37.5,-122.5,Flow,test,None\n"
+              f",37.5,-122.5,Flow,test,None\n")
+    response = api.post("/data-imports/bulk", files={"file": ("reports.csv", upload, "text/csv")})
+    assert response.status_code == 200
+    assert response.json()["accepted"] == 2
+    assert response.json()["errors"] == [{"row": 1, "detail": f"Landslide ID {far} already exists."}]
+
+    ids = [int(landslide_id) for landslide_id in api.post("/landslide-ids/reserve", params={"count": 300}).json()["ids"]]
+    assert not any(int(first) + 100 <= landslide_id <= far + 5000 for landslide_id in ids)
+    assert db_session.scalar(text("SELECT count(*) FROM data_import")) == 5
+
+def test_bulk_upload_that_breaks_midway_reports_what_was_stored(api, db_session):
+    good = "".join(f"{37 + i / 10000},-122.5,Flow,test,None\n" for i in range(6000))
+    upload = ("latitude,longitude,lsType,lsSource,impact\n" + good).encode() + b"\xff\xfe,bad\n"
+
+    response = api.post("/data-imports/bulk", files={"file": ("reports.csv", upload, "text/csv")})
+
+    assert response.status_code == 400
+    detail = response.json()["detail"]
+    # the first chunk was committed before the bad bytes were read
+    assert detail["accepted"] == 5000 and detail["rejected"] == 0
+    assert "after row 5000" in detail["message"]
+    assert db_session.scalar(text("SELECT count(*) FROM data_import")) == 5000
+
+def test_clusters_count_and_center_the_reports_at_two_zooms(api, data_imports):
+    world = {"min_longitude": -180, "min_latitude": -90, "max_longitude": 180, "max_latitude": 90}
+
+    # geohash length 2: both San Francisco reports share a cell
+    response = api.get("/clusters", params={**world, "zoom": 3})
+    assert response.status_code == 200
+    clusters = {cluster["cell"]: cluster for cluster in response.json()}
+    assert {cell: cluster["count"] for cell, cluster in clusters.items()} == {"9q": 2, "c2": 1}
+    assert clusters["9q"]["longitude"] == pytest.approx(-122.415)
+    assert clusters["9q"]["latitude"] == pytest.approx(37.775)
+    assert clusters["9q"]["lsTypes"] == {"Debris": 1, "Rock": 1}
+    assert (clusters["c2"]["longitude"], clusters["c2"]["latitude"]) == pytest.approx((-122.33, 47.61))
+
+    # geohash length 6 (about 1 km): every report is its own cluster, at its own position
+    response = api.get("/clusters", params={**world, "zoom": 13})
+    clusters = {cluster["cell"]: cluster for cluster in response.json()}
+    assert {cell: cluster["count"] for cell, cluster in clusters.items()} == {"9q8yy7": 1, "9q8yym": 1, "c23nb7": 1}
+    assert (clusters["9q8yym"]["longitude"], clusters["9q8yym"]["latitude"]) == pytest.approx((-122.41, 37.78))
+
+    # only the reports inside the box
+    response = api.get("/clusters", params={**SAN_FRANCISCO, "zoom": 3})
+    assert [(cluster["cell"], cluster["count"]) for cluster in response.json()] == [("9q", 2)]
+
+def test_clusters_query_groups_by_the_selected_lstype():
+    """Under asyncpg every literal is a numbered bind, the GROUP BY must reuse the SELECT's."""
+    from sqlalchemy.dialects.postgresql import asyncpg
+    from main import clusters_query
+
+    sql = str(clusters_query(-125, 24, -66, 50, 4).compile(dialect=asyncpg.dialect()))
+    inner_group_by = sql.split("GROUP BY ")[1]
+    assert "coalesce(data_import.lstype, 'unknown') AS lstype" in sql
+    assert inner_group_by.startswith("left(data_import.geohash, $1::INTEGER), coalesce(data_import.lstype, 'unknown')")
+
+
 # # Test that uses TestClient AND db_session
 # def test_register_user_success(db_session: Session):
 #     """Test successful user registration via API endpoint."""
@@ -0,0 +1,60 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.metrics import Histogram, MetricsMiddleware, request_duration
+
+
+def test_histogram_renders_cumulative_buckets():
+    histogram = Histogram("test_seconds", "test", ("route",), buckets=(0.1, 1))
+    for value in (0.05, 0.1, 0.5, 3):
+        histogram.observe(value, "/a")
+
+    lines = histogram.render()
+
+    assert 'test_seconds_bucket{route="/a",le="0.1"} 2' in lines
+    assert 'test_seconds_bucket{route="/a",le="1"} 3' in lines
+    assert 'test_seconds_bucket{route="/a",le="+Inf"} 4' in lines
+    assert 'test_seconds_count{route="/a"} 4' in lines
+
+
+def test_requests_are_labelled_by_route_template():
+    app = FastAPI()
+    app.add_middleware(MetricsMiddleware)
+
+    @app.get("/items/{item_id}")
+    def item(item_id: int):
+        return {}
+
+    client = TestClient(app)
+    client.get("/items/1")
+    client.get("/items/2")
+    client.get("/missing")
+
+    lines = request_duration.render()
+    assert 'http_request_duration_seconds_count{method="GET",route="/items/{item_id}",status="200"} 2' in lines
+    assert 'http_request_duration_seconds_count{method="GET",route="unmatched",status="404"} 1' in lines
+
+
+def test_rows_counted_while_streaming_from_a_sync_endpoint_are_observed():
+    from fastapi.responses import StreamingResponse
+
+    from app.metrics import rows_returned
+    from app.profiling import ProfilingMiddleware, count_rows
+
+    app = FastAPI()
+    app.add_middleware(MetricsMiddleware)
+    app.add_middleware(ProfilingMiddleware)
+
+    @app.get("/export")
+    def export():
+        def chunks():
+            for rows in (3, 4):
+                count_rows(rows)
+                yield b"x" * rows
+        return StreamingResponse(chunks())
+
+    TestClient(app).get("/export")
+
+    lines = rows_returned.render()
+    assert 'db_rows_returned_count{route="/export"} 1' in lines
+    assert 'db_rows_returned_sum{route="/export"} 7.0' in lines
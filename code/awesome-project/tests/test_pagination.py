@@ -0,0 +1,15 @@
+import pytest
+
+from app.pagination import encode_cursor, decode_cursor, InvalidCursor
+
+
+def test_cursor_round_trip():
+    for landslideid in ["100090", "a", "id with spaces/and?symbols"]:
+        cursor = encode_cursor(landslideid)
+        assert "=" not in cursor
+        assert decode_cursor(cursor) == landslideid
+
+
+def test_decode_cursor_rejects_garbage():
+    with pytest.raises(InvalidCursor):
+        decode_cursor("not*base64")
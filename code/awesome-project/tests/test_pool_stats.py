@@ -0,0 +1,25 @@
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import QueuePool
+
+from app.pool_stats import PoolStats, timed_pool_class
+
+
+def test_pool_stats_counts_checkouts_and_connections():
+    stats = PoolStats("test")
+    engine = create_engine("sqlite://", poolclass=timed_pool_class(QueuePool, stats), pool_size=2)
+    stats.attach(engine)
+
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+        during = stats.snapshot()
+    after = stats.snapshot()
+
+    assert during["checked_out"] == 1
+    assert after["checked_out"] == 0
+    assert after["idle"] == 1
+    assert after["checkouts"] == 1
+    assert after["wait_count"] == 1
+    assert after["connections_opened"] == 1
+
+    engine.dispose()
+    assert stats.snapshot()["connections_closed"] == 1
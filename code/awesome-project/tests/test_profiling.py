@@ -0,0 +1,74 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+
+from app.profiling import ProfilingMiddleware, SlowRequestProfiler, phase, track_sql
+
+
+def make_client(profiler):
+    engine = create_engine("sqlite://")
+    track_sql(engine)
+    app = FastAPI()
+    app.add_middleware(ProfilingMiddleware, profiler=profiler)
+
+    @app.get("/")
+    def home():
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+            conn.execute(text("SELECT 2"))
+        with phase("serialize"):
+            pass
+        return {}
+
+    return TestClient(app)
+
+
+def test_server_timing_counts_queries_and_phases():
+    client = make_client(SlowRequestProfiler(slow_ms=0))
+
+    metrics = client.get("/").headers["server-timing"].split(", ")
+
+    assert metrics[0].startswith("db;dur=") and metrics[0].endswith('desc="2 queries"')
+    assert metrics[1].startswith("serialize;dur=")
+    assert metrics[2].startswith("app;dur=")
+
+
+def test_slow_sampled_requests_are_profiled(tmp_path):
+    profiler = SlowRequestProfiler(slow_ms=0.001, sample_rate=1.0, directory=str(tmp_path))
+    client = make_client(profiler)
+
+    client.get("/")
+
+    assert profiler.dumped == 1
+    assert len(list(tmp_path.glob("*-GET-root-*ms.prof"))) == 1
+
+
+def test_threadpool_work_of_sync_endpoints_is_in_the_profile(tmp_path):
+    import pstats
+
+    from fastapi.responses import StreamingResponse
+
+    from app.profiling import profiled_in_thread, profiled_iterator
+
+    def build_page():
+        return sum(range(1000))
+
+    def build_chunk():
+        return b"x"
+
+    profiler = SlowRequestProfiler(slow_ms=0.001, sample_rate=1.0, directory=str(tmp_path))
+    app = FastAPI()
+    app.add_middleware(ProfilingMiddleware, profiler=profiler)
+
+    @app.get("/export")
+    @profiled_in_thread
+    def export(limit: int = 2):
+        build_page()
+        return StreamingResponse(profiled_iterator(build_chunk() for _ in range(limit)))
+
+    response = TestClient(app).get("/export", params={"limit": 3})
+
+    assert response.content == b"xxx"
+    [dump] = tmp_path.glob("*.prof")
+    functions = {name for _, _, name in pstats.Stats(str(dump)).stats}
+    assert {"build_page", "build_chunk"} <= functions
@@ -0,0 +1,99 @@
+import asyncio
+import time
+
+from app.query_cache import QueryCache, READ_VERSION_SQL
+
+
+class FakeVersionSession:
+    # data_version_seq shared by every worker: reads see the last value, bumps call nextval()
+    def __init__(self, value=0):
+        self.value = value
+        self.reads = 0
+
+    def scalar(self, statement):
+        if statement is READ_VERSION_SQL:
+            self.reads += 1
+        else:
+            self.value += 1
+        return self.value
+
+
+class FakeAsyncVersionSession(FakeVersionSession):
+    async def scalar(self, statement):
+        return super().scalar(statement)
+
+
+def test_bumping_the_version_makes_old_entries_and_etags_stale():
+    cache = QueryCache(max_bytes=1024)
+    db = FakeAsyncVersionSession()
+    version = asyncio.run(cache.current_version(db))
+    cache.put(version, "key", b"[]", None)
+    etag = cache.etag(version, "key")
+
+    assert cache.get(version, "key") == (b"[]", None)
+    assert cache.is_fresh(etag, cache.etag(cache.version, "key"))
+
+    asyncio.run(cache.bump_version(db))
+
+    assert cache.version == version + 1
+    assert cache.get(cache.version, "key") is None
+    assert not cache.is_fresh(etag, cache.etag(cache.version, "key"))
+
+
+def test_writes_of_other_workers_are_seen_once_the_version_expires():
+    db = FakeAsyncVersionSession(value=41)
+    cache = QueryCache(max_bytes=1024, version_ttl=60)
+    other_worker = QueryCache(max_bytes=1024, version_ttl=60)
+
+    assert asyncio.run(cache.current_version(db)) == 41
+    asyncio.run(other_worker.bump_version(db))
+    # still within the ttl, no round trip
+    assert asyncio.run(cache.current_version(db)) == 41
+    assert db.reads == 1
+
+    cache.version_ttl = 0
+    assert asyncio.run(cache.current_version(db)) == 42
+    assert db.reads == 2
+
+
+def test_a_restarted_worker_keeps_the_etags_of_unchanged_data():
+    db = FakeAsyncVersionSession(value=7)
+    before = QueryCache(max_bytes=1024)
+    after_restart = QueryCache(max_bytes=1024)
+
+    assert (before.etag(asyncio.run(before.current_version(db)), "key")
+            == after_restart.etag(asyncio.run(after_restart.current_version(db)), "key"))
+
+
+def test_a_version_that_goes_backwards_invalidates_too():
+    # sequence reset or database restore
+    db = FakeAsyncVersionSession(value=41)
+    cache = QueryCache(max_bytes=1024, version_ttl=0)
+    cache.put(asyncio.run(cache.current_version(db)), "key", b"[]", None)
+
+    db.value = 3
+    assert asyncio.run(cache.current_version(db)) == 3
+    assert cache.stats()["entries"] == 0
+
+
+def test_a_read_from_before_our_own_bump_does_not_undo_it():
+    db = FakeAsyncVersionSession(value=41)
+    cache = QueryCache(max_bytes=1024, version_ttl=0)
+    read_started = time.monotonic()
+    asyncio.run(cache.bump_version(db))
+
+    cache._seen(41, read_started)
+
+    assert cache.version == 42
+
+
+def test_if_none_match_accepts_lists_weak_tags_and_star():
+    cache = QueryCache(max_bytes=1024)
+    etag = cache.etag(3, "abc")
+
+    assert cache.is_fresh(f'"1-x", W/{etag}', etag)
+    assert not cache.is_fresh(None, etag)
+    # "*" only once the result is known to exist
+    assert not cache.is_fresh("*", etag)
+    assert cache.is_fresh("*", etag, exists=True)
+    assert cache.stats()["not_modified"] == 2
@@ -0,0 +1,49 @@
+from types import SimpleNamespace
+
+from app.regions import RegionIndex
+
+
+def square(min_lon, min_lat, max_lon, max_lat):
+    return {"type": "Polygon", "coordinates": [[
+        [min_lon, min_lat], [max_lon, min_lat], [max_lon, max_lat], [min_lon, max_lat], [min_lon, min_lat]]]}
+
+
+def region_index():
+    regions = RegionIndex()
+    regions.load_features([
+        {"type": "Feature", "geometry": square(-125, 40, -120, 45), "properties": {"wea13_id": 1, "wea13_type": "Coastal"}},
+        {"type": "Feature", "geometry": square(-120, 40, -115, 45), "properties": {"wea13_id": 2, "wea13_type": "Inland"}},
+        # without a wea13_id there is nothing to assign
+        {"type": "Feature", "geometry": square(-110, 40, -105, 45), "properties": {}},
+    ])
+    return regions
+
+
+def test_lookup_matches_points_to_regions():
+    regions = region_index()
+    found = regions.lookup([-122, -117, -100, -107], [42, 42, 42, 42])
+    assert found == [(1, "Coastal"), (2, "Inland"), None, None]
+    assert regions.stats()["regions"] == 2
+    assert regions.stats()["assigned"] == 2
+    assert regions.stats()["unmatched"] == 2
+
+
+def test_shared_border_goes_to_first_region():
+    assert region_index().lookup([-120], [42]) == [(1, "Coastal")]
+
+
+def test_assign_overrides_typed_values_inside_a_region():
+    regions = region_index()
+    inside = SimpleNamespace(longitude=-117.0, latitude=41.0, wea13_id="9", wea13_type="typo")
+    outside = SimpleNamespace(longitude=0.0, latitude=0.0, wea13_id="9", wea13_type="kept")
+    regions.assign([inside, outside])
+    assert (inside.wea13_id, inside.wea13_type) == ("2", "Inland")
+    assert (outside.wea13_id, outside.wea13_type) == ("9", "kept")
+
+
+def test_nothing_loaded_keeps_reports_as_typed():
+    regions = RegionIndex()
+    report = SimpleNamespace(longitude=-117.0, latitude=41.0, wea13_id=None, wea13_type=None)
+    regions.assign([report])
+    assert report.wea13_id is None
+    assert regions.lookup([1.0], [2.0]) == [None]
@@ -0,0 +1,76 @@
+from app.cache import LRUCache
+from app.tiles import TileCache, lonlat_to_tile, is_valid_tile, filter_hash
+
+
+def test_lonlat_to_tile():
+    assert lonlat_to_tile(0.0, 0.0, 0) == (0, 0)
+    assert lonlat_to_tile(-96.1751, 38.6263, 4) == (3, 6)
+    assert lonlat_to_tile(180.0, -90.0, 2) == (3, 3)
+
+
+def test_is_valid_tile():
+    assert is_valid_tile(0, 0, 0)
+    assert not is_valid_tile(1, 2, 0)
+    assert not is_valid_tile(-1, 0, 0)
+
+
+def test_filter_hash_ignores_missing_filters():
+    assert filter_hash({"impact": None, "landslide_type": "Debris"}) == filter_hash({"landslide_type": "Debris"})
+    assert filter_hash({"impact": "Road"}) != filter_hash({"impact": "Econ"})
+
+
+def test_lru_cache_evicts_least_recently_used():
+    cache = LRUCache(max_bytes=10, entry_overhead=0)
+    cache.put("a", b"12345")
+    cache.put("b", b"12345")
+    assert cache.get("a") == b"12345"
+    cache.put("c", b"12345")
+    assert cache.get("b") is None
+    assert cache.get("a") == b"12345"
+    assert cache.stats()["evictions"] == 1
+
+
+def test_lru_cache_charges_empty_entries():
+    cache = LRUCache(max_bytes=1000, entry_overhead=100)
+    for i in range(50):
+        cache.put(i, b"")
+    assert cache.stats()["entries"] == 10
+    assert cache.stats()["bytes"] == 1000
+    assert cache.stats()["evictions"] == 40
+
+
+def test_tile_cache_invalidates_only_tiles_containing_the_point():
+    cache = TileCache(max_bytes=4096)
+    cache.put(4, 3, 6, "f1", b"kansas")
+    cache.put(4, 3, 6, "f2", b"kansas filtered")
+    cache.put(4, 0, 0, "f1", b"elsewhere")
+    cache.put(0, 0, 0, "f1", b"world")
+
+    assert cache.invalidate_point(-96.1751, 38.6263) == 3
+    assert cache.get(4, 3, 6, "f1") is None
+    assert cache.get(4, 3, 6, "f2") is None
+    assert cache.get(0, 0, 0, "f1") is None
+    assert cache.get(4, 0, 0, "f1") == b"elsewhere"
+
+
+def test_tile_cache_misses_after_a_write_of_another_worker():
+    cache = TileCache(max_bytes=4096)
+    cache.observe(5)
+    cache.put(4, 3, 6, "f1", b"kansas")
+    cache.put(4, 0, 0, "f1", b"elsewhere")
+
+    # this process's own write, bumped 5 -> 6, only drops its tiles
+    cache.invalidate_point(-96.1751, 38.6263, version=6)
+    cache.observe(6)
+    assert cache.get(4, 3, 6, "f1") is None
+    assert cache.get(4, 0, 0, "f1") == b"elsewhere"
+
+    # another worker wrote somewhere unknown, 6 -> 7
+    cache.observe(7)
+    assert cache.get(4, 0, 0, "f1") is None
+
+    # a restored database moves the version back, that is a change too
+    cache.put(4, 0, 0, "f1", b"elsewhere")
+    cache.observe(3)
+    assert cache.get(4, 0, 0, "f1") is None
+    assert cache.stats()["version_clears"] == 3
@@ -0,0 +1,68 @@
+import asyncio
+
+import pytest
+
+from app.writebehind import WriteBehindQueue
+
+
+def test_concurrent_submits_share_one_batch():
+    batches = []
+
+    async def write_batch(items):
+        batches.append(list(items))
+        return [item * 10 for item in items]
+
+    async def scenario():
+        queue = WriteBehindQueue(write_batch, flush_ms=50, batch_size=100)
+        queue.start()
+        results = await asyncio.gather(*(queue.submit(i) for i in range(5)))
+        await queue.stop()
+        return results
+
+    assert asyncio.run(scenario()) == [0, 10, 20, 30, 40]
+    assert batches == [[0, 1, 2, 3, 4]]
+
+
+def test_full_batch_flushes_without_waiting_for_the_interval():
+    batches = []
+
+    async def write_batch(items):
+        batches.append(list(items))
+        return items
+
+    async def scenario():
+        queue = WriteBehindQueue(write_batch, flush_ms=60_000, batch_size=3)
+        queue.start()
+        await asyncio.wait_for(asyncio.gather(*(queue.submit(i) for i in range(3))), timeout=5)
+        await queue.stop()
+
+    asyncio.run(scenario())
+    assert batches == [[0, 1, 2]]
+
+
+def test_failed_batch_is_retried_row_by_row():
+    async def write_batch(items):
+        if "bad" in items:
+            raise ValueError("duplicate")
+        return items
+
+    async def scenario():
+        queue = WriteBehindQueue(write_batch, flush_ms=50, batch_size=100)
+        queue.start()
+        results = await asyncio.gather(queue.submit("a"), queue.submit("bad"), queue.submit("b"),
+                                       return_exceptions=True)
+        await queue.stop()
+        return results, queue.stats()
+
+    results, stats = asyncio.run(scenario())
+    assert results[0] == "a" and results[2] == "b"
+    assert isinstance(results[1], ValueError)
+    assert stats["fallbacks"] == 1
+
+
+def test_submit_requires_a_started_queue():
+    async def write_batch(items):
+        return items
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(WriteBehindQueue(write_batch).submit(1))
@@ -25,45 +25,18 @@ export default function MapCoords(){
     useEffect(() => {
     const fetchPoints = async () => {
       try {
-        const apiUrl = 'http://127.0.0.1:8000/query-data-imports/';
+        // the backend sends a ready made FeatureCollection
+        const apiUrl = 'http://127.0.0.1:8000/query-data-imports.geojson';
         const response = await fetch(apiUrl);
 
-         if (response.status === 404) {
-          const errorDetail = await response.json(); // Parse the error detail
-          console.warn("No data import records found:", errorDetail.detail);
-          setGeoJsonData({ type: 'FeatureCollection', features: [] }); // Set an empty GeoJSON to display an empty map
-          return; // Exit the function as there's no data to process
-        }
-
         if (!response.ok) {
           throw new Error(`HTTP error! status: ${response.status}`);
         }
-        const data = await response.json();
+        const featureCollection = await response.json();
 
-         if (!data || data.length === 0) {
-            console.log("Received empty data array from backend.");
-            setGeoJsonData({ type: 'FeatureCollection', features: [] });
-            return;
+        if (!featureCollection.features || featureCollection.features.length === 0) {
+            console.log("Received empty FeatureCollection from backend.");
         }
-        
-        //for the popup
-        const featureCollection = {
-          type: 'FeatureCollection',
-          features: data.map(item => ({
-            type: 'Feature',
-            properties: {
-              landslideid: item.landslideID,
-              latitude: item.latitude,
-              longitude: item.longitude,
-              lsType: item.lsType,
-              lssource: item.lsSource,
-              impact: item.impact,
-              wea13_id: item.wea13_id,
-              wea13_type: item.wea13_type,
-            },
-            geometry: item.geometry, 
-          })),
-        };
         setGeoJsonData(featureCollection);
       } catch (error) {
         console.error('Error fetching geo data:', error);
@@ -90,9 +63,9 @@ export default function MapCoords(){
       const props = feature.properties;
       layer.bindPopup(
         `<div>
-          <strong>Landslide ID:</strong> ${props.landslideid}<br/>
+          <strong>Landslide ID:</strong> ${props.landslideID}<br/>
           <strong>Type:</strong> ${props.lsType}<br/>
-          <strong>Source:</strong> ${props.lssource}<br/>
+          <strong>Source:</strong> ${props.lsSource}<br/>
           <strong>Impact:</strong> ${props.impact}<br/>
           <strong>Latitude:</strong> ${props.latitude}<br/>
           <strong>Longitude:</strong> ${props.longitude}<br/>
@@ -1,4 +1,4 @@
-import React, { useState } from 'react';
+import React, { useState, useEffect } from 'react';
 import './App.css'; 
 
 export default function QueryForm() {
@@ -19,6 +19,68 @@ export default function QueryForm() {
     const [error, setError] = useState(null);
     const [status, setStatus] = useState('idle'); 
 
+    // values (and their counts) offered as suggestions for the text inputs
+    const [facets, setFacets] = useState({});
+
+    useEffect(() => {
+        const loadFacets = async () => {
+            try {
+                const response = await fetch('http://localhost:8000/stats/facets');
+                if (response.ok) {
+                    const data = await response.json();
+                    setFacets(data.facets);
+                }
+            } catch (err) {
+                // the inputs still work without suggestions
+                console.error("Failed to load facet counts:", err);
+            }
+        };
+
+        loadFacets();
+    }, []);
+
+    // landslide id typeahead, asked for once typing pauses
+    const [idSuggestions, setIdSuggestions] = useState([]);
+
+    useEffect(() => {
+        if (!searchLandslideID) {
+            setIdSuggestions([]);
+            return;
+        }
+        const controller = new AbortController();
+        const timer = setTimeout(async () => {
+            try {
+                const params = new URLSearchParams({ q: searchLandslideID });
+                const response = await fetch(`http://localhost:8000/data-imports/suggest?${params}`, {
+                    signal: controller.signal,
+                });
+                if (response.ok) {
+                    setIdSuggestions(await response.json());
+                }
+            } catch (err) {
+                if (err.name !== 'AbortError') {
+                    console.error("Failed to load landslide id suggestions:", err);
+                }
+            }
+        }, 150);
+
+        return () => {
+            clearTimeout(timer);
+            controller.abort();
+        };
+    }, [searchLandslideID]);
+
+    const facetOptions = (facet) => (
+        <datalist id={`${facet}-options`}>
+            {Object.entries(facets[facet] || {})
+                // 'unknown' counts rows without a value, there is nothing to search for
+                .filter(([value]) => value !== 'unknown')
+                .map(([value, count]) => (
+                    <option key={value} value={value}>{`${value} (${count})`}</option>
+                ))}
+        </datalist>
+    );
+
     // Function to handle form submission
     const handleSubmit = async (e) => {
         e.preventDefault(); 
@@ -96,10 +158,18 @@ export default function QueryForm() {
                     <input
                         id="landslideId"
                         type="text"
+                        list="landslideId-options"
                         value={searchLandslideID}
                         onChange={(e) => setSearchLandslideID(e.target.value)}
                         disabled={status === 'submitting'}
                     />
+                    <datalist id="landslideId-options">
+                        {idSuggestions.map(suggestion => (
+                            <option key={suggestion.landslideID} value={suggestion.landslideID}>
+                                {suggestion.latitude != null ? `${suggestion.latitude}, ${suggestion.longitude}` : ''}
+                            </option>
+                        ))}
+                    </datalist>
                 </div>
 
                 <div className="form-group">
@@ -151,10 +221,12 @@ export default function QueryForm() {
                     <input
                         id="landslideType"
                         type="text"
+                        list="lstype-options"
                         value={landslideType}
                         onChange={(e) => setLandslideType(e.target.value)}
                         disabled={status === 'submitting'}
                     />
+                    {facetOptions('lstype')}
                 </div>
 
                 <div className="form-group">
@@ -162,10 +234,12 @@ export default function QueryForm() {
                     <input
                         id="landslideSource"
                         type="text"
+                        list="lssource-options"
                         value={landslideSource}
                         onChange={(e) => setLandslideSource(e.target.value)}
                         disabled={status === 'submitting'}
                     />
+                    {facetOptions('lssource')}
                 </div>
 
                 <div className="form-group">
@@ -173,10 +247,12 @@ export default function QueryForm() {
                     <input
                         id="impact"
                         type="text"
+                        list="impact-options"
                         value={impact}
                         onChange={(e) => setImpact(e.target.value)}
                         disabled={status === 'submitting'}
                     />
+                    {facetOptions('impact')}
                 </div>
 
                 <div className="form-group">
@@ -195,10 +271,12 @@ export default function QueryForm() {
                     <input
                         id="wea13type"
                         type="text"
+                        list="wea13_type-options"
                         value={wea13type}
                         onChange={(e) => setWea13type(e.target.value)}
                         disabled={status === 'submitting'}
                     />
+                    {facetOptions('wea13_type')}
                 </div>
 
                 <div className="form-group">
@@ -43,32 +43,31 @@ export default function ReportForm() {
 
     const mapRef = useRef(null);
 
-    // gets max lsID from database and addds one to the assigned for new data
+    // reserves the next lsID for the new record
     useEffect(() => {
-        const fetchMaxIDs = async () => {
+        const reserveLandslideID = async () => {
             setStatus('generating_ids');
             setError(null);
             try {
-                const response = await fetch('http://127.0.0.1:8000/get-max-ids/');
+                const response = await fetch('http://127.0.0.1:8000/landslide-ids/reserve?count=1', {
+                    method: 'POST',
+                });
                 if (!response.ok) {
                     throw new Error(`HTTP error! status: ${response.status}`);
                 }
                 const data = await response.json();
 
-                const currentMaxLandslideID = data.max_landslide_id !== null ? parseInt(data.max_landslide_id) : 100089;
-                const nextLandslideID = currentMaxLandslideID + 1;
-
-                setLandslideID(String(nextLandslideID));
+                setLandslideID(data.ids[0]);
                 setStatus('idle');
                 console.log("IDs generated successfully.");
             } catch (err) {
-                console.error("Failed to fetch max IDs:", err);
+                console.error("Failed to reserve ID:", err);
                 setError(new Error('Failed to generate IDs. Please check backend.'));
                 setStatus('error');
             }
         };
 
-        fetchMaxIDs();
+        reserveLandslideID();
     }, [user_id]); 
 
     // set lat & long from click on map
@@ -104,7 +103,8 @@ export default function ReportForm() {
                     'Content-Type': 'application/json',
                 },
                 body: JSON.stringify({
-                    landslideID: landslideID,
+                    // empty after a previous submit, the backend assigns the next id
+                    landslideID: landslideID || null,
                     latitude: parseFloat(latitude),
                     longitude: parseFloat(longitude),
                     lsType: lsType,
@@ -118,9 +118,18 @@ export default function ReportForm() {
 
             if (response.ok) {
                 const result = await response.json();
-                setFormMessage(`Record added successfully! ID: ${result.landslideID}`);
+                // set when a report a few metres away already describes this slide
+                const duplicateOf = response.headers.get('X-Duplicate-Of');
+                if (response.status === 200 && duplicateOf) {
+                    setFormMessage(`Merged into existing record ${duplicateOf}.`);
+                } else if (duplicateOf) {
+                    setFormMessage(`Record added successfully! ID: ${result.landslideID} (possible duplicate of ${duplicateOf})`);
+                } else {
+                    setFormMessage(`Record added successfully! ID: ${result.landslideID}`);
+                }
                 setStatus('success');
 
+                setLandslideID('');
                 setLatitude('');
                 setLongitude('');
                 setLsType('');